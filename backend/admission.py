@@ -0,0 +1,89 @@
+"""
+Admission control for GramSevak AI
+Global limits on concurrent work, on top of the per-IP rate limit: one for
+/query requests in flight and a smaller one for LLM calls. A request that
+cannot get a slot within ADMISSION_QUEUE_MS is shed, which here means it is
+answered without the LLM (keyword match or the helpline fallback) instead
+of waiting or failing - under overload answers get cheaper, not slower.
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Dict
+
+MAX_INFLIGHT_REQUESTS = int(os.getenv("MAX_INFLIGHT_REQUESTS", "64"))
+MAX_INFLIGHT_LLM = int(os.getenv("MAX_INFLIGHT_LLM", "8"))
+
+# Longest a request waits for a slot before it is shed
+ADMISSION_QUEUE_MS = float(os.getenv("ADMISSION_QUEUE_MS", "100"))
+
+class ConcurrencyLimit:
+    """
+    Slots handed out in arrival order; waiters give up after a timeout.
+    Used from the event loop only.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.inflight = 0
+        self._waiters = deque()  # Futures of queued acquire() calls
+        self.stats = {"admitted": 0, "queued": 0, "shed": 0, "peak_inflight": 0, "max_queue_ms": 0.0}
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting up to `timeout` seconds; False = shed (call release() only after True)"""
+        if self.inflight < self.limit and not self._waiters:
+            self._admit()
+            return True
+        if timeout <= 0:
+            self.stats["shed"] += 1
+            return False
+
+        self.stats["queued"] += 1
+        queued_at = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            # A release() in the same loop turn as the timeout already handed
+            # this waiter the slot: keep it (shedding would leak it)
+            if not (waiter.done() and not waiter.cancelled()):
+                self.stats["shed"] += 1
+                return False
+        except BaseException:
+            # Cancelled (client went away); a slot handed over meanwhile is passed on
+            self._discard(waiter)
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        # The releasing request handed its slot over; inflight is unchanged
+        self.stats["admitted"] += 1
+        self.stats["max_queue_ms"] = max(self.stats["max_queue_ms"], round((time.perf_counter() - queued_at) * 1000, 2))
+        return True
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.inflight -= 1
+
+    def _admit(self):
+        self.inflight += 1
+        self.stats["admitted"] += 1
+        self.stats["peak_inflight"] = max(self.stats["peak_inflight"], self.inflight)
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def snapshot(self) -> Dict:
+        """Current load and counters for /stats"""
+        return {"limit": self.limit, "inflight": self.inflight, "queued_now": len(self._waiters), **self.stats}
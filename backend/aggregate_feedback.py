@@ -0,0 +1,88 @@
+"""
+Aggregate GramSevak AI feedback into retrieval priors
+Reads the feedback log and its rotated backups (feedback_store.py) and writes
+indices/feedback_priors.json: per-entry helpful / not-helpful counts and
+the keyword score boost retrieval adds for that entry. Votes for entries
+no longer in the knowledge base are ignored; votes for entries merged away
+by build_index.py --merge-duplicates count for the entry that absorbed
+them. Running servers pick up the new file within
+FEEDBACK_PRIORS_RELOAD_SECONDS.
+
+Response and entry ids are posted by the client, so a vote only counts if
+the same log has a served record of that response with that entry (the
+server writes one per answer); votes for answers older than the oldest
+backup are not counted. Exits non-zero when the log has votes but no
+served records, so a cron job notices instead of publishing empty priors.
+
+Usage:
+    python aggregate_feedback.py                        # once (e.g. from cron)
+    python aggregate_feedback.py --every 15             # every 15 minutes
+    python aggregate_feedback.py --log /var/log/gramsevak/feedback.jsonl
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+from kb_loader import iter_entries, list_kb_files
+from dedupe import load_merged_entries
+from query_log import log_files
+from feedback_store import (
+    FEEDBACK_LOG_PATH, FEEDBACK_PRIORS_FILE, aggregate_feedback, iter_feedback, save_feedback_priors
+)
+
+def known_entry_ids(kb_dir: Path) -> set:
+    return {entry.get("id") for kb_file in list_kb_files(kb_dir) for entry in iter_entries(kb_file) if entry.get("id")}
+
+def run_once(log_path: Path, output_path: Path, kb_dir: Path) -> bool:
+    if not log_files(log_path):
+        print(f"❌ No feedback log at {log_path}")
+        return False
+    start = time.time()
+    merged = load_merged_entries()
+    records = (
+        {**r, "served": merged.get(r["served"], r["served"])} if "served" in r
+        else {**r, "entry_id": merged.get(r.get("entry_id"), r.get("entry_id"))}
+        for r in iter_feedback(log_path)
+    )
+    priors = aggregate_feedback(records, known_entry_ids(kb_dir))
+    if priors["unmatched"] and not priors["served"]:
+        print(f"❌ {priors['unmatched']} votes but no served answers in {log_path}: no vote can be verified, "
+              f"priors not written")
+        return False
+    size = save_feedback_priors(priors, output_path)
+
+    boosted = {entry_id: p["boost"] for entry_id, p in priors["entries"].items() if p["boost"]}
+    print(f"✅ {priors['votes']} votes → priors for {len(priors['entries'])} entries "
+          f"({len(boosted)} boosted, global helpful rate {priors['global_helpful_rate']:.1%}) "
+          f"in {time.time() - start:.2f}s → {output_path} ({size / 1024:.2f} KB)")
+    if priors["unmatched"]:
+        print(f"   ⚠️  {priors['unmatched']} votes ignored: response rotated out of the log or served another entry")
+    ranked = sorted(boosted.items(), key=lambda item: item[1])
+    for entry_id, boost in [item for item in ranked if item[1] < 0][:5]:
+        print(f"   👎 {entry_id}: {boost:+d}")
+    for entry_id, boost in [item for item in reversed(ranked) if item[1] > 0][:5]:
+        print(f"   👍 {entry_id}: {boost:+d}")
+    return True
+
+def main():
+    default_log = Path(FEEDBACK_LOG_PATH or "logs/feedback.jsonl")
+    if not default_log.is_absolute():
+        default_log = Path(__file__).parent / default_log
+
+    parser = argparse.ArgumentParser(description="Aggregate feedback into per-entry retrieval priors")
+    parser.add_argument("--log", default=str(default_log), help="Feedback log (JSONL)")
+    parser.add_argument("--output", default=str(FEEDBACK_PRIORS_FILE))
+    parser.add_argument("--kb-dir", default=str(Path(__file__).parent / "knowledge_base"))
+    parser.add_argument("--every", type=float, default=0, help="Repeat every N minutes (0 = run once)")
+    args = parser.parse_args()
+
+    while True:
+        ok = run_once(Path(args.log), Path(args.output), Path(args.kb_dir))
+        if args.every <= 0:
+            sys.exit(0 if ok else 1)
+        time.sleep(args.every * 60)
+
+if __name__ == "__main__":
+    main()
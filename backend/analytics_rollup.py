@@ -0,0 +1,310 @@
+"""
+Time-bucketed analytics for GramSevak AI
+Keeps per-minute rollups (queries, latency histogram, bytes, cache hits and
+LLM calls, overall and by category / network tier) in an in-memory ring
+buffer. Completed minutes are flushed to a local JSONL store by a
+background thread and reloaded at startup, so trends survive restarts and
+can be queried by time range (/analytics/timeseries).
+
+Recording is a few counter increments under a lock; percentiles, merging
+and disk I/O all happen off the request path. Range queries read the store
+only for minutes older than what memory holds in full; those minutes are
+closed, so the last store read is cached and reused by later queries
+over the same or a narrower range (a rolling "last 24h" window).
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Minutes of rollups kept in memory (1440 = one day)
+ANALYTICS_RETENTION_MINUTES = int(os.getenv("ANALYTICS_RETENTION_MINUTES", "1440"))
+
+# Rollup store (empty = memory only); relative paths are under backend/
+ANALYTICS_STORE_PATH = os.getenv("ANALYTICS_STORE_PATH", "logs/analytics_rollups.jsonl")
+ANALYTICS_STORE_DAYS = float(os.getenv("ANALYTICS_STORE_DAYS", "30"))
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "60"))
+
+BUCKET_SECONDS = 60
+
+# Latency histogram upper bounds (ms); the last slot counts slower requests
+LATENCY_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+def new_group() -> Dict:
+    return {
+        "queries": 0,
+        "bytes": 0,
+        "cache_hits": 0,
+        "llm_calls": 0,
+        "latency_ms_sum": 0.0,
+        "latency_ms_max": 0.0,
+        "latency_hist": [0] * (len(LATENCY_BOUNDS_MS) + 1)
+    }
+
+def new_bucket(minute: int) -> Dict:
+    return {"minute": minute, "total": new_group(), "by_category": {}, "by_network": {}}
+
+def merge_group(into: Dict, group: Dict):
+    for key in ("queries", "bytes", "cache_hits", "llm_calls", "latency_ms_sum"):
+        into[key] += group[key]
+    into["latency_ms_max"] = max(into["latency_ms_max"], group["latency_ms_max"])
+    into["latency_hist"] = [a + b for a, b in zip(into["latency_hist"], group["latency_hist"])]
+
+def merge_bucket(into: Dict, bucket: Dict):
+    merge_group(into["total"], bucket["total"])
+    for dimension in ("by_category", "by_network"):
+        for name, group in bucket[dimension].items():
+            merge_group(into[dimension].setdefault(name, new_group()), group)
+
+def histogram_percentile(group: Dict, pct: float) -> float:
+    """Upper bound of the histogram slot holding the percentile (capped at the max seen)"""
+    if not group["queries"]:
+        return 0.0
+    target = pct / 100 * group["queries"]
+    seen = 0
+    for i, count in enumerate(group["latency_hist"]):
+        seen += count
+        if count and seen >= target:
+            bound = LATENCY_BOUNDS_MS[i] if i < len(LATENCY_BOUNDS_MS) else group["latency_ms_max"]
+            return round(float(min(bound, group["latency_ms_max"])), 2)
+    return round(group["latency_ms_max"], 2)
+
+def summarize_group(group: Dict) -> Dict:
+    queries = group["queries"]
+    return {
+        "queries": queries,
+        "bytes": group["bytes"],
+        "avg_bytes": int(group["bytes"] / queries) if queries else 0,
+        "cache_hits": group["cache_hits"],
+        "cache_hit_ratio": round(group["cache_hits"] / queries, 2) if queries else 0.0,
+        "llm_calls": group["llm_calls"],
+        "latency_ms": {
+            "mean": round(group["latency_ms_sum"] / queries, 2) if queries else 0.0,
+            "p50": histogram_percentile(group, 50),
+            "p95": histogram_percentile(group, 95),
+            "p99": histogram_percentile(group, 99),
+            "max": round(group["latency_ms_max"], 2)
+        }
+    }
+
+class AnalyticsRollups:
+    def __init__(self, retention_minutes: int, store_path: Optional[Path] = None,
+                 store_days: float = 30, flush_seconds: float = 60):
+        """
+        Args:
+            retention_minutes: Per-minute buckets kept in memory
+            store_path: JSONL file completed buckets are appended to (None = memory only)
+            store_days: Store entries older than this are dropped at startup
+            flush_seconds: Interval of the background flush
+        """
+        self.store_path = Path(store_path) if store_path else None
+        self.store_days = store_days
+        self.flush_seconds = flush_seconds
+
+        self._buckets = deque(maxlen=max(1, retention_minutes))  # Oldest minute first
+        self._lock = threading.Lock()
+        self._unflushed = 0  # Newest buckets not yet in the store
+        self._memory_from = 0  # Memory holds every bucket from this minute on (older ones: store only)
+        self._store_cache = None  # (start, end, buckets) of the last store read
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"recorded": 0, "flushed_buckets": 0, "loaded_buckets": 0, "errors": 0,
+                      "store_reads": 0, "store_cache_hits": 0}
+
+    def start(self):
+        """Reload recent buckets from the store and start the flush thread"""
+        if not self.store_path:
+            return
+        self._load_store()
+        self._thread = threading.Thread(target=self._run, name="analytics-flush", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Flush every bucket (the current minute too) and stop the flush thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush(include_current=True)
+
+    def record(self, category: str, network_type: Optional[str], source: str,
+               latency_ms: float, response_bytes: int):
+        """Count one answered query in the current minute"""
+        minute = int(time.time() // BUCKET_SECONDS) * BUCKET_SECONDS
+        slot = bisect.bisect_left(LATENCY_BOUNDS_MS, latency_ms)
+        cache_hit = source == "keyword_match"
+        llm_call = source == "groq_llm"
+
+        with self._lock:
+            # A stored bucket (reloaded after a restart) is never written again
+            if not self._unflushed or self._buckets[-1]["minute"] < minute:
+                if len(self._buckets) == self._buckets.maxlen:
+                    self._memory_from = self._buckets[0]["minute"] + BUCKET_SECONDS  # Oldest is dropped
+                self._buckets.append(new_bucket(minute))
+                self._unflushed = min(self._unflushed + 1, self._buckets.maxlen)
+            bucket = self._buckets[-1]
+
+            for group in (
+                bucket["total"],
+                bucket["by_category"].setdefault(category or "general", new_group()),
+                bucket["by_network"].setdefault(network_type or "unknown", new_group())
+            ):
+                group["queries"] += 1
+                group["bytes"] += response_bytes
+                group["cache_hits"] += cache_hit
+                group["llm_calls"] += llm_call
+                group["latency_ms_sum"] += latency_ms
+                if latency_ms > group["latency_ms_max"]:
+                    group["latency_ms_max"] = latency_ms
+                group["latency_hist"][slot] += 1
+            self.stats["recorded"] += 1
+
+    def buckets(self, start: float, end: float) -> List[Dict]:
+        """Per-minute buckets with start <= minute < end (store + memory)"""
+        merged = {}
+        with self._lock:  # Merged under the lock: record() may add categories meanwhile
+            memory_from = self._memory_from
+            for bucket in self._buckets:
+                if start <= bucket["minute"] < end:
+                    merge_bucket(merged.setdefault(bucket["minute"], new_bucket(bucket["minute"])), bucket)
+
+        if start < memory_from:
+            for bucket in self._stored_buckets(start, min(end, memory_from)):
+                merge_bucket(merged.setdefault(bucket["minute"], new_bucket(bucket["minute"])), bucket)
+        return [merged[minute] for minute in sorted(merged)]
+
+    def _stored_buckets(self, start: float, end: float) -> List[Dict]:
+        """Store buckets in [start, end), all before the in-memory window (reuses the last read if it covers them)"""
+        cached = self._store_cache
+        if cached and cached[0] <= start and end <= cached[1]:
+            self.stats["store_cache_hits"] += 1
+            return [b for b in cached[2] if start <= b["minute"] < end]
+        buckets = self._read_store(start, end)
+        self._store_cache = (start, end, buckets)
+        self.stats["store_reads"] += 1
+        return buckets
+
+    def timeseries(self, start: float, end: float, step_seconds: int = BUCKET_SECONDS) -> List[Dict]:
+        """Summarized points for [start, end), each covering step_seconds (a multiple of a minute)"""
+        step = max(BUCKET_SECONDS, int(step_seconds) // BUCKET_SECONDS * BUCKET_SECONDS)
+        points = {}
+        for bucket in self.buckets(start, end):
+            t = int(bucket["minute"] // step * step)
+            merge_bucket(points.setdefault(t, new_bucket(t)), bucket)
+
+        return [
+            {
+                "t": t,
+                **summarize_group(points[t]["total"]),
+                "by_category": {name: g["queries"] for name, g in points[t]["by_category"].items()},
+                "by_network": {name: g["queries"] for name, g in points[t]["by_network"].items()}
+            }
+            for t in sorted(points)
+        ]
+
+    def summary(self, start: float, end: float) -> Dict:
+        """One rollup over [start, end), with per-category and per-network summaries"""
+        total = new_bucket(int(start))
+        for bucket in self.buckets(start, end):
+            merge_bucket(total, bucket)
+        return {
+            **summarize_group(total["total"]),
+            "by_category": {name: summarize_group(g) for name, g in total["by_category"].items()},
+            "by_network": {name: summarize_group(g) for name, g in total["by_network"].items()}
+        }
+
+    def category_counts(self, since: float) -> Dict[str, int]:
+        """Queries per category since a timestamp (recent traffic for index prewarm)"""
+        counts = {}
+        for bucket in self.buckets(since, time.time() + BUCKET_SECONDS):
+            for name, group in bucket["by_category"].items():
+                counts[name] = counts.get(name, 0) + group["queries"]
+        return counts
+
+    def flush(self, include_current: bool = False):
+        """Append completed (not yet stored) buckets to the store"""
+        if not self.store_path:
+            return
+        current_minute = int(time.time() // BUCKET_SECONDS) * BUCKET_SECONDS
+        with self._lock:
+            unflushed = list(self._buckets)[len(self._buckets) - self._unflushed:]
+            if unflushed and not include_current and unflushed[-1]["minute"] >= current_minute:
+                unflushed.pop()  # Still being recorded into
+            pending = [json.dumps(b, separators=(",", ":")) for b in unflushed]
+            self._unflushed -= len(pending)
+        if not pending:
+            return
+
+        try:
+            self.store_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.store_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(pending) + "\n")
+            self.stats["flushed_buckets"] += len(pending)
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Analytics rollup flush failed: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def _read_store(self, start: float, end: float) -> List[Dict]:
+        if not self.store_path or not self.store_path.exists():
+            return []
+        buckets = []
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        bucket = json.loads(line)
+                    except ValueError:
+                        continue  # Partial line from an interrupted write
+                    if start <= bucket["minute"] < end:
+                        buckets.append(bucket)
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Analytics rollup store unreadable: {e}")
+        return buckets
+
+    def _load_store(self):
+        """Drop expired store entries and reload the retention window into memory"""
+        now = time.time()
+        kept = self._read_store(now - self.store_days * 86400, now + BUCKET_SECONDS)
+
+        # Rewrite without expired entries (a restart within a minute stores it twice; merge)
+        merged = {}
+        for bucket in kept:
+            merge_bucket(merged.setdefault(bucket["minute"], new_bucket(bucket["minute"])), bucket)
+        buckets = [merged[minute] for minute in sorted(merged)]
+        if self.store_path.exists():
+            tmp_path = self.store_path.with_name(self.store_path.name + ".tmp")
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(b, separators=(",", ":")) + "\n" for b in buckets)
+                os.replace(tmp_path, self.store_path)
+            except OSError as e:
+                self.stats["errors"] += 1
+                print(f"⚠️  Analytics rollup store not compacted: {e}")
+
+        with self._lock:
+            self._buckets.extend(buckets[-self._buckets.maxlen:])
+            if len(buckets) > self._buckets.maxlen:
+                self._memory_from = buckets[-self._buckets.maxlen]["minute"]
+        self.stats["loaded_buckets"] = min(len(buckets), self._buckets.maxlen)
+
+def create_rollups() -> AnalyticsRollups:
+    """Rollups configured from the environment"""
+    store_path = None
+    if ANALYTICS_STORE_PATH:
+        store_path = Path(ANALYTICS_STORE_PATH)
+        if not store_path.is_absolute():
+            store_path = Path(__file__).parent / store_path
+    return AnalyticsRollups(ANALYTICS_RETENTION_MINUTES, store_path,
+                            ANALYTICS_STORE_DAYS, ANALYTICS_FLUSH_SECONDS)
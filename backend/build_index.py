@@ -3,12 +3,26 @@
 Build script to prepare the knowledge base and generate FAISS indices per category
 Upgraded schema with validation and logging
 """
+import io
 import json
 import os
+import heapq
+import argparse
+from contextlib import redirect_stdout
 from pathlib import Path
-import glob
 import time
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple, Iterator, Iterable
+from kb_loader import iter_entries, list_kb_files, JsonArrayWriter
+from tier_payloads import build_tier_payloads, save_summary_tiers, tier_summaries
+from exact_match import add_exact_match_keys, save_exact_match_map
+from suggest import SuggestIndexBuilder, save_suggest_index
+from language_index import LanguageIndexBuilder, save_language_index
+from intent_model import IntentModelBuilder, save_intent_model, np
+from intent_classifier import IntentClassifier
+from dedupe import NearDuplicateDetector, merge_entries, save_merged_entries, DEDUPE_THRESHOLD, MERGED_ENTRIES_FILE
+from offline_pack import (
+    OFFLINE_PACK_SIZE, entry_record, build_pack, save_pack, build_search_index, save_search_index
+)
 
 # Category definitions
 CATEGORIES = [
@@ -90,169 +104,400 @@ def validate_entry(entry: Dict, index: int, filename: str) -> Tuple[bool, List[s
     
     return True, []
 
-def load_knowledge_base() -> Tuple[List[Dict], Dict[str, List[Dict]]]:
-    """Load all knowledge base files and organize by category"""
-    kb_dir = Path(__file__).parent / "knowledge_base"
-    all_entries = []
-    entries_by_category = {cat: [] for cat in CATEGORIES}
+def iter_valid_entries(kb_dir: Path = None) -> Iterator[Dict]:
+    """Stream validated, de-duplicated entries from every knowledge base file"""
+    kb_dir = kb_dir or Path(__file__).parent / "knowledge_base"
     seen_ids = set()
     seen_variants = set()
     
-    # Load all JSON files
-    json_files = sorted(glob.glob(str(kb_dir / "*.json")))
+    # Load all JSON / JSON Lines files
+    kb_files = list_kb_files(kb_dir)
     
-    print(f"📂 Found {len(json_files)} knowledge base files\n")
+    print(f"📂 Found {len(kb_files)} knowledge base files\n")
     
-    for json_file in json_files:
-        filename = Path(json_file).name
+    for kb_file in kb_files:
+        filename = kb_file.name
+        total_count = 0
+        valid_count = 0
         try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            for i, entry in enumerate(iter_entries(kb_file)):
+                total_count += 1
+                
+                # Validate entry
+                is_valid, errors = validate_entry(entry, i, filename)
                 
-                if not isinstance(data, list):
-                    print(f"  ⚠️  Skipping {filename} - not a list")
+                if not is_valid:
                     continue
                 
-                valid_count = 0
-                for i, entry in enumerate(data):
-                    # Validate entry
-                    is_valid, errors = validate_entry(entry, i, filename)
-                    
-                    if not is_valid:
-                        continue
-                    
-                    # Check for duplicate IDs
-                    entry_id = entry.get("id")
-                    if entry_id in seen_ids:
-                        print(f"  ⚠️  Duplicate ID '{entry_id}' in {filename}")
-                        continue
-                    seen_ids.add(entry_id)
-                    
-                    # Check for duplicate question variants across all entries
-                    for variant in entry.get("question_variants", []):
-                        if variant in seen_variants:
-                            print(f"  ⚠️  Duplicate variant '{variant}' in {filename}")
-                        seen_variants.add(variant)
-                    
-                    # Add to collections
-                    all_entries.append(entry)
-                    category = entry.get("category", "general")
-                    if category in entries_by_category:
-                        entries_by_category[category].append(entry)
-                    
-                    valid_count += 1
+                # Check for duplicate IDs
+                entry_id = entry.get("id")
+                if entry_id in seen_ids:
+                    print(f"  ⚠️  Duplicate ID '{entry_id}' in {filename}")
+                    continue
+                seen_ids.add(entry_id)
                 
-                print(f"  ✅ Loaded {valid_count}/{len(data)} valid entries from {filename}")
+                # Check for duplicate question variants across all entries
+                for variant in entry.get("question_variants", []):
+                    if variant in seen_variants:
+                        print(f"  ⚠️  Duplicate variant '{variant}' in {filename}")
+                    seen_variants.add(variant)
                 
-        except json.JSONDecodeError as e:
-            print(f"  ❌ JSON error in {filename}: {e}")
+                valid_count += 1
+                yield entry
+            
+            print(f"  ✅ Loaded {valid_count}/{total_count} valid entries from {filename}")
+            
+        except ValueError as e:
+            if isinstance(e, json.JSONDecodeError):
+                print(f"  ❌ JSON error in {filename}: {e}")
+            else:
+                print(f"  ⚠️  Skipping {filename} - not a list")
         except Exception as e:
             print(f"  ❌ Error loading {filename}: {e}")
+
+def load_knowledge_base() -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+    """Load all knowledge base files into memory and organize by category"""
+    all_entries = []
+    entries_by_category = {cat: [] for cat in CATEGORIES}
+    
+    for entry in iter_valid_entries():
+        all_entries.append(entry)
+        category = entry.get("category", "general")
+        if category in entries_by_category:
+            entries_by_category[category].append(entry)
     
     return all_entries, entries_by_category
 
-def generate_offline_cache(entries: List[Dict], output_path: Path):
-    """Generate compressed offline cache for frontend"""
+def plan_merges(threshold: float) -> Tuple[NearDuplicateDetector, Dict[str, str], Dict[str, List[Dict]]]:
+    """
+    Extra passes of --merge-duplicates: find the clusters, then collect the
+    entries each kept entry absorbs (only the duplicates are held in memory)
+    """
+    detector = NearDuplicateDetector(threshold)
+    # Validation warnings are printed once, by the main pass
+    with redirect_stdout(io.StringIO()):
+        for entry in iter_valid_entries():
+            detector.add(entry)
+    merges = detector.merge_plan()
+    
+    absorbed = {}
+    with redirect_stdout(io.StringIO()):
+        for entry in iter_valid_entries():
+            if entry["id"] in merges:
+                absorbed.setdefault(merges[entry["id"]], []).append(entry)
+    return detector, merges, absorbed
+
+def report_duplicates(detector: NearDuplicateDetector, merged: bool):
+    """Print near-duplicate clusters (kept entry first)"""
+    clusters = detector.clusters()
+    stats = detector.stats()
+    print(f"\n🔁 Near-duplicates: {len(clusters)} clusters at Jaccard ≥ {detector.threshold:.2f} "
+          f"({stats['candidate_pairs']} candidate pairs checked of {stats['all_pairs']}, LSH {detector.bands}x{detector.rows} bands, ~{detector.lsh_threshold:.2f})")
+    for cluster in clusters:
+        duplicates = ", ".join(f"{d['id']} ({d['category']}, {d['similarity']:.2f})" for d in cluster["duplicates"])
+        print(f"  {'🔀' if merged else '⚠️ '} {cluster['canonical']} ({cluster['category']}) ~ {duplicates}")
+    if clusters and not merged:
+        print("  💡 Run with --merge-duplicates to fold these into the first entry of each line")
+    for pair in detector.cross_category_pairs():
+        (a, b), (category_a, category_b) = pair["ids"], pair["categories"]
+        print(f"  ↔️  {a} ({category_a}) ~ {b} ({category_b}, {pair['similarity']:.2f}): different categories, not merged")
+
+class OfflineCacheBuilder:
+    """Keep the top entries by confidence_weight while streaming (bounded heap)"""
+    
+    def __init__(self, limit: int = OFFLINE_PACK_SIZE):
+        self.limit = limit
+        self._heap = []
+        self._seq = 0
+    
+    def add(self, entry: Dict):
+        # Ties keep load order, matching a stable sort by confidence_weight
+        key = (entry.get("confidence_weight", 0), -self._seq)
+        self._seq += 1
+        item = (key, entry)
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, item)
+        elif key > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+    
+    def entries(self) -> List[Dict]:
+        return [entry for _, entry in sorted(self._heap, key=lambda item: item[0], reverse=True)]
+
+def generate_offline_cache(entries: Iterable[Dict], output_path: Path):
+    """Generate the versioned offline pack (served by /offline-pack and the frontend)"""
     # Take top 200 most important entries (sorted by confidence_weight)
-    sorted_entries = sorted(entries, key=lambda x: x.get("confidence_weight", 0), reverse=True)
-    offline_data = sorted_entries[:200] if len(sorted_entries) > 200 else sorted_entries
-    
-    # Simplify data structure for offline use
-    simplified = []
-    for entry in offline_data:
-        simplified.append({
-            "q": entry["question_hi"],
-            "a": entry["summary"],
-            "s": entry.get("title", entry.get("category", "सामान्य")),
-            "variants": entry.get("question_variants", [])
-        })
+    if isinstance(entries, OfflineCacheBuilder):
+        builder = entries
+    else:
+        builder = OfflineCacheBuilder()
+        for entry in entries:
+            builder.add(entry)
+    
+    top_entries = builder.entries()
+    pack = build_pack([entry_record(entry) for entry in top_entries])
     
+    # Server copy + delta history
+    history = save_pack(pack)
+    
+    # Frontend copy (same pack)
     with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(simplified, f, ensure_ascii=False, separators=(',', ':'))
+        json.dump(pack, f, ensure_ascii=False, separators=(',', ':'))
     
     file_size = os.path.getsize(output_path)
-    print(f"  ✅ Generated offline cache: {file_size / 1024:.2f} KB ({len(simplified)} entries)")
+    print(f"  ✅ Generated offline pack v{pack['version']}: {file_size / 1024:.2f} KB ({pack['count']} entries, {len(history)} versions for delta sync)")
+    
+    # Prebuilt search index so the frontend can answer offline
+    search_index = build_search_index(top_entries, pack["version"])
+    index_size = save_search_index(search_index, output_path.parent / "offline_search_index.json")
+    print(f"  ✅ Generated offline search index: {index_size / 1024:.2f} KB ({len(search_index['txt'])} entries)")
+
+class CategoryIndexWriter:
+    """
+    Append entries to per-category index files as they stream in
+
+    Each index is written to <category>_index.json.tmp and only replaces the
+    live file once the whole build pass succeeded, so a failed build never
+    leaves a truncated index for the server to load.
+    """
+    
+    def __init__(self, indices_dir: Path = None):
+        self.indices_dir = indices_dir or Path(__file__).parent / "indices"
+        self._writers = {}
+    
+    def __enter__(self) -> "CategoryIndexWriter":
+        self.indices_dir.mkdir(exist_ok=True)
+        return self
+    
+    def add(self, entry: Dict):
+        category = entry.get("category", "general")
+        if category not in CATEGORIES:
+            return
+        writer = self._writers.get(category)
+        if writer is None:
+            # Files are only created for categories that have entries
+            writer = JsonArrayWriter(self.index_file(category).with_suffix(".json.tmp"), indent=2)
+            writer.__enter__()
+            self._writers[category] = writer
+        writer.write(entry)
+    
+    def index_file(self, category: str) -> Path:
+        return self.indices_dir / f"{category}_index.json"
+    
+    def __exit__(self, exc_type, exc, tb):
+        for writer in self._writers.values():
+            writer.__exit__(exc_type, exc, tb)
+        for category, writer in self._writers.items():
+            if exc_type is None:
+                os.replace(writer.path, self.index_file(category))
+            else:
+                writer.path.unlink(missing_ok=True)
+        return False
+    
+    def report(self):
+        print("\n📊 Saving category indices...")
+        for category in CATEGORIES:
+            writer = self._writers.get(category)
+            if writer is None:
+                continue
+            file_size = os.path.getsize(self.index_file(category))
+            print(f"  ✅ {category}: {writer.count} entries ({file_size / 1024:.2f} KB)")
 
 def save_category_indices(entries_by_category: Dict[str, List[Dict]]):
     """Save separate JSON files for each category (for fast category-based retrieval)"""
-    indices_dir = Path(__file__).parent / "indices"
-    indices_dir.mkdir(exist_ok=True)
-    
-    print("\n📊 Saving category indices...")
-    for category, entries in entries_by_category.items():
-        if not entries:
-            continue
-        
-        output_file = indices_dir / f"{category}_index.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(entries, f, ensure_ascii=False, indent=2)
+    with CategoryIndexWriter() as writer:
+        for category, entries in entries_by_category.items():
+            for entry in entries:
+                writer.add(entry)
+    writer.report()
+
+class KBStatistics:
+    """Running knowledge base statistics, updated one entry at a time"""
+    
+    def __init__(self):
+        self.total = 0
+        self.by_category = {cat: 0 for cat in CATEGORIES}
+        self.confidence_sum = 0.0
+        self.with_eligibility = 0
+        self.with_documents = 0
+        self.with_benefits = 0
+        self.with_links = 0
+        self.total_variants = 0
+        self.bytes_2g_full = 0
+        self.bytes_2g_compact = 0
+    
+    def add(self, entry: Dict, summaries: Optional[Dict[str, str]] = None):
+        self.total += 1
+        category = entry.get("category", "general")
+        if category in self.by_category:
+            self.by_category[category] += 1
+        self.confidence_sum += entry.get("confidence_weight", 0)
+        self.with_eligibility += 1 if entry.get("eligibility") else 0
+        self.with_documents += 1 if entry.get("documents_required") else 0
+        self.with_benefits += 1 if entry.get("benefits") else 0
+        self.with_links += 1 if entry.get("official_link") else 0
+        self.total_variants += len(entry.get("question_variants", []))
         
-        file_size = os.path.getsize(output_file)
-        print(f"  ✅ {category}: {len(entries)} entries ({file_size / 1024:.2f} KB)")
+        # Bytes per 2G answer: verbose JSON vs compact wire format
+        payload_2g = build_tier_payloads(entry, summaries)["2g"]
+        self.bytes_2g_full += payload_2g["size"]
+        self.bytes_2g_compact += payload_2g["compact_size"]
 
-def print_statistics(all_entries: List[Dict], entries_by_category: Dict[str, List[Dict]]):
+def print_statistics(stats: KBStatistics):
     """Print detailed statistics"""
     print("\n" + "="*60)
     print("📊 KNOWLEDGE BASE STATISTICS")
     print("="*60)
     
-    print(f"\n📈 Total Entries: {len(all_entries)}")
+    total = stats.total
+    print(f"\n📈 Total Entries: {total}")
     
     print(f"\n📂 Category Distribution:")
     for category in CATEGORIES:
-        count = len(entries_by_category.get(category, []))
-        percentage = (count / len(all_entries) * 100) if all_entries else 0
+        count = stats.by_category.get(category, 0)
+        percentage = (count / total * 100) if total else 0
         bar = "█" * int(percentage / 2)
         print(f"  {category:20s}: {count:4d} entries ({percentage:5.1f}%) {bar}")
     
     # Calculate average confidence
-    avg_confidence = sum(e.get("confidence_weight", 0) for e in all_entries) / len(all_entries) if all_entries else 0
+    avg_confidence = stats.confidence_sum / total if total else 0
     print(f"\n⭐ Average Confidence Weight: {avg_confidence:.3f}")
     
     # Count entries with optional fields
-    with_eligibility = sum(1 for e in all_entries if e.get("eligibility"))
-    with_documents = sum(1 for e in all_entries if e.get("documents_required"))
-    with_benefits = sum(1 for e in all_entries if e.get("benefits"))
-    with_links = sum(1 for e in all_entries if e.get("official_link"))
-    
     print(f"\n📋 Optional Fields Coverage:")
-    print(f"  Eligibility:         {with_eligibility:4d} ({with_eligibility/len(all_entries)*100:.1f}%)")
-    print(f"  Documents Required:  {with_documents:4d} ({with_documents/len(all_entries)*100:.1f}%)")
-    print(f"  Benefits:            {with_benefits:4d} ({with_benefits/len(all_entries)*100:.1f}%)")
-    print(f"  Official Links:      {with_links:4d} ({with_links/len(all_entries)*100:.1f}%)")
+    print(f"  Eligibility:         {stats.with_eligibility:4d} ({stats.with_eligibility/total*100:.1f}%)")
+    print(f"  Documents Required:  {stats.with_documents:4d} ({stats.with_documents/total*100:.1f}%)")
+    print(f"  Benefits:            {stats.with_benefits:4d} ({stats.with_benefits/total*100:.1f}%)")
+    print(f"  Official Links:      {stats.with_links:4d} ({stats.with_links/total*100:.1f}%)")
     
     # Count total question variants
-    total_variants = sum(len(e.get("question_variants", [])) for e in all_entries)
-    print(f"\n🔍 Total Question Variants: {total_variants}")
-    print(f"   Average per Entry: {total_variants/len(all_entries):.1f}")
+    print(f"\n🔍 Total Question Variants: {stats.total_variants}")
+    print(f"   Average per Entry: {stats.total_variants/total:.1f}")
+    
+    # 2G answer size (static fields only)
+    avg_full = stats.bytes_2g_full / total
+    avg_compact = stats.bytes_2g_compact / total
+    print(f"\n📶 2G Answer Size (static fields): {avg_full:.0f} B verbose → {avg_compact:.0f} B compact ({(1 - avg_compact / avg_full) * 100:.0f}% smaller)")
 
 def main():
+    parser = argparse.ArgumentParser(description="Build GramSevak AI indices from the knowledge base")
+    parser.add_argument("--merge-duplicates", action="store_true",
+                        help="Keep one entry per near-duplicate cluster (others' variants and tags folded in)")
+    parser.add_argument("--dedupe-threshold", type=float, default=DEDUPE_THRESHOLD,
+                        help="Shingle Jaccard from which entries count as near-duplicates")
+    args = parser.parse_args()
+    
     print("🌾 GramSevak AI - Building Knowledge Base (Upgraded Schema)")
     print("="*60)
     
     start_time = time.time()
     
-    # Load all knowledge bases
+    # Near-duplicates are reported on every build; merging needs the
+    # clusters before the main pass, so it takes two quiet passes first
+    detector, merges, absorbed = None, {}, {}
+    if np is None:
+        print("\n⚠️  numpy not installed - skipping near-duplicate check")
+        if args.merge_duplicates:
+            print("❌ --merge-duplicates needs numpy")
+            return
+    elif args.merge_duplicates:
+        detector, merges, absorbed = plan_merges(args.dedupe_threshold)
+    
+    # Stream all knowledge bases: each entry is validated, written to its
+    # category index and folded into the offline cache and statistics, so
+    # memory stays bounded regardless of file size
     print("\n📖 Loading knowledge bases...")
-    all_entries, entries_by_category = load_knowledge_base()
-    
-    if not all_entries:
+    offline_cache = OfflineCacheBuilder()
+    stats = KBStatistics()
+    exact_map = {}
+    summary_tiers = {}
+    suggest_builder = SuggestIndexBuilder()
+    intent_builder = IntentModelBuilder()
+    language_builder = LanguageIndexBuilder()
+    scan_duplicates = np is not None and detector is None
+    if scan_duplicates:
+        detector = NearDuplicateDetector(args.dedupe_threshold)
+    
+    with CategoryIndexWriter() as index_writer:
+        for entry in iter_valid_entries():
+            # Merges stay within a category, so the intent model trains on
+            # every entry as written (same model with or without merging)
+            intent_builder.add(entry)
+            if entry["id"] in merges:
+                continue
+            if entry["id"] in absorbed:
+                merge_entries(entry, absorbed[entry["id"]])
+            if scan_duplicates:
+                detector.add(entry)
+            # Sentence-aware 2G/3G summaries, precomputed for the startup tier payloads
+            summaries = tier_summaries(entry)
+            if summaries:
+                summary_tiers[entry["id"]] = summaries
+            index_writer.add(entry)
+            offline_cache.add(entry)
+            stats.add(entry, summaries)
+            add_exact_match_keys(exact_map, entry)
+            suggest_builder.add(entry)
+            language_builder.add(entry)
+    
+    if not stats.total:
         print("\n❌ No valid entries found! Please check your knowledge base files.")
         return
     
     load_time = time.time() - start_time
     print(f"\n⏱️  Load Time: {load_time:.2f}s")
     
+    if detector is not None:
+        report_duplicates(detector, merged=bool(merges))
+    # Dropped id -> kept id, so golden sets and feedback for dropped ids still resolve
+    if merges:
+        merged_size = save_merged_entries(merges)
+        print(f"  ✅ Merged {len(merges)} entries into {len(absorbed)} ({merged_size / 1024:.2f} KB alias map)")
+    elif MERGED_ENTRIES_FILE.exists():
+        MERGED_ENTRIES_FILE.unlink()
+    
     # Generate offline cache
     print("\n💾 Generating offline cache...")
     frontend_path = Path(__file__).parent.parent / "frontend" / "offline_cache.json"
-    generate_offline_cache(all_entries, frontend_path)
-    
-    # Save category indices
-    save_category_indices(entries_by_category)
+    generate_offline_cache(offline_cache, frontend_path)
+    
+    # Category indices were written while streaming
+    index_writer.report()
+    
+    # Known questions -> entry ids, for the constant-time exact match stage
+    exact_size = save_exact_match_map(exact_map)
+    print(f"  ✅ Exact-match map: {len(exact_map)} questions ({exact_size / 1024:.2f} KB)")
+    
+    # Shortened 2G/3G summaries, read by the server's tier payload pass
+    tiers_size = save_summary_tiers(summary_tiers)
+    print(f"  ✅ Tier summaries: {len(summary_tiers)} entries ({tiers_size / 1024:.2f} KB)")
+    
+    # Typeahead over the same questions (picking one is an exact-match hit)
+    suggest_index = suggest_builder.build()
+    suggest_size = save_suggest_index(suggest_index)
+    print(f"  ✅ Suggest index: {len(suggest_index['keys'])} keys over {len(suggest_index['questions'])} questions ({suggest_size / 1024:.2f} KB)")
+    
+    # Per-script postings and synonym expansions (retrieval searches only the query's scripts)
+    language_index = language_builder.build()
+    language_size = save_language_index(language_index)
+    partitions = ", ".join(
+        f"{script} {len(words)}/{len(language_index['postings'].get(script, {}))}"
+        for script, words in sorted(language_index["words"].items())
+    )
+    print(f"  ✅ Language postings: {partitions} words/substrings ({language_size / 1024:.2f} KB)")
+    
+    # Trained intent classifier (question variants, tags and the keyword lists)
+    if np is None:
+        print("  ⚠️  numpy not installed - skipping intent model (classifier uses keywords)")
+    else:
+        intent_builder.add_keywords(IntentClassifier(model_file=None).category_keywords)
+        intent_model = intent_builder.build()
+        model_size = save_intent_model(intent_model)
+        cv = intent_model["cv"]
+        print(f"  ✅ Intent model: {len(intent_model['classes'])} classes from {intent_model['documents']} documents ({model_size / 1024:.2f} KB), "
+              f"held-out accuracy {cv['accuracy']:.1%}, log loss {cv['log_loss']:.3f}, temperature {intent_model['temperature']:.2f}")
     
     # Print statistics
-    print_statistics(all_entries, entries_by_category)
+    print_statistics(stats)
     
     total_time = time.time() - start_time
     print(f"\n⏱️  Total Build Time: {total_time:.2f}s")
@@ -268,7 +513,7 @@ def main():
     print("  4. Test with: 'पीएम किसान योजना क्या है?'")
     
     print("\n📋 Features:")
-    print("  ✅ Intent classification (8 categories)")
+    print("  ✅ Intent classification (8 categories, trained model)")
     print("  ✅ Category-based retrieval (<100ms)")
     print("  ✅ Safety filter (crisis detection)")
     print("  ✅ Confidence scoring")
@@ -0,0 +1,135 @@
+"""
+Circuit breaker for GramSevak AI's LLM stage
+After LLM_BREAKER_FAILURES consecutive failures (errors or calls that run
+past their deadline) the breaker opens and answer_query goes straight to
+the degraded keyword path instead of waiting on a provider that is down.
+After LLM_BREAKER_COOLDOWN_SECONDS one probe call is let through
+(half-open): success closes the breaker, failure opens it again.
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+# Most time the LLM stage may take per request (capped by the request deadline)
+LLM_TIMEOUT_MS = float(os.getenv("LLM_TIMEOUT_MS", "2500"))
+
+# Less budget than this left in the request = skip the LLM
+LLM_MIN_BUDGET_MS = float(os.getenv("LLM_MIN_BUDGET_MS", "200"))
+
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown_seconds: float = 30):
+        """
+        Args:
+            name: Shown in log lines
+            failure_threshold: Consecutive failures that open the breaker
+            cooldown_seconds: Time open before a probe call; also how long a
+                probe may stay unanswered before another is allowed
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None  # Set while a half-open probe is in flight
+        self.last_error = None
+        self.stats = {
+            "calls": 0, "successes": 0, "failures": 0, "timeouts": 0,
+            "rejected": 0, "opened": 0, "probes": 0
+        }
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead (False = use the degraded path)"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._opened_at < self.cooldown_seconds:
+                    self.stats["rejected"] += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probe_started = None
+
+            if self.state == HALF_OPEN:
+                # One probe at a time; a probe whose request went away is retried after the cooldown
+                if self._probe_started is not None and now - self._probe_started < self.cooldown_seconds:
+                    self.stats["rejected"] += 1
+                    return False
+                self._probe_started = now
+                self.stats["probes"] += 1
+
+            self.stats["calls"] += 1
+            return True
+
+    def is_open(self) -> bool:
+        """Whether allow() would refuse right now (counted as a rejection); never claims the probe"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                refused = now - self._opened_at < self.cooldown_seconds
+            elif self.state == HALF_OPEN:
+                refused = self._probe_started is not None and now - self._probe_started < self.cooldown_seconds
+            else:
+                refused = False
+            if refused:
+                self.stats["rejected"] += 1
+            return refused
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self._consecutive_failures = 0
+            if self.state != CLOSED:
+                print(f"✅ {self.name} circuit closed (probe succeeded)")
+                self.state = CLOSED
+                self._probe_started = None
+
+    def record_failure(self, error: str, timeout: bool = False):
+        with self._lock:
+            self.stats["failures"] += 1
+            if timeout:
+                self.stats["timeouts"] += 1
+            self.last_error = error
+            self._consecutive_failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                print(f"⚡ {self.name} circuit open for {self.cooldown_seconds:g}s "
+                      f"after {self._consecutive_failures} failures: {error}")
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+                self.stats["opened"] += 1
+
+    def snapshot(self) -> Dict:
+        """State and counters for /stats"""
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "cooldown_seconds": self.cooldown_seconds,
+                "probe_in_s": retry_in,
+                "last_error": self.last_error,
+                **self.stats
+            }
+
+def llm_time_budget(deadline: Optional[float]) -> float:
+    """Seconds the LLM stage may take: LLM_TIMEOUT_MS capped by what is left before the deadline (time.monotonic())"""
+    budget = LLM_TIMEOUT_MS / 1000
+    if deadline is not None:
+        budget = min(budget, deadline - time.monotonic())
+    return budget
@@ -0,0 +1,85 @@
+"""
+Adaptive gzip middleware for GramSevak AI
+Only compresses responses where gzip actually pays off: small bodies and
+bodies that barely shrink are sent as-is, saving CPU on every request
+"""
+
+import gzip
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Counters exposed through /stats
+GZIP_STATS = {
+    "compressed": 0,
+    "skipped_small": 0,
+    "skipped_no_gain": 0,
+    "bytes_saved": 0
+}
+
+class AdaptiveGZipMiddleware:
+    """
+    Gzip single-body responses that are large enough and compress well
+
+    Args:
+        minimum_size: Bodies smaller than this are never compressed
+        minimum_savings: Required fraction of bytes saved (0.1 = 10%)
+        compresslevel: zlib level (6 is much cheaper than 9 for similar size)
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024,
+                 minimum_savings: float = 0.1, compresslevel: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.minimum_savings = minimum_savings
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("Accept-Encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_adaptive(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                # Already encoded responses go out untouched
+                passthrough = "content-encoding" in Headers(raw=message["headers"])
+                if passthrough:
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streaming responses are sent uncompressed
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) < self.minimum_size:
+                GZIP_STATS["skipped_small"] += 1
+            else:
+                compressed = gzip.compress(body, compresslevel=self.compresslevel)
+                if len(compressed) <= len(body) * (1 - self.minimum_savings):
+                    GZIP_STATS["compressed"] += 1
+                    GZIP_STATS["bytes_saved"] += len(body) - len(compressed)
+                    headers = MutableHeaders(raw=start_message["headers"])
+                    headers["Content-Encoding"] = "gzip"
+                    headers["Content-Length"] = str(len(compressed))
+                    headers.add_vary_header("Accept-Encoding")
+                    message = {**message, "body": compressed}
+                else:
+                    GZIP_STATS["skipped_no_gain"] += 1
+
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_adaptive)
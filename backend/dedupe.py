@@ -0,0 +1,231 @@
+"""
+Near-duplicate detection for GramSevak AI knowledge base entries
+Each entry's question, title, summary and variants are normalized and cut
+into character shingles; a MinHash signature (NUM_PERM hash permutations,
+vectorized with NumPy) estimates Jaccard similarity, and LSH banding puts
+entries that agree on a whole band in the same bucket. Only entries that
+share a bucket are compared (exactly, on their shingle sets), so the pass
+stays close to linear as the KB grows instead of comparing every pair.
+
+build_index.py reports the clusters it finds; with --merge-duplicates the
+highest-confidence entry of each cluster absorbs the others' question
+variants and tags, and the rest are left out of the indices
+(indices/merged_entries.json maps each dropped id to the entry kept).
+Clusters never span categories: an entry only ever lives in its own
+category index, so merging a specific scheme into a generic entry of
+another category would hide it from category-filtered retrieval. Similar
+entries in different categories are reported but kept.
+
+Needs numpy; without it the build skips the check.
+"""
+
+import json
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from exact_match import normalize_question
+
+MERGED_ENTRIES_FILE = Path(__file__).parent / "indices" / "merged_entries.json"
+
+# Character shingle length (on normalized text, so it works for Devanagari and Latin alike)
+SHINGLE_SIZE = 5
+
+# MinHash permutations, split into LSH bands of NUM_PERM // LSH_BANDS rows.
+# 32 bands x 4 rows put pairs above ~0.42 estimated similarity in a shared
+# bucket (a pair at 0.6 is found with 99.9% probability, at 0.55 with 95%)
+NUM_PERM = 128
+LSH_BANDS = 32
+
+# Exact shingle Jaccard from which two entries count as duplicates. Scheme
+# entries repeated across files score 0.60-0.88; the closest distinct
+# entries score under 0.45
+DEDUPE_THRESHOLD = 0.55
+
+_PRIME = (1 << 31) - 1
+
+def entry_shingles(entry: Dict) -> Set[int]:
+    """Hashed character shingles of an entry's normalized question, title, summary and variants"""
+    parts = [entry.get("question_hi", ""), entry.get("title", ""), entry.get("summary", "")]
+    text = normalize_question(" ".join(parts + list(entry.get("question_variants", []))))
+    grams = [text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))]
+    # crc32 is stable across processes (unlike hash()), so reports are reproducible
+    return {zlib.crc32(gram.encode("utf-8")) & _PRIME for gram in grams if gram}
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class MinHasher:
+    """NUM_PERM universal hash permutations (a*x + b) mod p, fixed seed"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        if np is None:
+            raise RuntimeError("numpy is required for near-duplicate detection")
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.randint(0, _PRIME, size=num_perm, dtype=np.int64)
+
+    def signature(self, shingles: Set[int]):
+        """Minimum of every permutation over the shingles (one [shingles, perms] pass)"""
+        if not shingles:
+            return np.full(len(self.a), _PRIME, dtype=np.int64)
+        x = np.fromiter(shingles, dtype=np.int64, count=len(shingles))
+        return ((np.outer(x, self.a) + self.b) % _PRIME).min(axis=0)
+
+class NearDuplicateDetector:
+    """Collect signatures entry by entry (build_index.py streams the KB)"""
+
+    def __init__(self, threshold: float = DEDUPE_THRESHOLD, bands: int = LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.hasher = MinHasher()
+        self.entries = []  # (id, category, confidence_weight, shingles), load order
+        self._buckets = [{} for _ in range(bands)]  # per band: {band bytes: [entry positions]}
+        self._candidates = set()  # (earlier, later) positions sharing a bucket
+        self._verified = None  # Candidate pairs at or above the threshold, with similarity
+
+    def add(self, entry: Dict):
+        entry_id = entry.get("id")
+        if not entry_id:
+            return
+        position = len(self.entries)
+        shingles = entry_shingles(entry)
+        self.entries.append((entry_id, entry.get("category", "general"), entry.get("confidence_weight", 0), shingles))
+
+        signature = self.hasher.signature(shingles)
+        for band, buckets in enumerate(self._buckets):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            bucket = buckets.setdefault(key, [])
+            for other in bucket:
+                self._candidates.add((other, position))
+            bucket.append(position)
+
+    @property
+    def lsh_threshold(self) -> float:
+        """Similarity at which a pair shares a bucket with probability ~1/2"""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def _verified_pairs(self) -> List[tuple]:
+        """(i, j, similarity) of candidate pairs whose exact Jaccard reaches the threshold"""
+        if self._verified is None:
+            self._verified = []
+            for i, j in sorted(self._candidates):
+                similarity = jaccard(self.entries[i][3], self.entries[j][3])
+                if similarity >= self.threshold:
+                    self._verified.append((i, j, similarity))
+        return self._verified
+
+    def clusters(self) -> List[Dict]:
+        """
+        [{"canonical", "category", "duplicates": [{"id", "category", "similarity"}]}]
+
+        Verified pairs within the same category are joined into clusters
+        (union-find); each cluster keeps its highest confidence_weight entry
+        (first loaded on ties).
+        """
+        parent = list(range(len(self.entries)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j, _ in self._verified_pairs():
+            if self.entries[i][1] == self.entries[j][1]:
+                parent[find(j)] = find(i)
+
+        members = {}
+        for i in range(len(self.entries)):
+            members.setdefault(find(i), []).append(i)
+
+        clusters = []
+        for positions in members.values():
+            if len(positions) < 2:
+                continue
+            keep = max(positions, key=lambda i: (self.entries[i][2], -i))
+            kept_id, kept_category, _, kept_shingles = self.entries[keep]
+            clusters.append({
+                "canonical": kept_id,
+                "category": kept_category,
+                "duplicates": [
+                    {"id": self.entries[i][0], "category": self.entries[i][1],
+                     "similarity": round(jaccard(kept_shingles, self.entries[i][3]), 3)}
+                    for i in positions if i != keep
+                ]
+            })
+        return sorted(clusters, key=lambda c: -max(d["similarity"] for d in c["duplicates"]))
+
+    def cross_category_pairs(self) -> List[Dict]:
+        """[{"ids", "categories", "similarity"}] of similar entries in different categories (never merged)"""
+        pairs = [
+            {"ids": (self.entries[i][0], self.entries[j][0]),
+             "categories": (self.entries[i][1], self.entries[j][1]),
+             "similarity": round(similarity, 3)}
+            for i, j, similarity in self._verified_pairs() if self.entries[i][1] != self.entries[j][1]
+        ]
+        return sorted(pairs, key=lambda p: -p["similarity"])
+
+    def merge_plan(self, clusters: Optional[List[Dict]] = None) -> Dict[str, str]:
+        """{dropped id: id of the entry kept}"""
+        clusters = self.clusters() if clusters is None else clusters
+        return {d["id"]: c["canonical"] for c in clusters for d in c["duplicates"]}
+
+    def stats(self) -> Dict:
+        return {"entries": len(self.entries), "candidate_pairs": len(self._candidates),
+                "all_pairs": len(self.entries) * (len(self.entries) - 1) // 2}
+
+def merge_entries(canonical: Dict, duplicates: List[Dict]) -> Dict:
+    """Fold the duplicates' questions, variants and tags into the kept entry (in place)"""
+    variants = list(canonical.get("question_variants", []))
+    tags = list(canonical.get("tags", []))
+    seen = {normalize_question(v) for v in variants + [canonical.get("question_hi", "")]}
+    for duplicate in duplicates:
+        for question in [duplicate.get("question_hi", "")] + list(duplicate.get("question_variants", [])):
+            key = normalize_question(question)
+            if key and key not in seen:
+                seen.add(key)
+                variants.append(question)
+        tags += [tag for tag in duplicate.get("tags", []) if tag not in tags]
+    canonical["question_variants"] = variants
+    canonical["tags"] = tags
+    return canonical
+
+def apply_merges(entries: List[Dict], merges: Dict[str, str]) -> List[Dict]:
+    """
+    Entries as the indices hold them after --merge-duplicates: dropped ids
+    left out and their questions and tags folded into the kept entry
+    """
+    if not merges:
+        return entries
+    absorbed = {}
+    for entry in entries:
+        if entry.get("id") in merges:
+            absorbed.setdefault(merges[entry["id"]], []).append(entry)
+    return [
+        merge_entries(entry, absorbed[entry["id"]]) if entry.get("id") in absorbed else entry
+        for entry in entries if entry.get("id") not in merges
+    ]
+
+def save_merged_entries(merges: Dict[str, str], output_path: Path = MERGED_ENTRIES_FILE) -> int:
+    """Write {dropped id: kept id}; returns file size in bytes"""
+    output_path.parent.mkdir(exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(merges.items())), f, ensure_ascii=False, indent=2)
+    return output_path.stat().st_size
+
+def load_merged_entries(merged_file: Path = MERGED_ENTRIES_FILE) -> Dict[str, str]:
+    """{dropped id: kept id} of the last --merge-duplicates build ({} if none)"""
+    try:
+        with open(merged_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
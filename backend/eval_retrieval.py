@@ -0,0 +1,294 @@
+"""
+Retrieval quality + latency gate for GramSevak AI
+Evaluates a retrieval engine on a golden set built from the KB's
+question_variants (each variant must find its own entry) plus labelled
+real queries from golden_queries.json. Reports top-1/top-k accuracy,
+classifier accuracy and latency together, and exits non-zero when accuracy
+drops or latency regresses past the thresholds, so speedups can ship
+safely.
+
+An engine is a function (query, knowledge_base, category, k) -> ranked
+entry ids; an engine with a `candidates` parameter also gets the
+classifier's ranked (category, share) list for fan-out. Built-in engines
+are listed in ENGINES; others can be passed as module:function.
+
+Usage:
+    python eval_retrieval.py --output eval.json
+    python eval_retrieval.py --engine my_engine:retrieve --baseline eval.json
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import inspect
+import importlib
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from kb_loader import iter_entries, list_kb_files
+from intent_classifier import IntentClassifier
+from dedupe import apply_merges, load_merged_entries
+from rag_pipeline import (
+    FANOUT_MAX_CATEGORIES, MIN_MATCH_SCORE, exact_match_index, fanout_categories, fanout_weight,
+    language_index, rank_keyword_matches, select_search_kb
+)
+
+BACKEND_DIR = Path(__file__).parent
+LABELLED_QUERIES_FILE = BACKEND_DIR / "golden_queries.json"
+
+# Default gates (fractions of the golden set / milliseconds), just under the
+# current keyword retriever; the exact-match stage answers every variant, so
+# the remaining misses are labelled queries. The scoring engine alone sits
+# near 95% with the trained intent model, so run it with --min-top1 0.94.
+# The regex classifier (INTENT_CLASSIFIER=regex, or no numpy) scores about
+# 47% on categories and needs --min-classifier 0.45 --min-top1 0.96 --min-topk 0.97.
+MIN_TOP1 = 0.97
+MIN_TOPK = 0.98
+MIN_CLASSIFIER = 0.90
+MAX_P95_MS = 20.0
+
+# Allowed change against a --baseline run
+MAX_ACCURACY_DROP = 0.0
+MAX_LATENCY_REGRESSION = 0.25
+
+def scoring_engine(query: str, knowledge_base: List[Dict], category: str, k: int, candidates=None) -> List[str]:
+    """Category index or fan-out over candidate categories (as answer_query) + keyword scoring, without the exact-match stage"""
+    fanout = fanout_categories(candidates)
+    if len(fanout) < 2:
+        search_kb = language_index.narrow(select_search_kb(knowledge_base, category), query)
+        return [entry.get("id") for score, entry in rank_keyword_matches(query, search_kb, k) if score > MIN_MATCH_SCORE]
+
+    scored = []
+    for fanout_category, share in fanout:
+        search_kb = language_index.narrow(select_search_kb(knowledge_base, fanout_category), query)
+        scored.extend((score, share, entry) for score, entry in rank_keyword_matches(query, search_kb, k) if score > MIN_MATCH_SCORE)
+    max_score = max((score for score, _, _ in scored), default=0)
+    scored.sort(key=lambda item: -fanout_weight(item[0], max_score, item[1]))
+
+    ranked = []
+    for _, _, entry in scored:
+        if entry.get("id") not in ranked:
+            ranked.append(entry.get("id"))
+    return ranked[:k]
+
+def keyword_engine(query: str, knowledge_base: List[Dict], category: str, k: int, candidates=None) -> List[str]:
+    """Current retriever: exact question match first, then scoring_engine"""
+    exact_entry = exact_match_index.lookup(query, category)
+    ranked = scoring_engine(query, knowledge_base, category, k, candidates)
+    if exact_entry:
+        ranked = [exact_entry.get("id")] + [i for i in ranked if i != exact_entry.get("id")]
+    return ranked[:k]
+
+ENGINES = {
+    "keyword": keyword_engine,
+    "scoring": scoring_engine
+}
+
+def resolve_engine(name: str) -> Callable:
+    if name in ENGINES:
+        return ENGINES[name]
+    module_name, _, function_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def load_knowledge_base(kb_dir: Path) -> List[Dict]:
+    entries = []
+    for kb_file in list_kb_files(kb_dir):
+        entries.extend(iter_entries(kb_file))
+    return entries
+
+def build_golden_set(knowledge_base: List[Dict], labelled_file: Path, merged: Dict[str, str] = None) -> List[Dict]:
+    """
+    Golden cases as {"query", "entry_ids", "categories", "source"}
+
+    A variant shared by several entries (duplicate schemes across files)
+    accepts any of them. Ids merged away by build_index.py --merge-duplicates
+    are replaced by the entry that absorbed them.
+    """
+    merged = merged or {}
+    categories_by_id = {e["id"]: e.get("category", "general") for e in knowledge_base if e.get("id")}
+
+    ids_by_variant = {}
+    for entry in knowledge_base:
+        if not entry.get("id"):
+            continue
+        for variant in entry.get("question_variants", []):
+            ids = ids_by_variant.setdefault(variant.strip(), [])
+            if entry["id"] not in ids:
+                ids.append(entry["id"])
+
+    cases = [
+        {"query": variant, "entry_ids": ids, "source": "variant"}
+        for variant, ids in ids_by_variant.items()
+    ]
+
+    if labelled_file.exists():
+        with open(labelled_file, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                cases.append({"query": item["query"], "entry_ids": item["entry_ids"], "source": "labelled"})
+
+    for case in cases:
+        case["entry_ids"] = list(dict.fromkeys(merged.get(i, i) for i in case["entry_ids"]))
+        case["categories"] = sorted({categories_by_id[i] for i in case["entry_ids"] if i in categories_by_id})
+    return cases
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def evaluate(engine: Callable, cases: List[Dict], knowledge_base: List[Dict], k: int) -> Dict:
+    """Classify + retrieve every case, timing both together as /query does"""
+    classifier = IntentClassifier()
+    wants_candidates = "candidates" in inspect.signature(engine).parameters
+    latencies = []
+    top1 = topk = classifier_hits = 0
+    misses = []
+    by_source = {}
+
+    for case in cases:
+        with redirect_stdout(io.StringIO()):  # Silence retrieval log lines
+            query_start = time.perf_counter()
+            category, _, candidates = classifier.classify_top_k(case["query"], FANOUT_MAX_CATEGORIES)
+            if wants_candidates:
+                ranked = engine(case["query"], knowledge_base, category, k, candidates=candidates)
+            else:
+                ranked = engine(case["query"], knowledge_base, category, k)
+            latencies.append((time.perf_counter() - query_start) * 1000)
+
+        hit1 = bool(ranked) and ranked[0] in case["entry_ids"]
+        hitk = any(entry_id in case["entry_ids"] for entry_id in ranked[:k])
+        classified = category in case["categories"]
+
+        top1 += hit1
+        topk += hitk
+        classifier_hits += classified
+        source = by_source.setdefault(case["source"], {"cases": 0, "top1": 0, "topk": 0})
+        source["cases"] += 1
+        source["top1"] += hit1
+        source["topk"] += hitk
+
+        if not hit1:
+            misses.append({
+                "query": case["query"],
+                "expected": case["entry_ids"],
+                "got": ranked[:k],
+                "category": category,
+                "expected_categories": case["categories"]
+            })
+
+    total = len(cases)
+    latencies.sort()
+    return {
+        "cases": total,
+        "k": k,
+        "top1_accuracy": round(top1 / total, 4) if total else 0.0,
+        "topk_accuracy": round(topk / total, 4) if total else 0.0,
+        "classifier_accuracy": round(classifier_hits / total, 4) if total else 0.0,
+        "by_source": {
+            name: {
+                "cases": s["cases"],
+                "top1_accuracy": round(s["top1"] / s["cases"], 4),
+                "topk_accuracy": round(s["topk"] / s["cases"], 4)
+            }
+            for name, s in by_source.items()
+        },
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "mean": round(sum(latencies) / total, 3) if total else 0.0
+        },
+        "misses": misses
+    }
+
+def check_gates(report: Dict, args, baseline: Dict = None) -> List[str]:
+    """Failed gate descriptions (empty list = pass)"""
+    failures = []
+    if report["top1_accuracy"] < args.min_top1:
+        failures.append(f"top-1 accuracy {report['top1_accuracy']:.1%} < {args.min_top1:.1%}")
+    if report["topk_accuracy"] < args.min_topk:
+        failures.append(f"top-{report['k']} accuracy {report['topk_accuracy']:.1%} < {args.min_topk:.1%}")
+    if report["classifier_accuracy"] < args.min_classifier:
+        failures.append(f"classifier accuracy {report['classifier_accuracy']:.1%} < {args.min_classifier:.1%}")
+    if report["latency_ms"]["p95"] > args.max_p95_ms:
+        failures.append(f"p95 latency {report['latency_ms']['p95']:.2f}ms > {args.max_p95_ms:.2f}ms")
+
+    if baseline:
+        for metric in ("top1_accuracy", "topk_accuracy", "classifier_accuracy"):
+            if report[metric] < baseline[metric] - args.max_accuracy_drop:
+                failures.append(f"{metric} dropped: {baseline[metric]:.1%} → {report[metric]:.1%}")
+        base_p95 = baseline["latency_ms"]["p95"]
+        if base_p95 and report["latency_ms"]["p95"] > base_p95 * (1 + args.max_latency_regression):
+            failures.append(f"p95 latency regressed: {base_p95:.2f}ms → {report['latency_ms']['p95']:.2f}ms")
+    return failures
+
+def print_report(engine_name: str, report: Dict):
+    print("\n" + "=" * 60)
+    print(f"🎯 RETRIEVAL EVALUATION: {engine_name}")
+    print("=" * 60)
+    print(f"Golden cases:        {report['cases']}")
+    print(f"Top-1 accuracy:      {report['top1_accuracy']:.1%}")
+    print(f"Top-{report['k']} accuracy:      {report['topk_accuracy']:.1%}")
+    print(f"Classifier accuracy: {report['classifier_accuracy']:.1%}")
+    for name, source in report["by_source"].items():
+        print(f"  {name:<10} {source['cases']:>4} cases  top-1 {source['top1_accuracy']:.1%}  top-{report['k']} {source['topk_accuracy']:.1%}")
+    latency = report["latency_ms"]
+    print(f"Latency:             p50 {latency['p50']:.2f}ms  p95 {latency['p95']:.2f}ms  p99 {latency['p99']:.2f}ms")
+    print("=" * 60)
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval quality + latency gate")
+    parser.add_argument("--engine", default="keyword", help=f"One of {list(ENGINES)} or module:function")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--kb-dir", default=str(BACKEND_DIR / "knowledge_base"))
+    parser.add_argument("--labelled", default=str(LABELLED_QUERIES_FILE))
+    parser.add_argument("--min-top1", type=float, default=MIN_TOP1)
+    parser.add_argument("--min-topk", type=float, default=MIN_TOPK)
+    parser.add_argument("--min-classifier", type=float, default=MIN_CLASSIFIER)
+    parser.add_argument("--max-p95-ms", type=float, default=MAX_P95_MS)
+    parser.add_argument("--baseline", help="Previous --output file to compare against")
+    parser.add_argument("--max-accuracy-drop", type=float, default=MAX_ACCURACY_DROP)
+    parser.add_argument("--max-latency-regression", type=float, default=MAX_LATENCY_REGRESSION)
+    parser.add_argument("--output", help="Write JSON report to this file")
+    parser.add_argument("--show-misses", type=int, default=10, help="Top-1 misses to print")
+    args = parser.parse_args()
+
+    knowledge_base = load_knowledge_base(Path(args.kb_dir))
+    merged = load_merged_entries()
+    cases = build_golden_set(knowledge_base, Path(args.labelled), merged)
+    # Scored over the entries the server loads (merged duplicates left out)
+    knowledge_base = apply_merges(knowledge_base, merged)
+    exact_match_index.load(knowledge_base)
+    language_index.load(knowledge_base)
+    engine = resolve_engine(args.engine)
+
+    report = evaluate(engine, cases, knowledge_base, args.k)
+    print_report(args.engine, report)
+
+    for miss in report["misses"][:args.show_misses]:
+        print(f"❌ {miss['query']}  expected {miss['expected']}  got {miss['got']} ({miss['category']})")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["report"]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"engine": args.engine, "report": report}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Report written to {args.output}")
+
+    failures = check_gates(report, args, baseline)
+    if failures:
+        print(f"\n❌ Retrieval gate failed:")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+    print("\n✅ Retrieval gate passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Exact-match index for GramSevak AI
+Maps every normalized question_hi and question_variant to its entry ids,
+so a query that repeats a known question is answered with one dict
+lookup instead of scoring the knowledge base. Built by build_index.py
+(indices/exact_match.json) and loaded at startup; normalize_question is
+shared by both sides so keys always line up.
+"""
+
+import json
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+EXACT_MATCH_FILE = Path(__file__).parent / "indices" / "exact_match.json"
+
+def normalize_question(text: str) -> str:
+    """NFC, lowercase, ASCII digits, punctuation dropped and single spaces"""
+    text = unicodedata.normalize("NFC", text).lower()
+    chars = []
+    for ch in text:
+        if unicodedata.category(ch).startswith("P"):  # ?, ।, commas, hyphens, quotes
+            chars.append(" ")
+        elif ch.isdigit() and not ch.isascii():
+            chars.append(str(unicodedata.digit(ch)))
+        else:
+            chars.append(ch)
+    return " ".join("".join(chars).split())
+
+def entry_questions(entry: Dict) -> List[str]:
+    """Normalized question_hi and variants of one entry"""
+    questions = [entry.get("question_hi", "")] + list(entry.get("question_variants", []))
+    keys = []
+    for question in questions:
+        key = normalize_question(question) if question else ""
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+def add_exact_match_keys(exact_map: Dict[str, List[str]], entry: Dict):
+    """Add one entry's questions to a {normalized question: [entry ids]} map"""
+    entry_id = entry.get("id")
+    if not entry_id:
+        return
+    for key in entry_questions(entry):
+        ids = exact_map.setdefault(key, [])
+        if entry_id not in ids:
+            ids.append(entry_id)
+
+def build_exact_match_map(entries: Iterable[Dict]) -> Dict[str, List[str]]:
+    """{normalized question: [entry ids]} in knowledge base order"""
+    exact_map = {}
+    for entry in entries:
+        add_exact_match_keys(exact_map, entry)
+    return exact_map
+
+def save_exact_match_map(exact_map: Dict[str, List[str]], output_path: Path = EXACT_MATCH_FILE) -> int:
+    """Write the map; returns file size in bytes"""
+    output_path.parent.mkdir(exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(exact_map, f, ensure_ascii=False, separators=(",", ":"))
+    return output_path.stat().st_size
+
+class ExactMatchIndex:
+    def __init__(self):
+        self._entries = {}  # {normalized question: [entries]}
+        self.metrics = {"keys": 0, "lookups": 0, "hits": 0}
+
+    def load(self, knowledge_base: List[Dict], index_file: Optional[Path] = EXACT_MATCH_FILE) -> str:
+        """
+        Resolve the built map against loaded entries; rebuilt from the
+        knowledge base if the file is missing (or None). Returns where it
+        came from.
+        """
+        exact_map = None
+        if index_file:
+            try:
+                with open(index_file, "r", encoding="utf-8") as f:
+                    exact_map = json.load(f)
+            except (OSError, ValueError):
+                pass
+        source = "file" if exact_map is not None else "knowledge_base"
+        if exact_map is None:
+            exact_map = build_exact_match_map(knowledge_base)
+
+        entries_by_id = {}
+        for entry in knowledge_base:
+            entries_by_id.setdefault(entry.get("id"), entry)
+
+        # Ids missing from the loaded KB (stale file) are skipped
+        self._entries = {}
+        for key, ids in exact_map.items():
+            entries = [entries_by_id[i] for i in ids if i in entries_by_id]
+            if entries:
+                self._entries[key] = entries
+        self.metrics["keys"] = len(self._entries)
+        return source
+
+    def lookup(self, query: str, category: Optional[str] = None) -> Optional[Dict]:
+        """Entry whose question matches the query, preferring the given category"""
+        self.metrics["lookups"] += 1
+        entries = self._entries.get(normalize_question(query))
+        if not entries:
+            return None
+        self.metrics["hits"] += 1
+        for entry in entries:
+            if entry.get("category") == category:
+                return entry
+        return entries[0]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,256 @@
+"""
+Feedback store for GramSevak AI
+/feedback votes (entry id, helpful, response id, category) and the
+(response id, entry id) of every answer /query serves are appended to a
+JSONL log by a background thread: the request only queues the record, and
+the writer group-commits everything that arrives within
+FEEDBACK_FSYNC_SECONDS with one write + fsync. Files rotate by size like
+the query log (feedback.jsonl, .1, .2, ...). aggregate_feedback.py turns
+the retained files into per-entry helpfulness priors
+(indices/feedback_priors.json), counting only votes for answers the log
+shows were served; retrieval loads the priors as keyword score boosts and
+re-reads them when the file changes.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from query_log import log_files
+
+# Log file (empty = disabled); relative paths are under backend/. Rotated
+# backups bound what each aggregation reads: priors cover the votes still in them
+FEEDBACK_LOG_PATH = os.getenv("FEEDBACK_LOG_PATH", "logs/feedback.jsonl")
+FEEDBACK_LOG_MAX_MB = float(os.getenv("FEEDBACK_LOG_MAX_MB", "10"))
+FEEDBACK_LOG_BACKUPS = int(os.getenv("FEEDBACK_LOG_BACKUPS", "5"))
+
+# Longest a vote waits before its batch is written and fsynced
+FEEDBACK_FSYNC_SECONDS = float(os.getenv("FEEDBACK_FSYNC_SECONDS", "1"))
+
+# Votes waiting to be written; when full, new votes are dropped
+FEEDBACK_QUEUE_SIZE = 10000
+
+FEEDBACK_PRIORS_FILE = Path(__file__).parent / "indices" / "feedback_priors.json"
+
+# Seconds between checks for a newer priors file
+FEEDBACK_PRIORS_RELOAD_SECONDS = float(os.getenv("FEEDBACK_PRIORS_RELOAD_SECONDS", "60"))
+
+# Aggregation: votes an entry needs before it gets a prior, weight of the
+# global helpful rate in the smoothed estimate (in votes), and the largest
+# boost in keyword score points (a tag hit is 15, a synonym hit 10)
+FEEDBACK_MIN_VOTES = 5
+FEEDBACK_PRIOR_STRENGTH = 10
+FEEDBACK_MAX_BOOST = 5
+
+class FeedbackLog:
+    """Append-only JSONL writer with size-based rotation; batches are fsynced together (group commit)"""
+
+    def __init__(self, path: Path, max_bytes: int, backups: int, fsync_seconds: float = FEEDBACK_FSYNC_SECONDS):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.fsync_seconds = fsync_seconds
+        self._queue = queue.Queue(maxsize=FEEDBACK_QUEUE_SIZE)
+        self._thread = None
+        self.stats = {"logged": 0, "served": 0, "dropped": 0, "batches": 0, "rotations": 0, "errors": 0}
+
+    def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="feedback-log", daemon=True)
+        self._thread.start()
+
+    def log(self, record: Dict):
+        """Queue a vote without blocking (dropped if the writer falls behind)"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def served(self, response_id: str, entry_id: str):
+        """Queue the entry an answer was served with; votes quoting the response are checked against it"""
+        self.log({"ts": round(time.time(), 3), "response_id": response_id, "served": entry_id})
+
+    def close(self, timeout: float = 5.0):
+        """Write and fsync queued votes, then stop the writer thread"""
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Everything arriving within the fsync interval shares one write + fsync
+            commit_at = time.monotonic() + self.fsync_seconds
+            while batch[-1] is not None and len(batch) < 1000:
+                remaining = commit_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            records = [r for r in batch if r is not None]
+            if records:
+                self._write(records)
+            if batch[-1] is None:
+                return
+
+    def _write(self, records: List[Dict]):
+        lines = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+        try:
+            if self.path.exists() and self.path.stat().st_size + len(lines.encode("utf-8")) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            served = sum(1 for r in records if "served" in r)
+            self.stats["served"] += served
+            self.stats["logged"] += len(records) - served
+            self.stats["batches"] += 1
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Feedback log write failed: {e}")
+
+    def _rotate(self):
+        """feedback.jsonl -> .1 -> .2 ...; the oldest backup is removed"""
+        for i in range(self.backups - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{i}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self.stats["rotations"] += 1
+
+def create_feedback_log() -> Optional[FeedbackLog]:
+    """Writer configured from the environment, or None if disabled"""
+    if not FEEDBACK_LOG_PATH:
+        return None
+    path = Path(FEEDBACK_LOG_PATH)
+    if not path.is_absolute():
+        path = Path(__file__).parent / path
+    return FeedbackLog(path, int(FEEDBACK_LOG_MAX_MB * 1024 * 1024), FEEDBACK_LOG_BACKUPS)
+
+def iter_feedback(path: Path) -> Iterator[Dict]:
+    """Served and vote records of the log and its backups, oldest first; a torn line (crash mid-write) is skipped"""
+    for log_file in log_files(path):
+        with open(log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+def aggregate_feedback(records: Iterable[Dict], known_ids: Optional[set] = None) -> Dict:
+    """
+    {"entries": {entry_id: {"helpful", "not_helpful", "boost"}}, ...}
+
+    A vote only counts if a served record shows its response was answered
+    with that entry; the ids are posted by the client, so anything else may
+    be forged (or is a vote for an answer rotated out of the log).
+    One vote per response (the last one counts). The helpful rate of each
+    entry is smoothed towards the global rate with FEEDBACK_PRIOR_STRENGTH
+    pseudo-votes and mapped to a boost in [-FEEDBACK_MAX_BOOST, +FEEDBACK_MAX_BOOST]
+    points relative to the global rate; entries with fewer than
+    FEEDBACK_MIN_VOTES votes get none.
+    """
+    served = {}
+    candidates = {}
+    for record in records:
+        if "served" in record:
+            served[record.get("response_id")] = record["served"]
+            continue
+        entry_id = record.get("entry_id")
+        if not entry_id or (known_ids is not None and entry_id not in known_ids):
+            continue
+        candidates[record.get("response_id")] = (entry_id, bool(record.get("helpful")))
+
+    # Checked after the pass, so a vote counts wherever its served record sits in the log
+    votes = {}
+    unmatched = 0
+    for response_id, (entry_id, helpful) in candidates.items():
+        if response_id is None or served.get(response_id) != entry_id:
+            unmatched += 1
+            continue
+        votes[response_id] = (entry_id, helpful)
+
+    counts = {}
+    for entry_id, helpful in votes.values():
+        count = counts.setdefault(entry_id, [0, 0])
+        count[0 if helpful else 1] += 1
+
+    total = len(votes)
+    global_rate = sum(c[0] for c in counts.values()) / total if total else 0.5
+    entries = {}
+    for entry_id, (helpful, not_helpful) in sorted(counts.items()):
+        n = helpful + not_helpful
+        if n < FEEDBACK_MIN_VOTES:
+            continue
+        rate = (helpful + FEEDBACK_PRIOR_STRENGTH * global_rate) / (n + FEEDBACK_PRIOR_STRENGTH)
+        # +1 = always helpful, -1 = never helpful, 0 = as helpful as the average entry
+        room = (1 - global_rate) if rate >= global_rate else global_rate
+        spread = (rate - global_rate) / room if room else 0.0
+        entries[entry_id] = {
+            "helpful": helpful,
+            "not_helpful": not_helpful,
+            "boost": round(FEEDBACK_MAX_BOOST * spread)
+        }
+    return {"votes": total, "unmatched": unmatched, "served": len(served), "global_helpful_rate": round(global_rate, 4), "entries": entries}
+
+def save_feedback_priors(priors: Dict, output_path: Path = FEEDBACK_PRIORS_FILE) -> int:
+    """Write the priors (replacing the old file atomically); returns file size in bytes"""
+    output_path.parent.mkdir(exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(priors, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, output_path)
+    return output_path.stat().st_size
+
+class FeedbackPriors:
+    """Per-entry keyword score boosts, re-read when the priors file changes"""
+
+    def __init__(self, priors_file: Optional[Path] = FEEDBACK_PRIORS_FILE):
+        self.priors_file = priors_file
+        self.boosts = {}  # {entry_id: points}, non-zero only
+        self._mtime = None
+        self._next_check = 0.0
+        self.stats = {"entries": 0, "votes": 0, "loads": 0}
+
+    def load(self) -> bool:
+        """(Re)load the priors file; False if missing or unreadable (boosts unchanged)"""
+        if not self.priors_file:
+            return False
+        try:
+            mtime = os.stat(self.priors_file).st_mtime
+            with open(self.priors_file, "r", encoding="utf-8") as f:
+                priors = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.boosts = {
+            entry_id: prior["boost"] for entry_id, prior in priors.get("entries", {}).items() if prior.get("boost")
+        }
+        self._mtime = mtime
+        self.stats.update(entries=len(self.boosts), votes=priors.get("votes", 0))
+        self.stats["loads"] += 1
+        return True
+
+    def refresh(self):
+        """Reload if the file changed; checks at most every FEEDBACK_PRIORS_RELOAD_SECONDS"""
+        now = time.monotonic()
+        if now < self._next_check or not self.priors_file:
+            return
+        self._next_check = now + FEEDBACK_PRIORS_RELOAD_SECONDS
+        try:
+            mtime = os.stat(self.priors_file).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime and self.load():
+            print(f"✓ Feedback priors reloaded: {len(self.boosts)} entries boosted")
@@ -0,0 +1,257 @@
+"""
+Category index manager for GramSevak AI
+Loads per-category indices on demand, prewarms the busiest categories at
+startup and keeps resident indices within a memory budget by evicting the
+least recently used (cold) categories. The budget is measured on parsed
+objects and also covers the always-resident data the server reports as
+its baseline (knowledge base, tier payloads). Index files are parsed
+outside the manager's lock, so lookups of resident categories never wait
+behind a cold load
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Budget for the baseline plus resident indices, measured on parsed objects
+INDEX_MEMORY_BUDGET_MB = float(os.getenv("INDEX_MEMORY_BUDGET_MB", "64"))
+
+# Startup prewarm: "auto" (categories with recent traffic, busiest first),
+# "all", "none", "top:N" or a comma-separated list of categories
+INDEX_PREWARM = os.getenv("INDEX_PREWARM", "auto")
+
+def object_bytes(value) -> int:
+    """Approximate memory held by parsed JSON-like data (shared objects counted once)"""
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return total
+
+class CategoryIndexManager:
+    def __init__(self, indices_dir: Path, memory_budget_bytes: int,
+                 on_load: Optional[Callable[[str, List[Dict]], None]] = None,
+                 on_evict: Optional[Callable[[str, List[Dict]], None]] = None):
+        """
+        Args:
+            indices_dir: Directory holding <category>_index.json files
+            memory_budget_bytes: Max parsed size of the baseline plus resident indices
+            on_load: Called with (category, entries) after a load
+            on_evict: Called with (category, entries) after an eviction
+        """
+        self.indices_dir = Path(indices_dir)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.on_load = on_load
+        self.on_evict = on_evict
+        self.baseline_bytes = 0  # Always-resident data sharing the budget (set by the server)
+
+        self._indices = OrderedDict()  # {category: entries}, LRU order
+        self._sizes = {}  # {category: parsed bytes}
+        self._generations = {}  # {category: file mtime at load}
+        self._loading = {}  # {category: lock held while its file is parsed}
+        self._lock = threading.RLock()
+
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "load_errors": 0,
+            "evictions": 0,
+            "prewarmed": 0,
+            "load_ms_total": 0.0,
+            "last_load_ms": {}
+        }
+
+    def index_file(self, category: str) -> Path:
+        return self.indices_dir / f"{category}_index.json"
+
+    def available_categories(self) -> List[str]:
+        """Categories with a built index file, in name order"""
+        return sorted(p.name[:-len("_index.json")] for p in self.indices_dir.glob("*_index.json"))
+
+    def get(self, category: str) -> List[Dict]:
+        """Return a category's entries, loading (and evicting) as needed"""
+        with self._lock:
+            entries = self._indices.get(category)
+            if entries is not None:
+                self._indices.move_to_end(category)
+                self.metrics["hits"] += 1
+                return entries
+            self.metrics["misses"] += 1
+        return self._load(category)
+
+    def _load(self, category: str, enforce_budget: bool = True) -> List[Dict]:
+        """Parse a category's file outside the manager lock (one parse per category at a time), then install it"""
+        with self._lock:
+            loading = self._loading.setdefault(category, threading.Lock())
+        with loading:
+            try:
+                with self._lock:
+                    entries = self._indices.get(category)
+                    if entries is not None:  # Installed by the thread we waited for
+                        self._indices.move_to_end(category)
+                        return entries
+                return self._read_and_install(category, enforce_budget)
+            finally:
+                with self._lock:
+                    self._loading.pop(category, None)
+
+    def _read_and_install(self, category: str, enforce_budget: bool) -> List[Dict]:
+        index_file = self.index_file(category)
+
+        if not index_file.exists():
+            print(f"⚠️  Category index not found: {category}")
+            return []
+
+        load_start = time.perf_counter()
+        try:
+            stat = index_file.stat()
+            with open(index_file, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception as e:
+            self.metrics["load_errors"] += 1
+            print(f"❌ Error loading category index {category}: {e}")
+            return []
+        load_ms = (time.perf_counter() - load_start) * 1000
+        size = object_bytes(entries)
+        if self.on_load:
+            self.on_load(category, entries)
+
+        with self._lock:
+            self._indices[category] = entries
+            self._sizes[category] = size
+            self._generations[category] = int(stat.st_mtime)
+            self.metrics["loads"] += 1
+            self.metrics["load_ms_total"] += load_ms
+            self.metrics["last_load_ms"][category] = round(load_ms, 2)
+            print(f"📂 Loaded {len(entries)} entries for category: {category} ({load_ms:.1f}ms, {size / 1024:.0f} KB)")
+            if enforce_budget:
+                self._enforce_budget(keep=category)
+        return entries
+
+    def over_budget(self) -> bool:
+        return self.baseline_bytes + self.resident_bytes() > self.memory_budget_bytes
+
+    def _enforce_budget(self, keep: str):
+        """Evict least recently used categories until within budget"""
+        with self._lock:
+            while self.over_budget() and len(self._indices) > 1:
+                category = next(iter(self._indices))
+                if category == keep:
+                    break
+                self.evict(category)
+
+    def evict(self, category: str) -> bool:
+        with self._lock:
+            entries = self._indices.pop(category, None)
+            if entries is None:
+                return False
+            self._sizes.pop(category, None)
+            self._generations.pop(category, None)
+            self.metrics["evictions"] += 1
+            if self.on_evict:
+                self.on_evict(category, entries)
+            print(f"♻️  Evicted cold category index: {category}")
+            return True
+
+    def prewarm(self, categories: List[str]) -> List[str]:
+        """Load categories in priority order while they fit in the budget"""
+        loaded = []
+        for category in categories:
+            if category in self._indices or not self.index_file(category).exists():
+                continue
+            if self.over_budget():
+                break
+            # No eviction here: a later (colder) category must not push out a busier one
+            if not self._load(category, enforce_budget=False):
+                continue
+            if self.over_budget() and loaded:
+                self.evict(category)
+                break
+            loaded.append(category)
+            self.metrics["prewarmed"] += 1
+        return loaded
+
+    def export_resident(self) -> Dict[str, List[Dict]]:
+        """Resident indices in LRU order (for the startup snapshot)"""
+        with self._lock:
+            return dict(self._indices)
+
+    def restore(self, indices: Dict[str, List[Dict]]) -> List[str]:
+        """Make snapshot indices resident without reading the index files"""
+        restored = []
+        with self._lock:
+            for category, entries in indices.items():
+                index_file = self.index_file(category)
+                if not index_file.exists():
+                    continue
+                stat = index_file.stat()
+                self._indices[category] = entries
+                self._sizes[category] = object_bytes(entries)
+                self._generations[category] = int(stat.st_mtime)
+                if self.on_load:
+                    self.on_load(category, entries)
+                restored.append(category)
+                self._enforce_budget(keep=category)
+        return restored
+
+    def resident_categories(self) -> List[str]:
+        """Categories loaded right now, least recently used first"""
+        with self._lock:
+            return list(self._indices)
+
+    def resident_bytes(self) -> int:
+        """Parsed size of the resident indices (baseline not included)"""
+        return sum(self._sizes.values())
+
+    def generations(self) -> Dict[str, int]:
+        return dict(self._generations)
+
+    def stats(self) -> Dict:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "last_load_ms": dict(self.metrics["last_load_ms"]),
+            "load_ms_total": round(self.metrics["load_ms_total"], 2),
+            "hit_ratio": round(self.metrics["hits"] / lookups, 3) if lookups else 0.0,
+            "resident_categories": self.resident_categories(),
+            "resident_bytes": self.resident_bytes(),
+            "baseline_bytes": self.baseline_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes
+        }
+
+def prewarm_order(setting: str, all_categories: List[str], category_counts: Dict[str, int]) -> List[str]:
+    """
+    Resolve an INDEX_PREWARM setting into an ordered category list
+
+    "auto" takes the categories with recent queries, busiest first (no
+    traffic yet = nothing prewarmed); "all" loads every category in that
+    order (unseen ones last); "top:N" keeps the first N of it.
+    """
+    setting = (setting or "").strip().lower()
+    if setting in ("", "none", "off"):
+        return []
+
+    ranked = sorted(all_categories, key=lambda c: -category_counts.get(c, 0))
+    if setting == "auto":
+        return [c for c in ranked if category_counts.get(c, 0) > 0]
+    if setting == "all":
+        return ranked
+    if setting.startswith("top:"):
+        return ranked[:int(setting.split(":", 1)[1])]
+    return [c.strip() for c in setting.split(",") if c.strip()]
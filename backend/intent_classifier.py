@@ -1,14 +1,30 @@
 """
 Intent Classifier for GramSevak AI
-Fast rule-based classifier using keyword mapping (<5ms)
+Trained Naive Bayes model (intent_model.py) with calibrated probabilities,
+falling back to the rule-based keyword mapping (<5ms) without numpy or
+indices/intent_model.npz
 """
 
+import os
 import re
-from typing import Dict, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from exact_match import normalize_question
+from intent_model import IntentModel, INTENT_MODEL_FILE, top_classes
+
+# model = trained classifier when available, regex = keyword scan only
+INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "model").lower()
+
+# Below this top probability the query is 'general' (search every category)
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.3"))
+
+# Below this share of words the model has seen in training the query is 'general'
+INTENT_MIN_KNOWN = float(os.getenv("INTENT_MIN_KNOWN", "0.5"))
 
 class IntentClassifier:
-    def __init__(self):
-        """Initialize keyword mappings for each category"""
+    def __init__(self, model_file: Optional[Path] = INTENT_MODEL_FILE):
+        """Initialize keyword mappings for each category and load the trained model"""
         
         # Category keyword mappings (Hindi + English + Hinglish)
         self.category_keywords = {
@@ -110,12 +126,52 @@ class IntentClassifier:
             ]
         }
         
+        # Small talk: a query made only of these words is 'general' rather than
+        # whichever category happens to share a word with it ("naam" only
+        # occurs in a scheme list variant, so "mera naam kya hai" scored 0.61
+        # for government_schemes)
+        small_talk_phrases = [
+            # Hindi
+            'मेरा नाम क्या है', 'आपका नाम क्या है', 'तुम्हारा नाम क्या है', 'आप कौन हो',
+            'तुम कौन हो', 'नमस्ते', 'कैसे हो', 'क्या हाल है', 'धन्यवाद', 'शुक्रिया',
+            'कोई गाना सुनाओ', 'चुटकुला सुनाओ',
+            # Hinglish / English
+            'mera naam kya hai', 'mera naam batao', 'aap ka naam', 'aapka naam kya hai', 'tumhara naam kya hai', 'aap kaun ho',
+            'tum kaun ho', 'namaste', 'kaise ho', 'kya haal hai', 'dhanyavad', 'shukriya',
+            'what is your name', 'who are you', 'hello', 'hi', 'how are you', 'good morning',
+            'thank you', 'tell me a joke', 'cricket score', 'movie', 'song'
+        ]
+        self.small_talk_words = {word for phrase in small_talk_phrases for word in normalize_question(phrase).split()}
+        
         # Compile regex patterns for faster matching
         self.category_patterns = {}
         for category, keywords in self.category_keywords.items():
             # Create regex pattern with word boundaries
             pattern = '|'.join([re.escape(kw) for kw in keywords])
             self.category_patterns[category] = re.compile(pattern, re.IGNORECASE)
+        
+        self.model = IntentModel.load(model_file) if INTENT_CLASSIFIER == "model" else None
+    
+    @property
+    def backend(self) -> str:
+        return "model" if self.model else "regex"
+    
+    def category_scores(self, query: str) -> Dict[str, float]:
+        """Keyword score per matching category (empty = no category indicated)"""
+        # Normalize query
+        query_lower = query.lower().strip()
+        
+        # Count matches for each category
+        category_scores = {}
+        
+        for category, pattern in self.category_patterns.items():
+            matches = pattern.findall(query_lower)
+            if matches:
+                # Score based on number of matches and match length
+                score = len(matches) + sum(len(m) for m in matches) / 100
+                category_scores[category] = score
+        
+        return category_scores
     
     def classify(self, query: str) -> Tuple[str, float]:
         """
@@ -129,39 +185,70 @@ class IntentClassifier:
             category: One of the 8 categories or 'general'
             confidence_score: 0.0 to 1.0
         """
-        # Normalize query
-        query_lower = query.lower().strip()
+        category, confidence, _ = self.classify_top_k(query, 1)
+        return category, confidence
+    
+    def classify_top_k(self, query: str, k: int = 3) -> Tuple[str, float, List[Tuple[str, float]]]:
+        """
+        classify() plus the ranked category distribution, for fan-out retrieval
         
-        # Count matches for each category
-        category_scores = {}
+        Returns:
+            (category, confidence_score, top_k): top_k is up to k
+            (category, share) pairs, best first, where share is the
+            model's probability of the category (regex: its fraction of
+            the total keyword score); empty for 'general' (search everything)
+        """
+        words = normalize_question(query).split()
+        if self.is_small_talk(words):
+            return 'general', 0.0, []
         
-        for category, pattern in self.category_patterns.items():
-            matches = pattern.findall(query_lower)
-            if matches:
-                # Score based on number of matches and match length
-                score = len(matches) + sum(len(m) for m in matches) / 100
-                category_scores[category] = score
+        if self.model:
+            probs, known = self.model.predict_words(words)
+            return self._from_probabilities(probs, known, k)
+        
+        category_scores = self.category_scores(query)
         
         # If no matches found, return general
         if not category_scores:
-            return 'general', 0.0
+            return 'general', 0.0, []
         
-        # Get category with highest score
-        best_category = max(category_scores, key=category_scores.get)
-        max_score = category_scores[best_category]
+        # Highest score first (ties keep category order)
+        ranked = sorted(category_scores.items(), key=lambda item: -item[1])
+        best_category, max_score = ranked[0]
+        total = sum(category_scores.values())
+        top_k = [(category, round(score / total, 3)) for category, score in ranked[:k]]
         
+        return best_category, self.score_confidence(max_score), top_k
+    
+    def is_small_talk(self, words: List[str]) -> bool:
+        """Every word of the normalized query is small talk (greetings, names, thanks)"""
+        return bool(words) and all(word in self.small_talk_words for word in words)
+    
+    def classify_batch(self, queries: List[str], k: int = 3) -> List[Tuple[str, float, List[Tuple[str, float]]]]:
+        """classify_top_k() for each query"""
+        return [self.classify_top_k(query, k) for query in queries]
+    
+    def _from_probabilities(self, probs, known: float, k: int) -> Tuple[str, float, List[Tuple[str, float]]]:
+        """(category, probability, top_k); 'general' when most words are unseen
+        or no category is likely enough"""
+        top_k = top_classes(probs, self.model.classes, k)
+        best_category, confidence = top_k[0]
+        if known < INTENT_MIN_KNOWN or confidence < INTENT_MIN_CONFIDENCE:
+            return 'general', 0.0, []
+        return best_category, confidence, top_k
+    
+    @staticmethod
+    def score_confidence(max_score: float) -> float:
         # Calculate confidence (normalize to 0-1 range)
         # High confidence if score > 2, medium if > 1, low otherwise
         if max_score >= 3:
-            confidence = 0.95
+            return 0.95
         elif max_score >= 2:
-            confidence = 0.85
+            return 0.85
         elif max_score >= 1:
-            confidence = 0.70
+            return 0.70
         else:
-            confidence = 0.50
-        
-        return best_category, confidence
+            return 0.50
     
     def get_category_file(self, category: str) -> str:
         """
@@ -204,7 +291,7 @@ if __name__ == "__main__":
         "scholarship के लिए apply कैसे करें?"
     ]
     
-    print("Testing Intent Classifier:\n")
+    print(f"Testing Intent Classifier ({classifier.backend}):\n")
     for query in test_queries:
         category, confidence = classifier.classify(query)
         print(f"Query: {query}")
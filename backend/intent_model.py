@@ -0,0 +1,235 @@
+"""
+Trained intent model for GramSevak AI
+Multinomial Naive Bayes over hashed character n-grams (plus whole words),
+trained by build_index.py from each entry's question, question_variants,
+tags and title, and from the IntentClassifier keyword lists. Stored as a
+NumPy weight matrix (indices/intent_model.npz); a query is scored with one
+sparse dot product (weights of its hashed features times their counts),
+and softmax with a temperature fitted by cross-validation at build time
+turns the scores into calibrated probabilities.
+
+Needs numpy; without it (or without the model file) IntentClassifier
+keeps using its regex keyword scan.
+"""
+
+import zlib
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from exact_match import normalize_question
+
+INTENT_MODEL_FILE = Path(__file__).parent / "indices" / "intent_model.npz"
+
+# Hashed feature space (columns of the weight matrix)
+FEATURE_BITS = 15
+FEATURE_MASK = (1 << FEATURE_BITS) - 1
+
+NGRAM_SIZES = (2, 3, 4)
+
+# Additive (Laplace) smoothing of per-class feature counts
+SMOOTHING = 0.1
+
+# Softmax temperatures tried when calibrating
+TEMPERATURES = [0.25 * 2 ** (i / 2) for i in range(17)]  # 0.25 .. 64
+
+CALIBRATION_FOLDS = 5
+
+# Hashed features per word, filled as words are seen (query vocabulary is small and repetitive)
+WORD_CACHE_SIZE = 50000
+_word_features: Dict[str, Tuple[int, ...]] = {}
+
+def word_features(word: str) -> Tuple[int, ...]:
+    """Hashed character n-grams of one word plus the word itself"""
+    features = _word_features.get(word)
+    if features is None:
+        padded = f" {word} "
+        grams = [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+        grams.append(padded)
+        # crc32 is stable across processes (unlike hash()), so build and serve agree
+        features = tuple(zlib.crc32(gram.encode("utf-8")) & FEATURE_MASK for gram in grams)
+        if len(_word_features) < WORD_CACHE_SIZE:
+            _word_features[word] = features
+    return features
+
+def words_features(words: List[str]) -> Dict[int, int]:
+    """{hashed feature: count} for character n-grams of each normalized word and the words themselves"""
+    counts = {}
+    for word in words:
+        for feature in word_features(word):
+            counts[feature] = counts.get(feature, 0) + 1
+    return counts
+
+def text_features(text: str) -> Dict[int, int]:
+    return words_features(normalize_question(text).split())
+
+def entry_texts(entry: Dict) -> List[str]:
+    """Training documents of one knowledge base entry"""
+    texts = [entry.get("question_hi", ""), entry.get("title", "")]
+    texts += list(entry.get("question_variants", []))
+    texts += list(entry.get("tags", []))
+    return [t for t in texts if t]
+
+class IntentModelBuilder:
+    """Collect labelled documents entry by entry (build_index.py streams the KB)"""
+
+    def __init__(self):
+        self.documents = []  # (category, features, group); group keeps an entry's texts in one CV fold
+
+    def add(self, entry: Dict):
+        category = entry.get("category")
+        if not category:
+            return
+        for text in entry_texts(entry):
+            self.documents.append((category, text_features(text), entry.get("id")))
+
+    def add_keywords(self, category_keywords: Dict[str, List[str]]):
+        """Classifier keyword lists as extra documents (never held out)"""
+        for category, keywords in category_keywords.items():
+            for keyword in keywords:
+                self.documents.append((category, text_features(keyword), None))
+
+    def build(self) -> Dict:
+        """Weights, priors, classes and calibrated temperature, plus CV metrics"""
+        if np is None:
+            raise RuntimeError("numpy is required to train the intent model")
+        classes = sorted({category for category, _, _ in self.documents})
+        log_prob, log_prior = train(self.documents, classes)
+        temperature, cv = calibrate(self.documents, classes)
+        return {
+            "classes": classes,
+            "log_prob": log_prob,
+            "log_prior": log_prior,
+            "temperature": temperature,
+            "documents": len(self.documents),
+            "cv": cv
+        }
+
+def train(documents: List[Tuple[str, Dict[int, int], Optional[str]]], classes: List[str]):
+    """(log_prob [classes, features], log_prior [classes]) of multinomial Naive Bayes"""
+    class_index = {c: i for i, c in enumerate(classes)}
+    counts = np.zeros((len(classes), FEATURE_MASK + 1), dtype=np.float64)
+    doc_counts = np.zeros(len(classes), dtype=np.float64)
+    for category, features, _ in documents:
+        row = class_index[category]
+        doc_counts[row] += 1
+        for feature, count in features.items():
+            counts[row, feature] += count
+
+    seen = counts.sum(axis=0) > 0
+    totals = counts[:, seen].sum(axis=1, keepdims=True) + SMOOTHING * seen.sum()
+    log_prob = np.log((counts + SMOOTHING) / totals)
+    # Features never seen in training say nothing about the class
+    log_prob[:, ~seen] = 0.0
+    log_prior = np.log(doc_counts / doc_counts.sum())
+    return log_prob.astype(np.float32), log_prior.astype(np.float32)
+
+def softmax(scores, temperature: float):
+    scaled = scores / temperature
+    scaled = scaled - scaled.max(axis=-1, keepdims=True)
+    exp = np.exp(scaled)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+def calibrate(documents: List[Tuple[str, Dict[int, int], Optional[str]]], classes: List[str]) -> Tuple[float, Dict]:
+    """Temperature with the lowest held-out log loss (folds split by entry)"""
+    groups = sorted({group for _, _, group in documents if group is not None})
+    random.Random(42).shuffle(groups)
+    fold_of = {group: i % CALIBRATION_FOLDS for i, group in enumerate(groups)}
+    class_index = {c: i for i, c in enumerate(classes)}
+
+    held_out_scores = []
+    labels = []
+    for fold in range(CALIBRATION_FOLDS):
+        train_docs = [d for d in documents if d[2] is None or fold_of[d[2]] != fold]
+        test_docs = [d for d in documents if d[2] is not None and fold_of[d[2]] == fold]
+        if not test_docs:
+            continue
+        log_prob, log_prior = train(train_docs, classes)
+        for category, features, _ in test_docs:
+            held_out_scores.append(score_features(features, log_prob, log_prior))
+            labels.append(class_index[category])
+
+    if not labels:
+        return 1.0, {"accuracy": None, "log_loss": None}
+    scores = np.array(held_out_scores)
+    labels = np.array(labels)
+    best = None
+    for temperature in TEMPERATURES:
+        probs = softmax(scores, temperature)
+        log_loss = float(-np.mean(np.log(np.maximum(probs[np.arange(len(labels)), labels], 1e-12))))
+        if best is None or log_loss < best[1]:
+            best = (temperature, log_loss)
+    accuracy = float(np.mean(scores.argmax(axis=1) == labels))
+    return best[0], {"accuracy": round(accuracy, 4), "log_loss": round(best[1], 4), "held_out": len(labels)}
+
+def score_features(features: Dict[int, int], log_prob, log_prior):
+    """Class scores of one document: one sparse dot product"""
+    if not features:
+        return log_prior.copy()
+    columns = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+    counts = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+    return log_prob[:, columns] @ counts + log_prior
+
+def save_intent_model(model: Dict, output_path: Path = INTENT_MODEL_FILE) -> int:
+    """Write the weights; returns file size in bytes"""
+    output_path.parent.mkdir(exist_ok=True)
+    with open(output_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            classes=np.array(model["classes"]),
+            log_prob=model["log_prob"],
+            log_prior=model["log_prior"],
+            temperature=np.array(model["temperature"], dtype=np.float32)
+        )
+    return output_path.stat().st_size
+
+class IntentModel:
+    def __init__(self, classes: List[str], log_prob, log_prior, temperature: float):
+        self.classes = list(classes)
+        self.log_prob = log_prob
+        self.log_prior = log_prior
+        self.temperature = temperature
+        self.seen = log_prob[0] != 0.0  # Features that occurred in training
+
+    @classmethod
+    def load(cls, model_file: Path = INTENT_MODEL_FILE) -> Optional["IntentModel"]:
+        """The stored model, or None without numpy or a readable model file"""
+        if np is None or not model_file or not Path(model_file).exists():
+            return None
+        try:
+            with np.load(model_file, allow_pickle=False) as data:
+                return cls([str(c) for c in data["classes"]], data["log_prob"], data["log_prior"],
+                           float(data["temperature"]))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Intent model unreadable ({e}), using keyword classifier")
+            return None
+
+    def predict_proba(self, text: str):
+        """Class probabilities of one query (order of self.classes)"""
+        return self.predict_words(normalize_question(text).split())[0]
+
+    def predict_words(self, words: List[str]):
+        """(class probabilities, known_fraction) of one normalized, split query"""
+        probs = softmax(score_features(words_features(words), self.log_prob, self.log_prior), self.temperature)
+        return probs, self.known_fraction(words)
+
+    def known_fraction(self, words: List[str]) -> float:
+        """Share of the words seen in training (0 = nothing to go on)
+
+        Whole words, not n-grams: nearly every character bigram occurs
+        somewhere in training, so an n-gram share stays high for any text.
+        """
+        if not words:
+            return 0.0
+        # The last hashed feature of a word is the padded word itself
+        return sum(bool(self.seen[word_features(word)[-1]]) for word in words) / len(words)
+
+def top_classes(probs, classes: List[str], k: int) -> List[Tuple[str, float]]:
+    """(class, probability) pairs, most likely first"""
+    order = np.argsort(-probs, kind="stable")[:k]
+    return [(classes[i], round(float(probs[i]), 3)) for i in order]
@@ -0,0 +1,203 @@
+"""
+Streaming knowledge base reader/writer for GramSevak AI
+Reads entries one at a time from JSON array or JSON Lines files so that
+builds and migrations never hold a whole category file in memory
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Read size for incremental parsing (bytes of text per read)
+CHUNK_SIZE = 64 * 1024
+
+# File extensions recognised as knowledge base files
+KB_FILE_PATTERNS = ["*.json", "*.jsonl"]
+
+_decoder = json.JSONDecoder()
+
+def iter_json_array(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Incrementally parse a top-level JSON array, yielding one element at a time
+
+    Raises:
+        ValueError: If the file is not a JSON array
+        json.JSONDecodeError: If the file is malformed
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            # Drop consumed text so the buffer stays bounded
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_whitespace() -> Optional[str]:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if eof or not fill():
+                    return None
+
+        # Opening bracket
+        ch = skip_whitespace()
+        if ch != "[":
+            raise ValueError("not a JSON array")
+        pos += 1
+
+        expect_value = True
+        while True:
+            ch = skip_whitespace()
+            if ch is None:
+                raise json.JSONDecodeError("Unterminated array", buf, pos)
+            if ch == "]":
+                return
+            if ch == ",":
+                if expect_value:
+                    raise json.JSONDecodeError("Unexpected ','", buf, pos)
+                pos += 1
+                expect_value = True
+                continue
+            if not expect_value:
+                raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+
+            # Decode the next element, reading more text until it is complete
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof or not fill():
+                        raise
+                    continue
+                # A scalar ending exactly at the buffer edge may be cut short
+                if end == len(buf) and not eof and fill():
+                    continue
+                break
+
+            pos = end
+            expect_value = False
+            yield value
+
+def iter_json_lines(path: Path) -> Iterator[Dict]:
+    """Yield one entry per non-empty line of a JSON Lines file"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise json.JSONDecodeError(f"line {line_no}: {e.msg}", e.doc, e.pos)
+
+def iter_entries(path: Path) -> Iterator[Dict]:
+    """Stream entries from a knowledge base file (.json array or .jsonl)"""
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        return iter_json_lines(path)
+    return iter_json_array(path)
+
+def list_kb_files(kb_dir: Path) -> List[Path]:
+    """Return all knowledge base files in a directory, sorted by name"""
+    files = []
+    for pattern in KB_FILE_PATTERNS:
+        files.extend(Path(kb_dir).glob(pattern))
+    return sorted(files)
+
+class JsonArrayWriter:
+    """
+    Write entries to a JSON array file one at a time
+
+    Output is byte-identical to json.dump(entries, f, ensure_ascii=False, indent=indent),
+    so streamed builds produce the same files as in-memory ones.
+    """
+
+    def __init__(self, path: Path, indent: Optional[int] = 2):
+        self.path = Path(path)
+        self.indent = indent
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> "JsonArrayWriter":
+        self._file = open(self.path, "w", encoding="utf-8")
+        return self
+
+    def write(self, entry: Dict):
+        if self.indent is None:
+            text = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+            self._file.write(("[" if self.count == 0 else ",") + text)
+        else:
+            pad = " " * self.indent
+            text = json.dumps(entry, ensure_ascii=False, indent=self.indent)
+            text = "\n".join(pad + line for line in text.split("\n"))
+            self._file.write(("[\n" if self.count == 0 else ",\n") + text)
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.count == 0:
+            self._file.write("[]")
+        elif self.indent is None:
+            self._file.write("]")
+        else:
+            self._file.write("\n]")
+        self._file.close()
+        return False
+
+class JsonLinesWriter(JsonArrayWriter):
+    """Write entries to a JSON Lines file one at a time"""
+
+    def write(self, entry: Dict):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        return False
+
+def open_writer(path: Path, indent: Optional[int] = 2) -> JsonArrayWriter:
+    """Return a streaming writer matching the file extension"""
+    if Path(path).suffix == ".jsonl":
+        return JsonLinesWriter(path)
+    return JsonArrayWriter(path, indent=indent)
+
+def rewrite_entries(input_file: Path, output_file: Path, transform, indent: Optional[int] = 2) -> Dict[str, int]:
+    """
+    Stream entries from input_file through transform() into output_file
+
+    transform(entry, index) returns the new entry, or raises to skip it.
+    Writing goes to a temporary file first, so input_file and output_file
+    may be the same path.
+    """
+    output_file = Path(output_file)
+    tmp_file = output_file.with_name(output_file.name + ".tmp" + output_file.suffix)
+    stats = {"read": 0, "written": 0}
+
+    try:
+        with open_writer(tmp_file, indent=indent) as writer:
+            for i, entry in enumerate(iter_entries(input_file)):
+                stats["read"] += 1
+                try:
+                    new_entry = transform(entry, i)
+                except Exception as e:
+                    print(f"  ⚠️  Error upgrading entry {i}: {e}")
+                    continue
+                writer.write(new_entry)
+                stats["written"] += 1
+        os.replace(tmp_file, output_file)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+    return stats
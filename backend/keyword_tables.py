@@ -0,0 +1,75 @@
+"""
+Keyword tables for GramSevak AI retrieval
+Shared by rag_pipeline.simple_keyword_match (server) and the offline
+search index built by build_index.py (client), so both score alike
+"""
+
+from typing import Dict
+
+# Expanded keyword mappings (Hindi + English + Hinglish + Common phrases)
+KEYWORD_SYNONYMS = {
+    # Government Schemes
+    "किसान": ["pmkisan", "kisan", "farmer", "खेती", "kheti", "agriculture"],
+    "उज्ज्वला": ["ujjwala", "gas", "lpg", "cylinder", "सिलेंडर"],
+    "आयुष्मान": ["ayushman", "health", "hospital", "इलाज", "ilaj", "treatment"],
+    "पेंशन": ["pension", "atal", "retirement", "बुढ़ापा"],
+    "नौकरी": ["mgnrega", "job", "work", "काम", "kaam", "employment", "रोजगार"],
+    "घर": ["awas", "house", "home", "मकान", "makaan", "housing"],
+    "लोन": ["mudra", "loan", "credit", "कर्ज", "karj", "उधार"],
+    "राशन": ["ration", "food", "खाना", "अनाज", "grain"],
+    "शौचालय": ["toilet", "swachh", "sanitation", "latrine"],
+    "बैंक": ["bank", "account", "खाता", "jandhan"],
+    
+    # Agriculture
+    "फसल": ["crop", "खेती", "farming", "बुवाई", "sowing"],
+    "बीज": ["seed", "beej", "variety"],
+    "खाद": ["fertilizer", "urea", "npk", "manure"],
+    "कीड़ा": ["pest", "insect", "disease", "रोग"],
+    "पानी": ["water", "irrigation", "सिंचाई", "drip"],
+    "मंडी": ["mandi", "market", "price", "भाव", "rate"],
+    
+    # Health
+    "बीमारी": ["disease", "illness", "sick", "बुखार", "fever"],
+    "दवा": ["medicine", "tablet", "गोली", "treatment"],
+    "डॉक्टर": ["doctor", "hospital", "clinic", "अस्पताल"],
+    "टीका": ["vaccine", "vaccination", "immunization"],
+    
+    # Education
+    "पढ़ाई": ["education", "study", "school", "स्कूल"],
+    "छात्रवृत्ति": ["scholarship", "financial_aid"],
+    "नौकरी": ["job", "employment", "career"],
+    
+    # Financial
+    "पैसा": ["money", "paisa", "rupee", "रुपया"],
+    "बचत": ["savings", "save", "deposit"],
+    "ब्याज": ["interest", "rate"],
+    
+    # Common intent words
+    "कैसे": ["how", "kaise", "process", "method"],
+    "क्या": ["what", "kya", "information"],
+    "कितना": ["how much", "kitna", "amount", "quantity"],
+    "कहां": ["where", "kahan", "location"],
+    "कब": ["when", "kab", "time", "date"],
+}
+
+# Fuzzy matching for common misspellings: {misspelling: correct form}
+FUZZY_MATCHES = {
+    "kisaan": "kisan",
+    "kissan": "kisan",
+    "yojna": "yojana",
+    "yojana": "scheme",
+    "paisa": "money",
+    "paise": "money",
+}
+
+def entry_search_text(entry: Dict) -> str:
+    """All searchable text of an entry, lowercased (old and new schema)"""
+    return (
+        entry.get("question_hi", "") + " " + 
+        entry.get("summary", entry.get("answer_hi", "")) + " " +
+        entry.get("title", entry.get("scheme", "")) + " " +
+        " ".join(entry.get("tags", [])) + " " +
+        entry.get("category", "") + " " +
+        entry.get("subcategory", "") + " " +
+        entry.get("eligibility", entry.get("eligibility_hi", ""))
+    ).lower()
@@ -0,0 +1,289 @@
+"""
+Per-script postings for GramSevak AI retrieval
+Every knowledge base word, and every substring of it, is filed under its
+Unicode script (DEVANAGARI, LATIN, ...; digits and other script-less
+tokens under COMMON), mapping it to the ids of the entries that contain
+it, and the keyword tables are split the same way (Hindi synonym triggers
+under DEVANAGARI, romanized misspellings under LATIN). keyword_score
+matches substrings, so a query finds the entries with a word inside one
+of its words, a word containing one of its words, or a synonym expansion
+of its scripts' triggers: exactly the entries that can score. The keyword
+scan scores just those instead of the whole category.
+
+A new regional language needs only its KB entries and a LANGUAGE_SCRIPTS
+line: its words get their own partition, so Hindi queries never search it.
+Built by build_index.py (indices/language_postings.json) and loaded at
+startup; without it retrieval scans the whole category as before.
+"""
+
+import os
+import json
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from exact_match import normalize_question
+from keyword_tables import KEYWORD_SYNONYMS, FUZZY_MATCHES, entry_search_text
+
+LANGUAGE_INDEX_FILE = Path(__file__).parent / "indices" / "language_postings.json"
+
+# script = search only the query's script partitions, off = scan every entry
+LANGUAGE_ROUTING = os.getenv("LANGUAGE_ROUTING", "script").lower()
+
+# Query.lang -> script of its partition (used when the query has no letters)
+LANGUAGE_SCRIPTS = {
+    "hi": "DEVANAGARI",
+    "en": "LATIN",
+    "hinglish": "LATIN",
+}
+
+# Partition of digits and other tokens without letters; searched for every query
+COMMON = "COMMON"
+
+# Words are also filed under their substrings from this length, as
+# keyword_score matches inside words (किसान finds किसानों, date finds
+# update); queries look up all their substrings
+MIN_AFFIX = 3
+
+_char_scripts: Dict[str, str] = {}
+
+def char_script(ch: str) -> str:
+    """Unicode script of a letter, from its character name (DEVANAGARI, LATIN, BENGALI, ...)"""
+    script = _char_scripts.get(ch)
+    if script is None:
+        script = unicodedata.name(ch, COMMON).split()[0] if ch.isalpha() else COMMON
+        _char_scripts[ch] = script
+    return script
+
+def token_script(token: str) -> str:
+    """Script of a token's first letter (COMMON if it has none)"""
+    for ch in token:
+        if ch.isalpha():
+            return char_script(ch)
+    return COMMON
+
+def entry_tokens(entry: Dict) -> Set[str]:
+    """Normalized words of everything keyword_score reads from an entry"""
+    text = " ".join([entry_search_text(entry)] + list(entry.get("question_variants", [])))
+    return set(normalize_question(text).split())
+
+def synonym_tables() -> Dict[str, Dict[str, List[str]]]:
+    """{script: {trigger: [expansion words]}} from the shared keyword tables"""
+    tables = {}
+    for trigger, expansions in KEYWORD_SYNONYMS.items():
+        words = [w for expansion in expansions for w in normalize_question(expansion).split()]
+        tables.setdefault(token_script(trigger), {})[trigger] = words
+    for misspelling, correct in FUZZY_MATCHES.items():
+        tables.setdefault(token_script(misspelling), {}).setdefault(misspelling, []).append(correct)
+    return tables
+
+class LanguageIndexBuilder:
+    """Collect postings entry by entry (build_index.py streams the KB)"""
+
+    def __init__(self):
+        self.words = {}  # {script: {word: [entry ids]}}
+        self.postings = {}  # {script: {substring of a word: [entry ids]}}
+
+    def add(self, entry: Dict):
+        entry_id = entry.get("id")
+        if not entry_id:
+            return
+        tokens = entry_tokens(entry)
+        infixes = {token[i:j] for token in tokens for i in range(len(token)) for j in range(i + MIN_AFFIX, len(token) + 1)}
+        # Sorted: same file on every build
+        for table, keys in ((self.words, tokens), (self.postings, infixes)):
+            for key in sorted(keys):
+                table.setdefault(token_script(key), {}).setdefault(key, []).append(entry_id)
+
+    def build(self) -> Dict:
+        """{"words" / "postings": {script: {key: [ids]}}, "synonyms": {script: {trigger: [words]}}}"""
+        return {"words": self.words, "postings": self.postings, "synonyms": synonym_tables()}
+
+def build_language_index(entries: Iterable[Dict]) -> Dict:
+    builder = LanguageIndexBuilder()
+    for entry in entries:
+        builder.add(entry)
+    return builder.build()
+
+def save_language_index(index: Dict, output_path: Path = LANGUAGE_INDEX_FILE) -> int:
+    """Write the index; returns file size in bytes"""
+    output_path.parent.mkdir(exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    return output_path.stat().st_size
+
+class LanguageIndex:
+    """
+    Postings are sorted tuples of entry slots: the KB renumbered category by
+    category (in KB order within each), so one category's candidates are a
+    bisected slice of each matching posting and the slot minus the
+    category's first slot is the entry's position in its category index.
+    narrow() picks entries by position instead of scanning the category.
+    """
+
+    def __init__(self):
+        self._words = {}  # {script: {word: tuple of slots}}
+        self._postings = {}  # {script: {substring: tuple of slots}}
+        self._synonyms = {}  # {script: {trigger: [words]}}
+        self._ids = []  # Entry id of each slot
+        self._kb_positions = []  # KB position of each slot
+        self._extents = {}  # {category ("" = none): (first slot, end slot, first id, last id)}
+        self._kb_extent = None  # (length, first id, last id) of the knowledge base
+        self._last_query = None  # ((query, lang), tokens, scripts, matched postings): fan-out narrows one query per category
+        self.metrics = {"keys": {}, "queries": 0, "by_script": {}, "entries_scanned": 0, "entries_total": 0,
+                        "positional": 0, "scans": 0}
+
+    def load(self, knowledge_base: List[Dict], index_file: Optional[Path] = LANGUAGE_INDEX_FILE) -> str:
+        """Load the built postings, or build them from the knowledge base if missing. Returns the source."""
+        index = None
+        if index_file:
+            try:
+                with open(index_file, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                pass
+        if index is not None and "words" not in index:
+            index = None  # Written before whole-word postings existed
+        source = "file" if index is not None else "knowledge_base"
+        if index is None:
+            index = build_language_index(knowledge_base)
+
+        by_category = {}
+        for position, entry in enumerate(knowledge_base):
+            by_category.setdefault(entry.get("category") or "", []).append(position)
+        self._kb_positions = [position for positions in by_category.values() for position in positions]
+        self._ids = [knowledge_base[position].get("id") for position in self._kb_positions]
+        self._extents = {}
+        start = 0
+        for category, positions in by_category.items():
+            end = start + len(positions)
+            self._extents[category] = (start, end, self._ids[start], self._ids[end - 1])
+            start = end
+        self._kb_extent = (len(knowledge_base), knowledge_base[0].get("id"), knowledge_base[-1].get("id")) if knowledge_base else None
+        slot_of = {entry_id: slot for slot, entry_id in enumerate(self._ids)}
+
+        self._words, self._postings = (
+            {
+                script: {key: tuple(sorted(slot_of[i] for i in ids if i in slot_of)) for key, ids in table.items()}
+                for script, table in index[name].items()
+            }
+            for name in ("words", "postings")
+        )
+        self._synonyms = index["synonyms"]
+        self._last_query = None
+        self.metrics["keys"] = {script: len(postings) for script, postings in self._postings.items()}
+        return source
+
+    @property
+    def enabled(self) -> bool:
+        return LANGUAGE_ROUTING == "script" and bool(self._words)
+
+    def scripts(self) -> List[str]:
+        """Partitions present in the loaded index"""
+        return sorted(self._words)
+
+    def languages(self) -> List[str]:
+        """Query.lang values whose script has entries (all known ones before load)"""
+        if not self._words:
+            return list(LANGUAGE_SCRIPTS)
+        return [lang for lang, script in LANGUAGE_SCRIPTS.items() if script in self._words]
+
+    def query_scripts(self, query: str, lang: Optional[str] = None) -> List[str]:
+        """Scripts the query is written in; Query.lang's when it has no letters"""
+        return self._scripts(normalize_question(query).split(), lang)
+
+    @staticmethod
+    def _scripts(tokens: List[str], lang: Optional[str]) -> List[str]:
+        scripts = {token_script(token) for token in tokens}
+        scripts.discard(COMMON)
+        if not scripts and lang in LANGUAGE_SCRIPTS:
+            scripts.add(LANGUAGE_SCRIPTS[lang])
+        return sorted(scripts)
+
+    def candidate_ids(self, query: str, lang: Optional[str] = None) -> Optional[Set[str]]:
+        """Ids of entries with a word containing (or contained in) a query word or synonym expansion; None = all"""
+        tokens = normalize_question(query).split()
+        matched = self._candidates(query.lower(), tokens, self._scripts(tokens, lang))
+        return None if matched is None else {self._ids[slot] for posting in matched for slot in posting}
+
+    def _candidates(self, query_lower: str, tokens: List[str], scripts: List[str]) -> Optional[List[tuple]]:
+        """Postings of the matching entries, or None if the query is too short to narrow (every entry can match)"""
+        if not any(len(token) >= MIN_AFFIX for token in tokens):
+            return None
+        matched = {}  # {id(posting): posting}: a posting found through several keys is sliced once
+        for token in tokens:
+            # Entry words inside the query word (tags, titles and variants found in the query)
+            for i in range(len(token)):
+                for j in range(i + 1, len(token) + 1):
+                    key = token[i:j]
+                    posting = self._words.get(token_script(key), {}).get(key)
+                    if posting:
+                        matched[id(posting)] = posting
+            # Entry words containing the query word
+            posting = self._postings.get(token_script(token), {}).get(token)
+            if posting:
+                matched[id(posting)] = posting
+
+        # Synonym triggers of the query's scripts, matched as keyword_score does (substring)
+        for script in scripts:
+            for trigger, words in self._synonyms.get(script, {}).items():
+                if trigger in query_lower:
+                    for word in words:
+                        posting = self._postings.get(token_script(word), {}).get(word)
+                        if posting:
+                            matched[id(posting)] = posting
+        return list(matched.values())
+
+    def narrow(self, search_kb: List[Dict], query: str, lang: Optional[str] = None) -> List[Dict]:
+        """Entries of search_kb the query can match, in order (search_kb itself when routing is off)"""
+        if not self.enabled:
+            return search_kb
+        if self._last_query and self._last_query[0] == (query, lang):
+            _, tokens, scripts, matched = self._last_query
+        else:
+            tokens = normalize_question(query).split()
+            scripts = self._scripts(tokens, lang)
+            matched = self._candidates(query.lower(), tokens, scripts)
+            self._last_query = ((query, lang), tokens, scripts, matched)
+        narrowed = search_kb if matched is None else self._select(search_kb, matched)
+
+        self.metrics["queries"] += 1
+        for script in scripts or [COMMON]:
+            self.metrics["by_script"][script] = self.metrics["by_script"].get(script, 0) + 1
+        self.metrics["entries_scanned"] += len(narrowed)
+        self.metrics["entries_total"] += len(search_kb)
+        return narrowed
+
+    def _select(self, search_kb: List[Dict], matched: List[tuple]) -> List[Dict]:
+        """Entries of search_kb in the matched postings, in order: by position in a
+        category index or the whole KB, by a scan in any other list"""
+        if not search_kb or not matched:
+            return []
+        extent = self._extents.get(search_kb[0].get("category") or "")
+        start, end, first_id, last_id = extent or (0, 0, None, None)
+        if extent and (len(search_kb), search_kb[0].get("id"), search_kb[-1].get("id")) == (end - start, first_id, last_id):
+            slots = set()
+            for posting in matched:
+                low = bisect_left(posting, start)
+                slots.update(posting[low:bisect_left(posting, end, low)])
+            self.metrics["positional"] += 1
+            return [search_kb[slot - start] for slot in sorted(slots)]
+
+        slots = set().union(*matched)
+        if (len(search_kb), search_kb[0].get("id"), search_kb[-1].get("id")) == self._kb_extent:
+            self.metrics["positional"] += 1
+            return [search_kb[position] for position in sorted(self._kb_positions[slot] for slot in slots)]
+        self.metrics["scans"] += 1
+        ids = {self._ids[slot] for slot in slots}
+        return [entry for entry in search_kb if entry.get("id") in ids]
+
+    def snapshot(self) -> Dict:
+        """Partitions, routing and search-space counters for /stats"""
+        total = self.metrics["entries_total"]
+        return {
+            "routing": LANGUAGE_ROUTING if self._words else "off",
+            "scripts": self.scripts(),
+            **self.metrics,
+            "scanned_fraction": round(self.metrics["entries_scanned"] / total, 3) if total else None
+        }
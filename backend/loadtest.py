@@ -0,0 +1,287 @@
+"""
+End-to-end load test for GramSevak AI
+Drives /query, /offline-pack and /feedback with a Hindi/Hinglish query mix
+taken from the knowledge base (plus off-topic queries that fall through to
+the LLM) at several concurrency levels and network tiers. Reports
+throughput, p50/p95/p99 latency and bytes per response, and writes the
+results as JSON so releases can be compared.
+
+Usage:
+    # Against a running server (start it with a high RATE_LIMIT_MAX)
+    python loadtest.py --base-url http://127.0.0.1:8000
+
+    # Self-contained: starts the stub LLM and a local uvicorn server
+    python loadtest.py --spawn --concurrency 1,8,32 --tiers 2g,4g --output results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from kb_loader import iter_entries, list_kb_files
+
+# Share of requests per endpoint (the rest are /query)
+OFFLINE_PACK_SHARE = 0.05
+FEEDBACK_SHARE = 0.10
+
+# Queries the knowledge base does not cover (exercise the LLM fallback)
+OFF_TOPIC_QUERIES = [
+    "मौसम कैसा रहेगा कल",
+    "cricket match ka score kya hai",
+    "नई फिल्म कब आएगी",
+    "mobile recharge kaise kare",
+    "train ka time kya hai",
+    "सोने का भाव आज क्या है"
+]
+
+# Share of off-topic queries in the mix
+OFF_TOPIC_SHARE = 0.1
+
+USER_TYPES = ["farmer", "student", "worker", "general", None]
+
+def build_query_mix(kb_dir: Path, seed: int) -> List[str]:
+    """Hindi questions and Hinglish/Hindi variants from the KB, plus off-topic queries"""
+    queries = []
+    for kb_file in list_kb_files(kb_dir):
+        for entry in iter_entries(kb_file):
+            if entry.get("question_hi"):
+                queries.append(entry["question_hi"])
+            queries.extend(entry.get("question_variants", []))
+
+    rng = random.Random(seed)
+    off_topic_count = int(len(queries) * OFF_TOPIC_SHARE)
+    queries.extend(rng.choice(OFF_TOPIC_QUERIES) for _ in range(off_topic_count))
+    rng.shuffle(queries)
+    return queries
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def send(base_url: str, method: str, path: str, payload: Optional[Dict], gzip: bool) -> Dict:
+    """One HTTP request; returns status, latency and bytes received"""
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    if data is not None:
+        request.add_header("Content-Type", "application/json")
+    if gzip:
+        request.add_header("Accept-Encoding", "gzip")
+
+    request_start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status = e.code
+    except Exception:
+        body = b""
+        status = 0
+    latency_ms = (time.perf_counter() - request_start) * 1000
+
+    return {"status": status, "latency_ms": latency_ms, "bytes": len(body), "body": body}
+
+def make_request(i: int, rng: random.Random, queries: List[str], tier: str, compact: bool) -> tuple:
+    """Pick the endpoint and payload for request number i"""
+    roll = rng.random()
+    if roll < OFFLINE_PACK_SHARE:
+        return "offline_pack", "GET", "/offline-pack", None
+    if roll < OFFLINE_PACK_SHARE + FEEDBACK_SHARE:
+        return "feedback", "POST", "/feedback", {
+            "response_id": f"loadtest-{i}",
+            "is_helpful": rng.random() < 0.8
+        }
+    payload = {
+        "text": queries[i % len(queries)],
+        "network_type": tier,
+        "user_type": rng.choice(USER_TYPES)
+    }
+    if compact:
+        payload["compact"] = True
+    return "query", "POST", "/query", payload
+
+def run_level(base_url: str, queries: List[str], concurrency: int, tier: str,
+              requests_per_level: int, seed: int, gzip: bool, compact: bool) -> Dict:
+    """Send requests_per_level requests with the given concurrency"""
+    rng = random.Random(seed)
+    plan = [make_request(i, rng, queries, tier, compact) for i in range(requests_per_level)]
+
+    level_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda item: (item[0], send(base_url, item[1], item[2], item[3], gzip)), plan
+        ))
+    wall_s = time.perf_counter() - level_start
+
+    endpoints = {}
+    for endpoint, result in results:
+        endpoints.setdefault(endpoint, []).append(result)
+
+    return {
+        "concurrency": concurrency,
+        "tier": tier,
+        "requests": len(results),
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(results) / wall_s, 1) if wall_s else 0.0,
+        **summarize([r for _, r in results]),
+        "endpoints": {name: summarize(items) for name, items in endpoints.items()},
+        "sources": count_sources(endpoints.get("query", []))
+    }
+
+def summarize(results: List[Dict]) -> Dict:
+    latencies = sorted(r["latency_ms"] for r in results)
+    ok = [r for r in results if 200 <= r["status"] < 400]
+    return {
+        "count": len(results),
+        "errors": len(results) - len(ok),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "avg_bytes": int(sum(r["bytes"] for r in ok) / len(ok)) if ok else 0
+    }
+
+def count_sources(results: List[Dict]) -> Dict[str, int]:
+    """Answer source per /query response (keyword_match, groq_llm, ...)"""
+    sources = {}
+    for result in results:
+        try:
+            body = json.loads(result["body"])
+            source = body.get("source") or body.get("o") or "unknown"
+        except ValueError:
+            source = "unparsed"  # gzipped or error page
+        sources[source] = sources.get(source, 0) + 1
+    return sources
+
+def wait_until_ready(base_url: str, timeout_s: float = 60.0) -> bool:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if send(base_url, "GET", "/health/ready", None, False)["status"] == 200:
+            return True
+        time.sleep(0.25)
+    return False
+
+def spawn_server(port: int, stub_port: int, stub_latency_ms: float, stub_error_rate: float = 0.0) -> subprocess.Popen:
+    """Start the stub LLM (in-process) and a uvicorn server configured to use it"""
+    from stub_llm_server import serve
+    serve("127.0.0.1", stub_port, stub_latency_ms, error_rate=stub_error_rate)
+
+    # Empty paths: load-test traffic stays out of the query log, feedback log
+    # and analytics rollups (and so out of the feedback priors)
+    env = dict(os.environ,
+               GROQ_API_KEY="stub",
+               GROQ_BASE_URL=f"http://127.0.0.1:{stub_port}",
+               RATE_LIMIT_MAX="1000000000",
+               QUERY_LOG_PATH="",
+               FEEDBACK_LOG_PATH="",
+               ANALYTICS_STORE_PATH="")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=Path(__file__).parent, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def print_report(runs: List[Dict]):
+    print("\n" + "=" * 78)
+    print("📊 LOAD TEST RESULTS")
+    print("=" * 78)
+    print(f"{'conc':>5} {'tier':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'bytes':>7} {'errors':>7}")
+    for run in runs:
+        print(f"{run['concurrency']:>5} {run['tier']:>5} {run['throughput_rps']:>8.1f} "
+              f"{run['p50_ms']:>7.1f}m {run['p95_ms']:>7.1f}m {run['p99_ms']:>7.1f}m "
+              f"{run['avg_bytes']:>7} {run['errors']:>7}")
+    print("=" * 78)
+
+def main():
+    parser = argparse.ArgumentParser(description="GramSevak AI load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated levels")
+    parser.add_argument("--tiers", default="4g,3g,2g", help="network_type values to test")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per level and tier")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--gzip", action="store_true", help="Send Accept-Encoding: gzip")
+    parser.add_argument("--compact", action="store_true", help="Request compact /query responses")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--spawn", action="store_true", help="Start stub LLM + local server")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --spawn")
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--stub-latency-ms", type=float, default=700.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Fraction of stub LLM calls that fail")
+    args = parser.parse_args()
+
+    kb_dir = Path(__file__).parent / "knowledge_base"
+    queries = build_query_mix(kb_dir, args.seed)
+    print(f"✓ Query mix: {len(queries)} queries from {kb_dir.name}")
+
+    server = None
+    base_url = args.base_url
+    if args.spawn:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = spawn_server(args.port, args.stub_port, args.stub_latency_ms, args.stub_error_rate)
+
+    try:
+        if not wait_until_ready(base_url):
+            print(f"❌ Server at {base_url} is not ready")
+            sys.exit(1)
+
+        runs = []
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            for tier in args.tiers.split(","):
+                print(f"🚀 concurrency={concurrency} tier={tier} ({args.requests} requests)")
+                runs.append(run_level(base_url, queries, concurrency, tier, args.requests,
+                                      args.seed, args.gzip, args.compact))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    print_report(runs)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "base_url": base_url,
+            "spawned": args.spawn,
+            "stub_latency_ms": args.stub_latency_ms if args.spawn else None,
+            "stub_error_rate": args.stub_error_rate if args.spawn else None,
+            "requests_per_level": args.requests,
+            "seed": args.seed,
+            "gzip": args.gzip,
+            "compact": args.compact,
+            "query_mix_size": len(queries)
+        },
+        "runs": runs
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
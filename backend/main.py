@@ -1,21 +1,59 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from pathlib import Path
 from starlette.requests import Request
+import os
+import gzip
 import time
-import json
-import glob
+import uuid
 import asyncio
 from intent_classifier import IntentClassifier
+from kb_loader import iter_entries, list_kb_files
+from dedupe import MERGED_ENTRIES_FILE, apply_merges, load_merged_entries
+from wire_format import COMPACT_KEYS, compact_fields, drop_nulls, dumps, merge_json_objects, with_byte_count
+from compression import GZIP_STATS, AdaptiveGZipMiddleware
+from tracing import TRACE_STATS, TracingMiddleware, span
+from query_log import create_writer, scrub_query
+from feedback_store import create_feedback_log
+from analytics_rollup import BUCKET_SECONDS, create_rollups
+from suggest import SuggestIndex
+from admission import ADMISSION_QUEUE_MS, MAX_INFLIGHT_REQUESTS, ConcurrencyLimit
+from index_manager import INDEX_PREWARM, object_bytes, prewarm_order
+from offline_pack import (
+    HISTORY_FILE, PACK_FILE, build_pack_from_entries, compute_delta, load_history, load_pack
+)
+from tier_payloads import (
+    STATIC_FIELDS, SUMMARY_TIERS_FILE, compress_for_tier, export_tier_payloads, get_tier_payload,
+    load_summary_tiers, precompute_tier_payloads, restore_tier_payloads, tier_payload_count
+)
+from rag_pipeline import (
+    FANOUT_MAX_CATEGORIES, answer_query, category_index_manager, exact_match_index, fanout_categories,
+    get_llm_client, feedback_priors, get_safety_filter, language_index, llm_breaker, llm_slots,
+    retrieval_executor
+)
+from language_index import LANGUAGE_ROUTING
+from readiness import (
+    WARMUP_REPORT, representative_queries, retry_warmup_if_due, run_warmup, schedule_retry, warmup_passed
+)
+from startup import (
+    STARTUP_REPORT, STARTUP_SNAPSHOT, load_snapshot, save_snapshot, source_fingerprint, startup_phase
+)
 
 app = FastAPI(title="GramSevak AI Backend")
 
-# Initialize intent classifier
-intent_classifier = IntentClassifier()
-print("✓ Intent classifier initialized")
+# Intent classifier, knowledge base and indices are built in the startup phase
+intent_classifier = None
+KNOWLEDGE_BASE = []
+query_log = None  # Background query log writer (None = disabled)
+feedback_log = None  # Append-only feedback log writer (None = disabled)
+analytics = create_rollups()  # Per-minute rollups (reloaded from the store at startup)
+suggest_index = SuggestIndex()  # Typeahead over known questions
+
+# Window of rollups used to rank categories for index prewarm
+PREWARM_TRAFFIC_WINDOW = 24 * 3600
+PREWARM_PLANNED = []  # Categories startup meant to make resident (empty = loaded by traffic only)
 
 # Initialize stats tracking
 STATS = {
@@ -33,6 +71,8 @@ STATS = {
     "total_feedback": 0,  # Track feedback submissions
     "helpful_count": 0,  # Track helpful feedback
     "not_helpful_count": 0,  # Track not helpful feedback
+    "compact_responses": 0,  # Track low-bandwidth (compact) responses
+    "compact_response_bytes": 0,  # Bytes sent in compact responses
 }
 
 # Rate limiting storage
@@ -42,8 +82,15 @@ RATE_LIMIT = {
     "last_cleanup": time.time()
 }
 
-RATE_LIMIT_MAX = 20  # Max requests per minute
-RATE_LIMIT_WINDOW = 60  # Time window in seconds
+RATE_LIMIT_MAX = int(os.getenv("RATE_LIMIT_MAX", "20"))  # Max requests per minute
+RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "60"))  # Time window in seconds
+
+# Time budget per /query; the LLM stage gets what is left (capped at LLM_TIMEOUT_MS)
+REQUEST_DEADLINE_MS = float(os.getenv("REQUEST_DEADLINE_MS", "3000"))
+
+# Global admission control: /query requests in flight (LLM calls are limited
+# separately in rag_pipeline); requests without a slot are answered without the LLM
+request_slots = ConcurrencyLimit("requests", MAX_INFLIGHT_REQUESTS)
 
 print("✓ Stats tracking initialized")
 print("✓ Rate limiting initialized")
@@ -57,8 +104,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Enable gzip compression
-app.add_middleware(GZipMiddleware, minimum_size=100)
+# Enable gzip compression, only where it pays off
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))  # Smaller bodies are sent as-is
+GZIP_MIN_SAVINGS = float(os.getenv("GZIP_MIN_SAVINGS", "0.1"))  # Required fraction saved
+app.add_middleware(AdaptiveGZipMiddleware, minimum_size=GZIP_MIN_SIZE, minimum_savings=GZIP_MIN_SAVINGS)
+
+# Admin token for analytics and on-demand profiling
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "gramsevak_admin_2024")
+
+# Per-request stage tracing (outermost, so timings include compression)
+app.add_middleware(TracingMiddleware, admin_token=ADMIN_TOKEN)
 
 # Rate limiting helper functions
 def cleanup_rate_limit_data():
@@ -123,7 +178,10 @@ class Query(BaseModel):
     simulate_2g: bool = False
     network_type: Optional[str] = None  # "2g", "3g", "4g", or None
     user_type: Optional[str] = None  # "farmer", "student", "worker", "general"
+    compact: bool = False  # Short-key JSON without null fields (low-bandwidth mode)
 
+# Response schema for /query (documented in OpenAPI; the handler encodes
+# it directly in a single pass, without null fields)
 class QueryResponse(BaseModel):
     summary: str
     eligibility: Optional[str] = None
@@ -147,32 +205,259 @@ class QueryResponse(BaseModel):
     similarity_score: Optional[float] = None  # 0-1 range
     last_updated: Optional[str] = None  # Data freshness indicator
     simulate_2g_mode: Optional[bool] = None  # 2G simulation mode flag
+    entry_id: Optional[str] = None  # Knowledge base entry that answered
+    response_id: Optional[str] = None  # Issued per answer; /feedback votes quote it
 
-# Load knowledge base
-try:
-    import glob
+def load_knowledge_base():
+    """Load knowledge base (streamed entry by entry; .json arrays and .jsonl files)"""
     kb_dir = Path("knowledge_base")
-    KNOWLEDGE_BASE = []
-    
-    # Load all JSON files
-    for json_file in glob.glob(str(kb_dir / "*.json")):
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, list):
-                KNOWLEDGE_BASE.extend(data)
+    KNOWLEDGE_BASE.clear()
+    
+    if not kb_dir.exists():
+        print("⚠ Warning: Knowledge base not found. Run build_index.py first.")
+        return
+    
+    for kb_file in list_kb_files(kb_dir):
+        try:
+            # Read the whole file first: a parse error halfway skips all of it
+            entries = list(iter_entries(kb_file))
+        except ValueError as e:
+            print(f"⚠ Warning: Skipping {kb_file.name}: {e}")
+            continue
+        KNOWLEDGE_BASE.extend(entries)
+    
+    # Same entries as the indices after build_index.py --merge-duplicates
+    merges = load_merged_entries()
+    if merges:
+        KNOWLEDGE_BASE[:] = apply_merges(KNOWLEDGE_BASE, merges)
+        print(f"✓ Left out {len(merges)} merged duplicate entries")
     
     print(f"✓ Loaded {len(KNOWLEDGE_BASE)} entries from knowledge base")
-except FileNotFoundError:
-    KNOWLEDGE_BASE = []
-    print("⚠ Warning: Knowledge base not found. Run build_index.py first.")
+
+def set_index_baseline():
+    """Knowledge base and tier payloads stay resident, so the index memory budget covers them too"""
+    category_index_manager.baseline_bytes = object_bytes(KNOWLEDGE_BASE) + object_bytes(export_tier_payloads())
+    if category_index_manager.over_budget():
+        print(f"⚠️  Knowledge base and tier payloads ({category_index_manager.baseline_bytes / 1024 / 1024:.1f} MB) "
+              f"exceed INDEX_MEMORY_BUDGET_MB: only the index in use stays resident")
+
+def snapshot_sources():
+    """Files whose contents the startup snapshot is built from"""
+    kb_dir = Path("knowledge_base")
+    kb_files = list_kb_files(kb_dir) if kb_dir.exists() else []
+    index_files = list(category_index_manager.indices_dir.glob("*_index.json"))
+    return kb_files + index_files + [PACK_FILE, HISTORY_FILE, MERGED_ENTRIES_FILE, SUMMARY_TIERS_FILE]
+
+@app.on_event("startup")
+def run_startup():
+    """Build matchers, knowledge base and indices before taking traffic"""
+    global intent_classifier, query_log, feedback_log
+    
+    with startup_phase("intent_classifier"):
+        intent_classifier = IntentClassifier()
+        intent_classifier.classify("योजना")  # Exercise the compiled patterns / model once
+    print(f"✓ Intent classifier: {intent_classifier.backend}")
+    
+    with startup_phase("safety_filter"):
+        get_safety_filter().check_safety("योजना")
+    
+    with startup_phase("analytics_rollups"):
+        analytics.start()
+    print(f"✓ Analytics rollups: {analytics.stats['loaded_buckets']} minutes reloaded "
+          f"({analytics.store_path or 'memory only'})")
+    
+    fingerprint = source_fingerprint(snapshot_sources()) if STARTUP_SNAPSHOT else None
+    snapshot = load_snapshot(STARTUP_SNAPSHOT, fingerprint) if STARTUP_SNAPSHOT else None
+    
+    if snapshot:
+        with startup_phase("snapshot_restore"):
+            KNOWLEDGE_BASE[:] = snapshot["knowledge_base"]
+            payload_count = restore_tier_payloads(snapshot["tier_payloads"])
+            set_index_baseline()
+            restored = category_index_manager.restore(snapshot["category_indices"])
+            PREWARM_PLANNED[:] = list(snapshot["category_indices"])
+        print(f"✓ Restored {len(KNOWLEDGE_BASE)} entries, {payload_count} tier payloads "
+              f"and {len(restored)} category indices from snapshot")
+    else:
+        with startup_phase("knowledge_base"):
+            load_knowledge_base()
+        
+        with startup_phase("tier_payloads"):
+            # Precompute 2G/3G/4G answer variants for keyword-path responses
+            # (2G/3G summaries shortened at build time, indices/summary_tiers.json)
+            payload_count = precompute_tier_payloads(KNOWLEDGE_BASE, load_summary_tiers())
+        print(f"✓ Precomputed network-tier payloads for {payload_count} entries")
+        set_index_baseline()
+        
+        with startup_phase("category_indices"):
+            # Load the busiest category indices (last day of rollups) before the first query arrives
+            order = prewarm_order(
+                INDEX_PREWARM,
+                category_index_manager.available_categories(),
+                analytics.category_counts(time.time() - PREWARM_TRAFFIC_WINDOW)
+            )
+            loaded = category_index_manager.prewarm(order)
+            PREWARM_PLANNED[:] = order
+        print(f"✓ Prewarmed {len(loaded)} category indices ({INDEX_PREWARM}; "
+              f"{category_index_manager.resident_bytes() / 1024:.0f} KB + {category_index_manager.baseline_bytes / 1024:.0f} KB "
+              f"baseline of {category_index_manager.memory_budget_bytes / 1024 / 1024:.0f} MB budget)")
+    
+    with startup_phase("exact_match"):
+        exact_source = exact_match_index.load(KNOWLEDGE_BASE)
+    print(f"✓ Exact-match index: {len(exact_match_index)} questions (from {exact_source})")
+    
+    with startup_phase("language_index"):
+        language_source = language_index.load(KNOWLEDGE_BASE)
+    print(f"✓ Language postings: {', '.join(language_index.scripts())} (from {language_source}, routing {LANGUAGE_ROUTING})")
+    
+    with startup_phase("feedback_priors"):
+        feedback_priors.load()
+    print(f"✓ Feedback priors: {feedback_priors.stats['entries']} entries boosted "
+          f"(from {feedback_priors.stats['votes']} votes)")
+    
+    with startup_phase("suggest_index"):
+        suggest_source = suggest_index.load(KNOWLEDGE_BASE)
+    print(f"✓ Suggest index: {len(suggest_index)} questions (from {suggest_source})")
+    
+    with startup_phase("retrieval_executor"):
+        retrieval_executor.start(KNOWLEDGE_BASE)
+    print(f"✓ Retrieval executor: {retrieval_executor.mode}"
+          f"{f' ({retrieval_executor.workers} workers)' if retrieval_executor.mode != 'inline' else ''}")
+    
+    with startup_phase("offline_pack"):
+        load_offline_pack(snapshot["offline_pack"] if snapshot else None)
+    
+    with startup_phase("query_log"):
+        query_log = create_writer()
+        if query_log:
+            query_log.start()
+    print(f"✓ Query log: {query_log.path if query_log else 'disabled'}")
+    
+    with startup_phase("feedback_log"):
+        feedback_log = create_feedback_log()
+        if feedback_log:
+            feedback_log.start()
+    print(f"✓ Feedback log: {feedback_log.path if feedback_log else 'disabled'}")
+    
+    with startup_phase("llm_client"):
+        llm_ready = get_llm_client() is not None
+    print(f"✓ LLM client {'ready' if llm_ready else 'unavailable (keyword answers only)'}")
+    
+    if STARTUP_SNAPSHOT and not snapshot:
+        with startup_phase("snapshot_save"):
+            save_snapshot(STARTUP_SNAPSHOT, fingerprint, {
+                "knowledge_base": KNOWLEDGE_BASE,
+                "tier_payloads": export_tier_payloads(),
+                "category_indices": category_index_manager.export_resident(),
+                "offline_pack": (OFFLINE_PACK, OFFLINE_PACK_HISTORY, OFFLINE_PACK_BODY, OFFLINE_PACK_GZIP)
+            })
+    
+    STARTUP_REPORT["completed"] = True
+    print(f"✓ Startup complete in {STARTUP_REPORT['total_ms']:.1f}ms")
+
+async def answer_like_query(text: str, lang: str) -> Dict:
+    """Classify and answer as /query does (candidates, deadline, lang), without stats or logging"""
+    deadline = time.monotonic() + REQUEST_DEADLINE_MS / 1000
+    category, _, category_candidates = intent_classifier.classify_top_k(text, FANOUT_MAX_CATEGORIES)
+    return await answer_query(text, KNOWLEDGE_BASE, category_filter=category, deadline=deadline,
+                              category_candidates=category_candidates, lang=lang)
+
+def warmup_route(text: str) -> List[str]:
+    """Categories a query's retrieval would search (fan-out candidates)"""
+    _, _, category_candidates = intent_classifier.classify_top_k(text, FANOUT_MAX_CATEGORIES)
+    return [category for category, _ in fanout_categories(category_candidates)]
+
+@app.on_event("startup")
+async def warmup_self_test():
+    """Run labelled real queries against the resident indices so readiness reflects real latency"""
+    with startup_phase("warmup"):
+        await run_warmup_self_test()
+
+async def run_warmup_self_test():
+    """One warmup run (at startup, and again from /health/ready after a failure)"""
+    queries = representative_queries(
+        category_index_manager.resident_categories(), warmup_route,
+        lambda text: exact_match_index.lookup(text) is not None
+    )
+    report = await run_warmup(queries, answer_like_query)
+    if not retrieval_executor.all_workers_started():
+        # Missing workers would be spawned on live requests: not ready
+        report["failed"].append({
+            "query": None,
+            "reason": f"retrieval workers: {retrieval_executor.workers_started}/{retrieval_executor.workers} started"
+        })
+        schedule_retry()
+    methods = ", ".join(f"{method} {count}" for method, count in sorted(report["retrieval_methods"].items()))
+    print(f"{'✓' if not report['failed'] else '⚠️ '} Warmup self-test (attempt {report['attempts']}): "
+          f"{report['passed']}/{report['queries']} passed "
+          f"(max {report['max_ms']:.1f}ms, target {report['latency_target_ms']:.0f}ms{f'; {methods}' if methods else ''})")
+    for failure in report["failed"]:
+        print(f"  ❌ {failure['query'] or 'warmup'}: {failure['reason']}")
+
+@app.on_event("shutdown")
+def flush_query_log():
+    """Write out queued query log records before exiting"""
+    if query_log:
+        query_log.close()
+
+@app.on_event("shutdown")
+def flush_feedback_log():
+    """Write and fsync queued feedback before exiting"""
+    if feedback_log:
+        feedback_log.close()
+
+@app.on_event("shutdown")
+def flush_analytics():
+    """Store the current minute's rollup before exiting"""
+    analytics.close()
+
+@app.on_event("shutdown")
+def stop_retrieval_executor():
+    retrieval_executor.close()
 
 @app.get("/health")
 def health_check():
     return {
         "status": "ok",
         "schemes_loaded": len(KNOWLEDGE_BASE),
+        "startup_ms": STARTUP_REPORT["total_ms"],
+        "timestamp": time.time()
+    }
+
+@app.get("/health/live")
+def liveness_check():
+    """Process is up and serving requests (restart the instance if not)"""
+    return {"status": "alive", "timestamp": time.time()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Route traffic here only once indices are loaded and warmup met its latency target"""
+    # A failed warmup is re-run here once its backoff has passed
+    if STARTUP_REPORT["completed"]:
+        await retry_warmup_if_due(run_warmup_self_test)
+    checks = {
+        "startup_completed": STARTUP_REPORT["completed"],
+        "knowledge_base_loaded": len(KNOWLEDGE_BASE) > 0,
+        # With nothing to prewarm (INDEX_PREWARM=none) indices load with traffic
+        "category_indices_loaded": bool(category_index_manager.generations()) or not PREWARM_PLANNED,
+        "warmup_passed": warmup_passed()
+    }
+    ready = all(checks.values())
+    
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "checks": checks,
+        "index_generations": category_index_manager.generations(),
+        "warm_caches": {
+            "tier_payloads": tier_payload_count(),
+            "resident_categories": category_index_manager.stats()["resident_categories"],
+            "offline_pack_version": OFFLINE_PACK["version"] if OFFLINE_PACK else None,
+            "llm_client": get_llm_client() is not None
+        },
+        "warmup": WARMUP_REPORT,
         "timestamp": time.time()
     }
+    return Response(content=dumps(body), status_code=200 if ready else 503, media_type="application/json")
 
 @app.post("/query", response_model=QueryResponse)
 async def process_query(q: Query, request: Request):
@@ -191,6 +476,7 @@ async def process_query(q: Query, request: Request):
         )
     
     start_time = time.time()
+    deadline = time.monotonic() + REQUEST_DEADLINE_MS / 1000
     
     # Update stats
     STATS["total_queries"] += 1
@@ -209,25 +495,33 @@ async def process_query(q: Query, request: Request):
     
     # Simulate 2G latency if requested
     if q.simulate_2g:
-        await asyncio.sleep(0.5)
+        with span("simulate_2g_delay"):
+            await asyncio.sleep(0.5)
         # Force 2G network type for compression
         if not q.network_type:
             q.network_type = "2g"
     
     # Step 1: Classify intent to determine category
     classify_start = time.time()
-    category, category_confidence = intent_classifier.classify(q.text)
+    with span("classify"):
+        category, category_confidence, category_candidates = intent_classifier.classify_top_k(
+            q.text, FANOUT_MAX_CATEGORIES
+        )
     classify_time = (time.time() - classify_start) * 1000
     
     # Log classification result
     print(f"🎯 Intent Classification: {category} (confidence: {category_confidence:.2f}, time: {classify_time:.2f}ms)")
     
-    # Import RAG pipeline
-    from rag_pipeline import answer_query
+    # Wait briefly for a request slot; shed requests get a keyword-only answer
+    with span("admission"):
+        admitted = await request_slots.acquire(ADMISSION_QUEUE_MS / 1000)
     
     try:
         # Step 2: Pass category to RAG pipeline for filtered retrieval
-        result = await answer_query(q.text, KNOWLEDGE_BASE, category_filter=category, simulate_2g=q.simulate_2g)
+        with span("answer_query"):
+            result = await answer_query(q.text, KNOWLEDGE_BASE, category_filter=category, simulate_2g=q.simulate_2g,
+                                        deadline=deadline, keyword_only=not admitted,
+                                        category_candidates=category_candidates, lang=q.lang)
         
         # Track cache hits and LLM calls
         if result["source"] == "keyword_match":
@@ -245,36 +539,21 @@ async def process_query(q: Query, request: Request):
             STATS["online_queries"] += 1
         
         # Step 3: Apply adaptive compression based on network type
-        compressed = False
-        original_length = None
-        
-        if q.network_type in ["2g", "3g"]:
-            original_summary = result["summary"]
-            original_length = len(original_summary)
+        # Static keyword answers use the variant precomputed at load time;
+        # dynamic answers (LLM, disclaimers) are compressed here
+        with span("tier_payload"):
+            payload = get_tier_payload(result.get("entry_id"), q.network_type, result["summary"])
             
-            # Determine character limit
-            char_limit = 200 if q.network_type == "2g" else 400
-            
-            if len(original_summary) > char_limit:
-                # Compress summary
-                result["summary"] = original_summary[:char_limit] + "..."
-                compressed = True
-                
-                # Remove optional fields for 2G
-                if q.network_type == "2g":
-                    result.pop("eligibility", None)
-                    result.pop("documents_required", None)
-                    # Keep emergency_helplines if present (critical)
-                
-                print(f"📦 Compressed for {q.network_type.upper()}: {original_length} → {len(result['summary'])} chars")
-        
-        # Calculate response size
-        response_json = json.dumps(result, ensure_ascii=False)
-        response_bytes = len(response_json.encode("utf-8"))
-        response_time = int((time.time() - start_time) * 1000)
+            if payload:
+                dynamic_fields = {k: v for k, v in result.items() if k not in STATIC_FIELDS}
+                result = {**payload["fields"], **dynamic_fields}
+                compressed = payload["compressed"]
+                original_length = payload["original_length"]
+            else:
+                compressed, original_length = compress_for_tier(result, q.network_type)
         
-        # Update stats
-        STATS["total_response_bytes"] += response_bytes
+        if compressed:
+            print(f"📦 Compressed for {q.network_type.upper()}: {original_length} → {len(result['summary'])} chars")
         
         # Determine mode
         if result["source"] == "safety_filter":
@@ -284,44 +563,159 @@ async def process_query(q: Query, request: Request):
         else:
             mode = "llm"
         
-        return QueryResponse(
-            summary=result["summary"],
-            eligibility=result.get("eligibility"),
-            documents_required=result.get("documents_required"),
-            official_link=result.get("official_link"),
-            emergency_helplines=result.get("emergency_helplines"),
-            source=result["source"],
-            confidence=result["confidence"],
-            mode=mode,
-            scheme_name=result["scheme_name"],
-            category=category,
-            category_confidence=category_confidence,
-            bytes_used=response_bytes,
-            response_time_ms=response_time,
-            cached=result["source"] == "keyword_match",
-            low_confidence_warning=result.get("low_confidence_warning"),
-            fallback_mode=result.get("fallback_mode"),
-            compressed=compressed,
-            original_length=original_length,
-            retrieval_method=result.get("retrieval_method", "semantic_match"),
-            similarity_score=result.get("similarity_score", 0.5),
-            last_updated=result.get("last_updated"),
-            simulate_2g_mode=result.get("simulate_2g_mode", False)
-        )
+        response_fields = {
+            "summary": result["summary"],
+            "eligibility": result.get("eligibility"),
+            "documents_required": result.get("documents_required"),
+            "official_link": result.get("official_link"),
+            "emergency_helplines": result.get("emergency_helplines"),
+            "source": result["source"],
+            "confidence": result["confidence"],
+            "mode": mode,
+            "scheme_name": result["scheme_name"],
+            "category": category,
+            "category_confidence": category_confidence,
+            "response_time_ms": int((time.time() - start_time) * 1000),
+            "cached": result["source"] == "keyword_match",
+            "low_confidence_warning": result.get("low_confidence_warning"),
+            "fallback_mode": result.get("fallback_mode"),
+            "compressed": compressed,
+            "original_length": original_length,
+            "retrieval_method": result.get("retrieval_method", "semantic_match"),
+            "similarity_score": result.get("similarity_score", 0.5),
+            "last_updated": result.get("last_updated"),
+            "simulate_2g_mode": result.get("simulate_2g_mode", False),
+            "entry_id": result.get("entry_id"),
+            "response_id": uuid.uuid4().hex
+        }
+        
+        # Serialize once: precomputed static bytes + per-request fields.
+        # Nulls are dropped and bytes_used is the size of the final body.
+        with span("serialize"):
+            request_fields = response_fields
+            static_body = b"{}"
+            if payload:
+                request_fields = {k: v for k, v in response_fields.items() if k not in STATIC_FIELDS}
+                static_body = payload["compact_body"] if q.compact else payload["body"]
+            
+            if q.compact:
+                # Low-bandwidth mode: short keys, no null/false flags
+                body = merge_json_objects(static_body, dumps(compact_fields(request_fields)))
+                body = with_byte_count(body, COMPACT_KEYS["bytes_used"])
+                STATS["compact_responses"] += 1
+                STATS["compact_response_bytes"] += len(body)
+            else:
+                body = merge_json_objects(static_body, dumps(drop_nulls(request_fields)))
+                body = with_byte_count(body, "bytes_used")
+        
+        # Update stats
+        STATS["total_response_bytes"] += len(body)
+        latency_ms = (time.time() - start_time) * 1000
+        analytics.record(category, q.network_type, result["source"], latency_ms, len(body))
+        
+        # Votes quoting this response only count for the entry it was served with
+        if feedback_log and response_fields["entry_id"]:
+            feedback_log.served(response_fields["response_id"], response_fields["entry_id"])
+        
+        if query_log:
+            query_log.log({
+                "ts": round(time.time(), 3),
+                "q": scrub_query(q.text),
+                "lang": q.lang,
+                "category": category,
+                "category_confidence": category_confidence,
+                "source": result["source"],
+                "method": response_fields["retrieval_method"],
+                "entry_id": response_fields["entry_id"],
+                "response_id": response_fields["response_id"],
+                "latency_ms": round(latency_ms, 2),
+                "bytes": len(body),
+                "network_type": q.network_type,
+                "compact": q.compact,
+                "simulate_2g": q.simulate_2g,
+                "user_type": q.user_type
+            })
+        
+        return Response(content=body, media_type="application/json")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    finally:
+        if admitted:
+            request_slots.release()
+
+# Longest typed text considered by /suggest
+SUGGEST_MAX_PREFIX = 100
+
+@app.get("/suggest")
+def get_suggestions(q: str = "", n: int = 5):
+    """Typeahead: known questions matching what has been typed (picking one is an exact-match hit)"""
+    body = dumps({"s": suggest_index.suggest(q[:SUGGEST_MAX_PREFIX], n)})
+    # Suggestions only change with a rebuild, so phones and proxies may reuse them
+    return Response(content=body, media_type="application/json", headers={"Cache-Control": "public, max-age=3600"})
+
+# Versioned offline pack (built by build_index.py; rebuilt from the KB if missing)
+OFFLINE_PACK = None
+OFFLINE_PACK_HISTORY = []
+OFFLINE_PACK_BODY = b""
+OFFLINE_PACK_GZIP = b""
+OFFLINE_PACK_ETAG = ""
+_offline_delta_bodies = {}  # {since_version: serialized delta}
+
+def load_offline_pack(snapshot_state=None):
+    """Load the pack and serialize/compress it once, not per request"""
+    global OFFLINE_PACK, OFFLINE_PACK_HISTORY, OFFLINE_PACK_BODY, OFFLINE_PACK_GZIP, OFFLINE_PACK_ETAG
+    
+    if snapshot_state:
+        OFFLINE_PACK, OFFLINE_PACK_HISTORY, OFFLINE_PACK_BODY, OFFLINE_PACK_GZIP = snapshot_state
+    else:
+        OFFLINE_PACK = load_pack() or build_pack_from_entries(KNOWLEDGE_BASE)
+        OFFLINE_PACK_HISTORY = load_history()
+        OFFLINE_PACK_BODY = dumps(OFFLINE_PACK)
+        OFFLINE_PACK_GZIP = gzip.compress(OFFLINE_PACK_BODY)
+    OFFLINE_PACK_ETAG = f'"{OFFLINE_PACK["version"]}"'
+    _offline_delta_bodies.clear()
+    print(f"✓ Offline pack v{OFFLINE_PACK['version']} ready ({OFFLINE_PACK['count']} entries)")
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already covers this ETag"""
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
 
 @app.get("/offline-pack")
-def get_offline_pack():
-    """Returns top 200 Q&As for offline caching"""
-    # Return most common queries
-    offline_data = KNOWLEDGE_BASE[:200] if len(KNOWLEDGE_BASE) > 200 else KNOWLEDGE_BASE
-    return {
-        "version": "1.0",
-        "count": len(offline_data),
-        "data": offline_data
-    }
+def get_offline_pack(request: Request):
+    """Returns the top Q&As (by confidence_weight) for offline caching"""
+    headers = {"ETag": OFFLINE_PACK_ETAG, "Cache-Control": "no-cache"}
+    if etag_matches(request, OFFLINE_PACK_ETAG):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+        return Response(content=OFFLINE_PACK_GZIP, media_type="application/json", headers=headers)
+    return Response(content=OFFLINE_PACK_BODY, media_type="application/json", headers=headers)
+
+@app.get("/offline-pack/delta")
+def get_offline_pack_delta(since: str, request: Request):
+    """Returns only entries changed since the client's pack version"""
+    etag = f'"{OFFLINE_PACK["version"]}-{since}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    body = _offline_delta_bodies.get(since)
+    if body is None:
+        delta = compute_delta(OFFLINE_PACK, OFFLINE_PACK_HISTORY, since)
+        if delta is None:
+            # Unknown or expired version: client needs the full pack
+            return Response(
+                content=OFFLINE_PACK_BODY,
+                media_type="application/json",
+                headers={**headers, "ETag": OFFLINE_PACK_ETAG, "X-Offline-Pack-Full": "1"}
+            )
+        body = dumps(delta)
+        _offline_delta_bodies[since] = body
+    
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/stats")
 def get_stats():
@@ -350,6 +744,11 @@ def get_stats():
         "cache_hits": STATS["cache_hits"],
         "llm_calls": STATS["llm_calls"],
         "total_response_bytes": STATS["total_response_bytes"],
+        "compact_responses": STATS["compact_responses"],
+        "avg_compact_response_bytes": (
+            int(STATS["compact_response_bytes"] / STATS["compact_responses"])
+            if STATS["compact_responses"] else 0
+        ),
         
         # Network breakdown
         "network_breakdown": {
@@ -363,10 +762,39 @@ def get_stats():
             )
         },
         
+        # Response compression
+        "gzip": dict(GZIP_STATS),
+        
+        # Intent classifier in use (model = trained Naive Bayes, regex = keyword lists)
+        "intent_classifier": intent_classifier.backend if intent_classifier else None,
+        
+        # Category index loads, evictions and residency
+        "index_manager": category_index_manager.stats(),
+        "exact_match": dict(exact_match_index.metrics),
+        "language_index": language_index.snapshot(),
+        "retrieval_executor": retrieval_executor.snapshot(),
+        "suggest": dict(suggest_index.metrics),
+        
+        # LLM circuit breaker (open = low-match queries get the degraded keyword path)
+        "llm_breaker": llm_breaker.snapshot(),
+        
+        # Admission control (shed = answered without the LLM under load)
+        "admission": {"requests": request_slots.snapshot(), "llm": llm_slots.snapshot()},
+        
+        # Request tracing and profiling
+        "tracing": dict(TRACE_STATS),
+        "query_log": dict(query_log.stats) if query_log else None,
+        "feedback_log": dict(feedback_log.stats) if feedback_log else None,
+        "feedback_priors": dict(feedback_priors.stats),
+        "analytics_rollups": dict(analytics.stats),
+        
+        # Per-phase startup timings and snapshot status
+        "startup": STARTUP_REPORT,
+        
         # Knowledge base info
         "total_schemes": len(KNOWLEDGE_BASE),
         "categories": list(set(s.get("category", "other") for s in KNOWLEDGE_BASE)),
-        "languages_supported": ["hi", "en"]
+        "languages_supported": language_index.languages()
     }
 
 @app.get("/analytics")
@@ -374,8 +802,6 @@ def get_analytics(token: Optional[str] = None):
     """Admin-only analytics dashboard data (simple token auth)"""
     
     # Simple token-based auth (for demo purposes)
-    ADMIN_TOKEN = "gramsevak_admin_2024"
-    
     if token != ADMIN_TOKEN:
         raise HTTPException(status_code=403, detail="Unauthorized - Invalid token")
     
@@ -431,13 +857,48 @@ def get_analytics(token: Optional[str] = None):
         "rate_limit_stats": {
             "blocked_attempts": RATE_LIMIT["blocked_attempts"],
             "active_ips": len(RATE_LIMIT["requests"])
-        }
+        },
+        # Survives restarts (per-minute rollups)
+        "last_24h": analytics.summary(time.time() - 24 * 3600, time.time() + BUCKET_SECONDS)
+    }
+
+# Longest /analytics/timeseries response; coarser steps are used beyond it
+MAX_TIMESERIES_POINTS = 1440
+
+@app.get("/analytics/timeseries")
+def get_analytics_timeseries(
+    token: Optional[str] = None,
+    minutes: int = 60,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    step: int = BUCKET_SECONDS
+):
+    """Admin-only traffic, latency, bytes and cache trends from per-minute rollups"""
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Unauthorized - Invalid token")
+    
+    # Range is [start, end) in epoch seconds; default is the last `minutes`
+    end = end if end is not None else time.time() + BUCKET_SECONDS
+    start = start if start is not None else end - BUCKET_SECONDS - minutes * 60
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    step = max(step, BUCKET_SECONDS, int((end - start) / MAX_TIMESERIES_POINTS))
+    step = -(-step // BUCKET_SECONDS) * BUCKET_SECONDS  # Whole minutes
+    
+    return {
+        "start": int(start),
+        "end": int(end),
+        "step": step,
+        "points": analytics.timeseries(start, end, step),
+        "summary": analytics.summary(start, end)
     }
 
 class Feedback(BaseModel):
-    response_id: str
+    response_id: str  # From the /query response; aggregate_feedback.py only counts responses the feedback log shows as served
     is_helpful: bool
     category: Optional[str] = None
+    entry_id: Optional[str] = None  # Knowledge base entry of the rated answer (from the /query response)
 
 @app.post("/feedback")
 async def submit_feedback(feedback: Feedback, request: Request):
@@ -463,7 +924,17 @@ async def submit_feedback(feedback: Feedback, request: Request):
     else:
         STATS["not_helpful_count"] += 1
     
-    print(f"📊 Feedback received: {'👍' if feedback.is_helpful else '👎'} for {feedback.response_id}")
+    # Queued for the background writer; aggregate_feedback.py turns the log into ranking priors
+    if feedback_log:
+        feedback_log.log({
+            "ts": round(time.time(), 3),
+            "response_id": feedback.response_id,
+            "entry_id": feedback.entry_id,
+            "helpful": feedback.is_helpful,
+            "category": feedback.category
+        })
+    
+    print(f"📊 Feedback received: {'👍' if feedback.is_helpful else '👎'} for {feedback.response_id} ({feedback.entry_id or 'no entry'})")
     
     return {
         "success": True,
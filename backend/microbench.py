@@ -0,0 +1,305 @@
+"""
+Micro-benchmarks for GramSevak AI hot paths
+Times IntentClassifier.classify (trained model and regex),
+SafetyFilter.check_safety, ExactMatchIndex.lookup, SuggestIndex.suggest (uncached), simple_keyword_match
+and load_category_index (cold loads through CategoryIndexManager). The retrieval paths run over synthetic knowledge
+bases scaled to 1x, 10x and 100x the current knowledge_base/, using golden
+queries (question_hi + variants) per category, so the complexity curve of
+each path is visible. Results can be saved as JSON and compared with a
+baseline to catch regressions.
+
+Usage:
+    python microbench.py --output bench.json
+    python microbench.py --baseline bench.json --max-regression 0.2
+"""
+
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from kb_loader import iter_entries, list_kb_files
+from intent_classifier import IntentClassifier
+from safety_filter import SafetyFilter
+from index_manager import CategoryIndexManager
+from exact_match import ExactMatchIndex
+from suggest import SuggestIndex
+from rag_pipeline import simple_keyword_match
+
+DEFAULT_SCALES = [1, 10, 100]
+
+# Golden queries sampled per category
+QUERIES_PER_CATEGORY = 5
+
+def load_entries(kb_dir: Path) -> List[Dict]:
+    entries = []
+    for kb_file in list_kb_files(kb_dir):
+        entries.extend(iter_entries(kb_file))
+    return entries
+
+def golden_queries(entries: List[Dict], per_category: int, seed: int) -> Dict[str, List[str]]:
+    """{category: [queries]} from each category's questions and variants"""
+    by_category = {}
+    for entry in entries:
+        questions = [entry["question_hi"]] if entry.get("question_hi") else []
+        questions.extend(entry.get("question_variants", []))
+        by_category.setdefault(entry.get("category", "general"), []).extend(questions)
+
+    rng = random.Random(seed)
+    return {
+        category: rng.sample(questions, min(per_category, len(questions)))
+        for category, questions in sorted(by_category.items())
+    }
+
+def scale_entries(entries: List[Dict], factor: int) -> List[Dict]:
+    """Synthetic KB: factor copies of every entry with unique ids"""
+    scaled = []
+    for copy in range(factor):
+        for entry in entries:
+            clone = dict(entry)
+            if copy:
+                clone["id"] = f"{entry.get('id', 'entry')}_syn{copy}"
+            scaled.append(clone)
+    return scaled
+
+def measure(func: Callable, calls: List[tuple], min_time: float, rounds: int) -> Dict:
+    """
+    pytest-benchmark-style timing: each round runs every call in `calls`
+    enough times to last min_time; stats are per call in microseconds
+    """
+    def run_once():
+        for args in calls:
+            func(*args)
+
+    # Calibrate iterations per round
+    iterations = 1
+    while True:
+        round_start = time.perf_counter()
+        for _ in range(iterations):
+            run_once()
+        elapsed = time.perf_counter() - round_start
+        if elapsed >= min_time or iterations >= 1 << 20:
+            break
+        iterations *= 2
+
+    samples = []
+    for _ in range(rounds):
+        round_start = time.perf_counter()
+        for _ in range(iterations):
+            run_once()
+        elapsed = time.perf_counter() - round_start
+        samples.append(elapsed / (iterations * len(calls)) * 1e6)
+
+    return {
+        "min_us": round(min(samples), 3),
+        "median_us": round(statistics.median(samples), 3),
+        "mean_us": round(statistics.mean(samples), 3),
+        "stddev_us": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        "ops_per_s": round(1e6 / statistics.median(samples), 1),
+        "rounds": rounds,
+        "iterations": iterations,
+        "calls_per_iteration": len(calls)
+    }
+
+def bench_load_category_index(entries: List[Dict], min_time: float, rounds: int) -> Dict:
+    """Cold load of every category index (fresh manager per load)"""
+    by_category = {}
+    for entry in entries:
+        by_category.setdefault(entry.get("category", "general"), []).append(entry)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for category, category_entries in by_category.items():
+            with open(Path(tmp_dir) / f"{category}_index.json", "w", encoding="utf-8") as f:
+                json.dump(category_entries, f, ensure_ascii=False, indent=2)
+
+        def cold_load(category):
+            manager = CategoryIndexManager(Path(tmp_dir), memory_budget_bytes=1 << 40)
+            manager.get(category)
+
+        with redirect_stdout(io.StringIO()):  # Silence per-load log lines
+            return measure(cold_load, [(c,) for c in sorted(by_category)], min_time, rounds)
+
+def run_benchmarks(entries: List[Dict], scales: List[int], min_time: float, rounds: int, seed: int) -> Dict:
+    golden = golden_queries(entries, QUERIES_PER_CATEGORY, seed)
+    all_queries = [(q,) for queries in golden.values() for q in queries]
+    results = {"golden_queries": sum(len(q) for q in golden.values()), "benchmarks": {}}
+
+    classifier = IntentClassifier()
+    safety_filter = SafetyFilter()
+
+    # Query-only paths: cost does not depend on KB size
+    print("⏱️  IntentClassifier.classify")
+    results["benchmarks"]["classify"] = {
+        "per_category": {
+            category: measure(classifier.classify, [(q,) for q in queries], min_time, rounds)
+            for category, queries in golden.items()
+        },
+        "all": measure(classifier.classify, all_queries, min_time, rounds)
+    }
+    print("⏱️  IntentClassifier.classify (regex keywords)")
+    results["benchmarks"]["classify_regex"] = {
+        "all": measure(IntentClassifier(model_file=None).classify, all_queries, min_time, rounds)
+    }
+    print("⏱️  SafetyFilter.check_safety")
+    results["benchmarks"]["check_safety"] = {
+        "all": measure(safety_filter.check_safety, all_queries, min_time, rounds)
+    }
+
+    # Typeahead on the first word of each golden query, ranking uncached
+    # (scaled copies repeat the same questions, so only the real KB is timed)
+    print("⏱️  SuggestIndex.suggest")
+    suggest_index = SuggestIndex()
+    suggest_index.load(entries, index_file=None)
+    
+    def suggest_uncached(prefix):
+        suggest_index._ranked.cache_clear()
+        return suggest_index.suggest(prefix)
+    
+    results["benchmarks"]["suggest"] = {
+        "first_word": measure(suggest_uncached, [(q.split()[0],) for (q,) in all_queries if q.split()], min_time, rounds)
+    }
+
+    # KB-dependent paths at each scale
+    exact = {}
+    keyword = {}
+    loads = {}
+    for scale in scales:
+        scaled = scale_entries(entries, scale)
+        print(f"⏱️  exact match / simple_keyword_match / load_category_index @ {scale}x ({len(scaled)} entries)")
+        
+        # Golden queries are known questions, so every lookup is a hit
+        exact_index = ExactMatchIndex()
+        exact_index.load(scaled, index_file=None)
+        exact[f"{scale}x"] = {
+            "entries": len(scaled),
+            "all": measure(
+                exact_index.lookup,
+                [(q, category) for category, queries in golden.items() for q in queries],
+                min_time, rounds
+            )
+        }
+
+        # Search within the query's own category, as answer_query does
+        per_category = {}
+        for category, queries in golden.items():
+            category_entries = [e for e in scaled if e.get("category", "general") == category]
+            per_category[category] = measure(
+                simple_keyword_match, [(q, category_entries) for q in queries], min_time, rounds
+            )
+        keyword[f"{scale}x"] = {
+            "entries": len(scaled),
+            "per_category": per_category,
+            "full_kb": measure(simple_keyword_match, [(q, scaled) for (q,) in all_queries], min_time, rounds)
+        }
+        loads[f"{scale}x"] = {
+            "entries": len(scaled),
+            "all_categories": bench_load_category_index(scaled, min_time, rounds)
+        }
+
+    results["benchmarks"]["exact_match"] = exact
+    results["benchmarks"]["simple_keyword_match"] = keyword
+    results["benchmarks"]["load_category_index"] = loads
+    return results
+
+def growth(series: Dict[str, Dict], key: str) -> Dict[str, float]:
+    """Median time at each scale relative to 1x (linear = 10.0 at 10x)"""
+    base = series.get("1x", {}).get(key, {}).get("median_us")
+    if not base:
+        return {}
+    return {scale: round(data[key]["median_us"] / base, 2) for scale, data in series.items()}
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """{"path.to.benchmark": min_us} for baseline comparison (min is least noisy)"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            if "min_us" in value:
+                flat[prefix + key] = value["min_us"]
+            else:
+                flat.update(flatten(value, prefix + key + "."))
+    return flat
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Benchmarks whose fastest round got slower than the allowed fraction"""
+    current_flat = flatten(current["benchmarks"])
+    baseline_flat = flatten(baseline["benchmarks"])
+    regressions = []
+    for name, min_us in sorted(current_flat.items()):
+        base_us = baseline_flat.get(name)
+        if base_us and min_us > base_us * (1 + max_regression):
+            regressions.append(f"{name}: {base_us:.1f}µs → {min_us:.1f}µs (+{(min_us / base_us - 1) * 100:.0f}%)")
+    return regressions
+
+def print_report(results: Dict):
+    benchmarks = results["benchmarks"]
+    print("\n" + "=" * 70)
+    print("📊 MICRO-BENCHMARKS (median per call)")
+    print("=" * 70)
+    print(f"classify (all golden queries):      {benchmarks['classify']['all']['median_us']:>10.1f}µs")
+    print(f"classify regex (all golden queries):{benchmarks['classify_regex']['all']['median_us']:>10.1f}µs")
+    print(f"check_safety (all golden queries):  {benchmarks['check_safety']['all']['median_us']:>10.1f}µs")
+    for scale, data in benchmarks["exact_match"].items():
+        print(f"exact_match lookup @ {scale:>4}:          {data['all']['median_us']:>10.1f}µs")
+    print(f"suggest (first word, uncached):     {benchmarks['suggest']['first_word']['median_us']:>10.1f}µs")
+    for scale, data in benchmarks["simple_keyword_match"].items():
+        print(f"simple_keyword_match full KB @ {scale:>4}: {data['full_kb']['median_us']:>10.1f}µs ({data['entries']} entries)")
+    for scale, data in benchmarks["load_category_index"].items():
+        print(f"load_category_index @ {scale:>4}:         {data['all_categories']['median_us']:>10.1f}µs")
+    print(f"\n📈 Growth vs 1x  exact_match:   {growth(benchmarks['exact_match'], 'all')}")
+    print(f"                 keyword_match: {growth(benchmarks['simple_keyword_match'], 'full_kb')}")
+    print(f"                 load_index:    {growth(benchmarks['load_category_index'], 'all_categories')}")
+    print("=" * 70)
+
+def main():
+    parser = argparse.ArgumentParser(description="GramSevak AI micro-benchmarks")
+    parser.add_argument("--kb-dir", default=str(Path(__file__).parent / "knowledge_base"))
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES))
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON result")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    entries = load_entries(Path(args.kb_dir))
+    print(f"✓ Loaded {len(entries)} entries from {args.kb_dir}")
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "kb_entries": len(entries),
+            "min_time": args.min_time,
+            "rounds": args.rounds,
+            "seed": args.seed
+        },
+        **run_benchmarks(entries, [int(s) for s in args.scales.split(",")], args.min_time, args.rounds, args.seed)
+    }
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) over {args.max_regression:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Versioned offline pack for GramSevak AI
+One pack is built at index time (top entries by confidence_weight) and is
+served by /offline-pack and shipped as frontend/offline_cache.json. Every
+entry carries a content hash and the pack version is a hash of all of
+them, so clients can revalidate with ETags and download only changed
+entries via /offline-pack/delta.
+
+The build also emits a compact search index over the pack so phones can
+answer offline with the same scoring as simple_keyword_match.
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional
+from keyword_tables import KEYWORD_SYNONYMS, FUZZY_MATCHES, entry_search_text
+
+# Number of entries in the pack
+OFFLINE_PACK_SIZE = 200
+
+# Past versions kept for delta sync
+OFFLINE_PACK_HISTORY = 10
+
+INDICES_DIR = Path(__file__).parent / "indices"
+PACK_FILE = INDICES_DIR / "offline_pack.json"
+HISTORY_FILE = INDICES_DIR / "offline_pack_history.json"
+
+def _short_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+def entry_record(entry: Dict) -> Dict:
+    """Compact offline record for one entry, with its content hash"""
+    record = {
+        "id": entry.get("id"),
+        "q": entry["question_hi"],
+        "a": entry["summary"],
+        "s": entry.get("title", entry.get("category", "सामान्य")),
+        "variants": entry.get("question_variants", [])
+    }
+    record["h"] = _short_hash(json.dumps(record, ensure_ascii=False, sort_keys=True))
+    return record
+
+def build_pack(records: List[Dict]) -> Dict:
+    """Wrap ordered records into a versioned pack"""
+    version = _short_hash("\n".join(f"{r['id']}:{r['h']}" for r in records))
+    return {
+        "version": version,
+        "count": len(records),
+        "data": records
+    }
+
+def build_pack_from_entries(entries: List[Dict], limit: int = OFFLINE_PACK_SIZE) -> Dict:
+    """Build a pack directly from knowledge base entries (runtime fallback)"""
+    # Stable sort: ties keep load order, same as the build-time heap
+    top = sorted(entries, key=lambda e: e.get("confidence_weight", 0), reverse=True)[:limit]
+    return build_pack([entry_record(e) for e in top if "question_hi" in e and "summary" in e])
+
+def load_history(history_file: Path = HISTORY_FILE) -> List[Dict]:
+    """Past pack versions as [{"version": v, "entries": {id: hash}}], oldest first"""
+    if not history_file.exists():
+        return []
+    with open(history_file, "r", encoding="utf-8") as f:
+        return json.load(f).get("versions", [])
+
+def save_pack(pack: Dict, pack_file: Path = PACK_FILE, history_file: Path = HISTORY_FILE) -> List[Dict]:
+    """Write the pack and append its version to the delta history"""
+    with open(pack_file, "w", encoding="utf-8") as f:
+        json.dump(pack, f, ensure_ascii=False, separators=(",", ":"))
+
+    history = load_history(history_file)
+    if not history or history[-1]["version"] != pack["version"]:
+        history.append({
+            "version": pack["version"],
+            "entries": {r["id"]: r["h"] for r in pack["data"]}
+        })
+    history = history[-OFFLINE_PACK_HISTORY:]
+
+    with open(history_file, "w", encoding="utf-8") as f:
+        json.dump({"versions": history}, f, ensure_ascii=False, separators=(",", ":"))
+
+    return history
+
+def load_pack(pack_file: Path = PACK_FILE) -> Optional[Dict]:
+    """Load the prebuilt pack, or None if build_index.py has not been run"""
+    if not pack_file.exists():
+        return None
+    with open(pack_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def compute_delta(pack: Dict, history: List[Dict], since: str) -> Optional[Dict]:
+    """
+    Entries changed between a client's version and the current pack
+
+    Returns None when the client's version is unknown (too old or never
+    built), in which case the client should download the full pack.
+    """
+    if since == pack["version"]:
+        return {"version": pack["version"], "since": since, "changed": [], "removed": []}
+
+    previous = next((h["entries"] for h in history if h["version"] == since), None)
+    if previous is None:
+        return None
+
+    current_ids = set()
+    changed = []
+    for record in pack["data"]:
+        current_ids.add(record["id"])
+        if previous.get(record["id"]) != record["h"]:
+            changed.append(record)
+
+    return {
+        "version": pack["version"],
+        "since": since,
+        # Full ordering lets the client rebuild the pack from its cache
+        "order": [r["id"] for r in pack["data"]],
+        "changed": changed,
+        "removed": [entry_id for entry_id in previous if entry_id not in current_ids]
+    }
+
+def search_text_rest(entry: Dict) -> str:
+    """entry_search_text after the question and summary the pack record already carries"""
+    text = entry_search_text(entry)
+    prefix = (entry["question_hi"] + " " + entry["summary"] + " ").lower()
+    return text[len(prefix):] if text.startswith(prefix) else text
+
+def build_search_index(entries: List[Dict], version: str) -> Dict:
+    """
+    Prebuilt offline search index over the pack entries (same order as pack data)
+
+    Scoring stages of simple_keyword_match that depend on server-only text
+    are precomputed here:
+      syn:  {hindi_trigger: [[entry, points], ...]}  (+10 per synonym found)
+      fz:   {misspelling: [entry, ...]}               (+8)
+      tags: per-entry tags                           (+15 when in query)
+      txt:  per-entry search text after the record's question and summary
+            (title, tags, category, subcategory, eligibility); the client
+            joins q + " " + a + " " + txt into entry_search_text and adds +3
+            per query word found in it as a substring, like the server
+    Variant (+50/+30/+5) and title (+20) stages use the pack records.
+    """
+    texts = [entry_search_text(entry) for entry in entries]
+
+    synonyms = {}
+    for trigger, words in KEYWORD_SYNONYMS.items():
+        postings = []
+        for i, text in enumerate(texts):
+            points = 10 * sum(1 for word in words if word in text)
+            if points:
+                postings.append([i, points])
+        if postings:
+            synonyms[trigger] = postings
+
+    fuzzy = {}
+    for wrong, correct in FUZZY_MATCHES.items():
+        postings = [i for i, text in enumerate(texts) if correct in text]
+        if postings:
+            fuzzy[wrong] = postings
+
+    return {
+        "version": version,
+        "syn": synonyms,
+        "fz": fuzzy,
+        "tags": [[tag.lower() for tag in entry.get("tags", [])] for entry in entries],
+        "txt": [search_text_rest(entry) for entry in entries],
+        "cw": [entry.get("confidence_weight", 0) for entry in entries]
+    }
+
+def save_search_index(index: Dict, output_path: Path) -> int:
+    """Write the search index compactly; returns its size in bytes"""
+    body = json.dumps(index, ensure_ascii=False, separators=(",", ":"))
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(body)
+    return len(body.encode("utf-8"))
@@ -0,0 +1,140 @@
+"""
+Query log for GramSevak AI
+Appends one JSON line per /query (normalized, privacy-scrubbed text,
+category, retrieval method, latency, bytes) from a background thread, so
+the request path never waits on disk. Files rotate by size like
+logging's RotatingFileHandler (query_log.jsonl, .1, .2, ...). The log is
+the input of replay_queries.py.
+"""
+
+import os
+import re
+import json
+import queue
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Log file (empty = disabled); relative paths are under backend/
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "logs/query_log.jsonl")
+QUERY_LOG_MAX_MB = float(os.getenv("QUERY_LOG_MAX_MB", "10"))
+QUERY_LOG_BACKUPS = int(os.getenv("QUERY_LOG_BACKUPS", "5"))
+
+# Records waiting to be written; when full, new records are dropped
+QUERY_LOG_QUEUE_SIZE = 10000
+
+# Personal data removed before anything is written (order matters)
+SCRUB_PATTERNS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"\b[a-z]{5}\d{4}[a-z]\b"), "<pan>"),  # PAN (text is lowercased)
+    (re.compile(r"\b\d{4}\s?\d{4}\s?\d{4}\b"), "<aadhaar>"),
+    (re.compile(r"(?:\+?91[\s-]?)?\b[6-9]\d{9}\b"), "<phone>"),
+    (re.compile(r"\b\d{6,}\b"), "<num>"),  # Account numbers, PIN codes, IDs
+]
+
+def normalize_query(text: str) -> str:
+    """NFC, lowercase, ASCII digits (Devanagari digits too) and single spaces"""
+    text = unicodedata.normalize("NFC", text).lower()
+    text = "".join(
+        str(unicodedata.digit(ch)) if ch.isdigit() and not ch.isascii() else ch
+        for ch in text
+    )
+    return " ".join(text.split())
+
+def scrub_query(text: str) -> str:
+    """Normalized query with phone, Aadhaar, PAN, email and long numbers masked"""
+    text = normalize_query(text)
+    for pattern, replacement in SCRUB_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+class QueryLogWriter:
+    """Background JSONL writer with size-based rotation"""
+
+    def __init__(self, path: Path, max_bytes: int, backups: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.Queue(maxsize=QUERY_LOG_QUEUE_SIZE)
+        self._thread = None
+        self.stats = {"logged": 0, "dropped": 0, "rotations": 0, "errors": 0}
+
+    def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="query-log", daemon=True)
+        self._thread.start()
+
+    def log(self, record: Dict):
+        """Queue a record without blocking (dropped if the writer falls behind)"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def close(self, timeout: float = 5.0):
+        """Flush queued records and stop the writer thread"""
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is waiting into the same write
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = None in batch
+            records = [r for r in batch if r is not None]
+            if records:
+                self._write(records)
+            if stopping:
+                return
+
+    def _write(self, records: List[Dict]):
+        lines = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+        try:
+            if self.path.exists() and self.path.stat().st_size + len(lines.encode("utf-8")) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self.stats["logged"] += len(records)
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Query log write failed: {e}")
+
+    def _rotate(self):
+        """query_log.jsonl -> .1 -> .2 ...; the oldest backup is removed"""
+        for i in range(self.backups - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{i}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self.stats["rotations"] += 1
+
+def log_files(path: Path) -> List[Path]:
+    """Current log and its backups, oldest first (replay order)"""
+    path = Path(path)
+    backups = sorted(
+        path.parent.glob(f"{path.name}.*"),
+        key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0,
+        reverse=True
+    )
+    return [p for p in backups if p.suffix[1:].isdigit()] + ([path] if path.exists() else [])
+
+def create_writer() -> Optional[QueryLogWriter]:
+    """Writer configured from the environment, or None if disabled"""
+    if not QUERY_LOG_PATH:
+        return None
+    path = Path(QUERY_LOG_PATH)
+    if not path.is_absolute():
+        path = Path(__file__).parent / path
+    return QueryLogWriter(path, int(QUERY_LOG_MAX_MB * 1024 * 1024), QUERY_LOG_BACKUPS)
@@ -1,243 +1,222 @@
 import os
 import asyncio
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import re
-import json
+from itertools import zip_longest
 from pathlib import Path
 from intent_classifier import IntentClassifier
 from safety_filter import SafetyFilter
+from tier_payloads import entry_response_fields, precompute_tier_payloads
+from keyword_tables import KEYWORD_SYNONYMS, FUZZY_MATCHES, entry_search_text
+from index_manager import CategoryIndexManager, INDEX_MEMORY_BUDGET_MB, object_bytes
+from exact_match import ExactMatchIndex
+from language_index import LanguageIndex
+from feedback_store import FeedbackPriors
+from tracing import span
+from retrieval_executor import RETRIEVAL_EXECUTOR, RETRIEVAL_WORKERS, RetrievalExecutor
+from admission import ADMISSION_QUEUE_MS, MAX_INFLIGHT_LLM, ConcurrencyLimit
+from circuit_breaker import (
+    LLM_BREAKER_COOLDOWN_SECONDS, LLM_BREAKER_FAILURES, LLM_MIN_BUDGET_MS, CircuitBreaker, llm_time_budget
+)
 
-# Initialize safety filter
-safety_filter = SafetyFilter()
+try:
+    from groq import APITimeoutError, Groq
+except ImportError:
+    APITimeoutError = Groq = None
 
-# Category-based index cache
-_category_indices = {}
+# Safety filter and LLM client are built during the startup phase (main.py);
+# scripts that skip it get them built on first use
+_safety_filter = None
+_llm_client = None
+
+def get_safety_filter() -> SafetyFilter:
+    """Shared safety filter (crisis patterns compiled once)"""
+    global _safety_filter
+    if _safety_filter is None:
+        _safety_filter = SafetyFilter()
+    return _safety_filter
+
+def get_llm_client():
+    """Shared Groq client, or None without GROQ_API_KEY or the groq package"""
+    global _llm_client
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if _llm_client is None and groq_api_key and Groq is not None:
+        # GROQ_BASE_URL points the client at a stub server for load tests.
+        # No client retries: they would spend the request deadline, and
+        # llm_breaker decides when the provider is worth calling again
+        _llm_client = Groq(api_key=groq_api_key, base_url=os.getenv("GROQ_BASE_URL") or None, max_retries=0)
+    return _llm_client
+
+# Opens after repeated LLM failures / deadline overruns; answer_query then
+# uses the degraded keyword path until a half-open probe succeeds
+llm_breaker = CircuitBreaker("LLM", LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN_SECONDS)
+
+# Concurrent LLM calls; queries that can't get a slot in time are shed
+llm_slots = ConcurrencyLimit("llm", MAX_INFLIGHT_LLM)
+
+# Category-based index cache (LRU within a memory budget)
+# Tier payloads are keyed by entry id and already cover the full knowledge
+# base, so evicting a category does not need to drop them
+category_index_manager = CategoryIndexManager(
+    Path(__file__).parent / "indices",
+    memory_budget_bytes=int(INDEX_MEMORY_BUDGET_MB * 1024 * 1024),
+    # Precompute 2G/3G/4G answer variants for each loaded category
+    on_load=lambda category, entries: precompute_tier_payloads(entries)
+)
+
+# Normalized known questions -> entries (loaded at startup; empty = scoring only)
+exact_match_index = ExactMatchIndex()
+
+# Per-script postings: which entries a query can match (loaded at startup; empty = scan everything)
+language_index = LanguageIndex()
+
+# Per-entry score boosts from user feedback (aggregate_feedback.py; empty = none)
+feedback_priors = FeedbackPriors()
+
+# Keyword score an entry needs to be returned as a match
+MIN_MATCH_SCORE = 5
 
 def load_category_index(category: str) -> List[Dict]:
     """Load category-specific index from file (cached)"""
-    global _category_indices
+    return category_index_manager.get(category)
+
+# Enhanced keyword matching with better flexibility
+def keyword_score(query_lower: str, entry: Dict) -> int:
+    """Keyword match score of one entry for a lowercased query"""
+    score = 0
     
-    # Return from cache if already loaded
-    if category in _category_indices:
-        return _category_indices[category]
+    # Get all searchable text (support both old and new schema)
+    entry_text = entry_search_text(entry)
     
-    # Load from file
-    indices_dir = Path(__file__).parent / "indices"
-    index_file = indices_dir / f"{category}_index.json"
+    # 1. Check direct keyword matches
+    for hindi_word, eng_words in KEYWORD_SYNONYMS.items():
+        if hindi_word in query_lower:
+            for eng_word in eng_words:
+                if eng_word in entry_text:
+                    score += 10
     
-    if not index_file.exists():
-        print(f"⚠️  Category index not found: {category}")
-        return []
+    # 2. Check question variants (highest priority)
+    for variant in entry.get("question_variants", []):
+        variant_lower = variant.lower()
+        # Exact match
+        if variant_lower == query_lower:
+            score += 50
+        # Partial match
+        elif variant_lower in query_lower or query_lower in variant_lower:
+            score += 30
+        # Word overlap
+        else:
+            query_words = set(query_lower.split())
+            variant_words = set(variant_lower.split())
+            overlap = len(query_words & variant_words)
+            if overlap > 0:
+                score += overlap * 5
     
-    try:
-        with open(index_file, "r", encoding="utf-8") as f:
-            entries = json.load(f)
-            _category_indices[category] = entries
-            print(f"📂 Loaded {len(entries)} entries for category: {category}")
-            return entries
-    except Exception as e:
-        print(f"❌ Error loading category index {category}: {e}")
-        return []
+    # 3. Check tags
+    for tag in entry.get("tags", []):
+        if tag.lower() in query_lower:
+            score += 15
+    
+    # 4. Check scheme/title name
+    scheme_name = entry.get("title", entry.get("scheme", "")).lower()
+    if scheme_name and scheme_name in query_lower:
+        score += 20
+    
+    # 5. Word-by-word matching in question and answer
+    query_words = query_lower.split()
+    for word in query_words:
+        if len(word) > 2:  # Skip very short words
+            if word in entry_text:
+                score += 3
+    
+    # 6. Fuzzy matching for common misspellings
+    for wrong, correct in FUZZY_MATCHES.items():
+        if wrong in query_lower and correct in entry_text:
+            score += 8
+    
+    return score
 
-# Enhanced keyword matching with better flexibility
-def simple_keyword_match(query: str, knowledge_base: List[Dict]) -> Dict:
-    """Fast keyword-based matching with fuzzy search - returns structured data"""
+def boosted_score(score: int, entry: Dict) -> int:
+    """
+    Keyword score plus the entry's feedback boost. Only matches move, and
+    never below MIN_MATCH_SCORE: feedback reorders answers to a query but
+    does not decide whether there is one.
+    """
+    if score > MIN_MATCH_SCORE:
+        boost = feedback_priors.boosts.get(entry.get("id"))
+        if boost:
+            return max(MIN_MATCH_SCORE + 1, score + boost)
+    return score
+
+def rank_keyword_matches(query: str, knowledge_base: List[Dict], k: int = 3) -> List[tuple]:
+    """Top-k (score, entry) pairs with a positive score, best first (ties keep KB order)"""
+    query_lower = query.lower()
+    scored = [(boosted_score(keyword_score(query_lower, entry), entry), entry) for entry in knowledge_base]
+    scored = [pair for pair in scored if pair[0] > 0]
+    scored.sort(key=lambda pair: -pair[0])
+    return scored[:k]
+
+def best_keyword_match(query: str, knowledge_base: List[Dict]) -> Tuple[int, Optional[Dict]]:
+    """Highest (score, entry); the first entry wins ties, (0, None) if nothing scores"""
     query_lower = query.lower()
-    
-    # Expanded keyword mappings (Hindi + English + Hinglish + Common phrases)
-    keywords = {
-        # Government Schemes
-        "किसान": ["pmkisan", "kisan", "farmer", "खेती", "kheti", "agriculture"],
-        "उज्ज्वला": ["ujjwala", "gas", "lpg", "cylinder", "सिलेंडर"],
-        "आयुष्मान": ["ayushman", "health", "hospital", "इलाज", "ilaj", "treatment"],
-        "पेंशन": ["pension", "atal", "retirement", "बुढ़ापा"],
-        "नौकरी": ["mgnrega", "job", "work", "काम", "kaam", "employment", "रोजगार"],
-        "घर": ["awas", "house", "home", "मकान", "makaan", "housing"],
-        "लोन": ["mudra", "loan", "credit", "कर्ज", "karj", "उधार"],
-        "राशन": ["ration", "food", "खाना", "अनाज", "grain"],
-        "शौचालय": ["toilet", "swachh", "sanitation", "latrine"],
-        "बैंक": ["bank", "account", "खाता", "jandhan"],
-        
-        # Agriculture
-        "फसल": ["crop", "खेती", "farming", "बुवाई", "sowing"],
-        "बीज": ["seed", "beej", "variety"],
-        "खाद": ["fertilizer", "urea", "npk", "manure"],
-        "कीड़ा": ["pest", "insect", "disease", "रोग"],
-        "पानी": ["water", "irrigation", "सिंचाई", "drip"],
-        "मंडी": ["mandi", "market", "price", "भाव", "rate"],
-        
-        # Health
-        "बीमारी": ["disease", "illness", "sick", "बुखार", "fever"],
-        "दवा": ["medicine", "tablet", "गोली", "treatment"],
-        "डॉक्टर": ["doctor", "hospital", "clinic", "अस्पताल"],
-        "टीका": ["vaccine", "vaccination", "immunization"],
-        
-        # Education
-        "पढ़ाई": ["education", "study", "school", "स्कूल"],
-        "छात्रवृत्ति": ["scholarship", "financial_aid"],
-        "नौकरी": ["job", "employment", "career"],
-        
-        # Financial
-        "पैसा": ["money", "paisa", "rupee", "रुपया"],
-        "बचत": ["savings", "save", "deposit"],
-        "ब्याज": ["interest", "rate"],
-        
-        # Common intent words
-        "कैसे": ["how", "kaise", "process", "method"],
-        "क्या": ["what", "kya", "information"],
-        "कितना": ["how much", "kitna", "amount", "quantity"],
-        "कहां": ["where", "kahan", "location"],
-        "कब": ["when", "kab", "time", "date"],
-    }
     
     # Score each entry
     best_match = None
     best_score = 0
     
     for entry in knowledge_base:
-        score = 0
-        
-        # Get all searchable text (support both old and new schema)
-        entry_text = (
-            entry.get("question_hi", "") + " " + 
-            entry.get("summary", entry.get("answer_hi", "")) + " " +
-            entry.get("title", entry.get("scheme", "")) + " " +
-            " ".join(entry.get("tags", [])) + " " +
-            entry.get("category", "") + " " +
-            entry.get("subcategory", "") + " " +
-            entry.get("eligibility", entry.get("eligibility_hi", ""))
-        ).lower()
-        
-        # 1. Check direct keyword matches
-        for hindi_word, eng_words in keywords.items():
-            if hindi_word in query_lower:
-                for eng_word in eng_words:
-                    if eng_word in entry_text:
-                        score += 10
-        
-        # 2. Check question variants (highest priority)
-        for variant in entry.get("question_variants", []):
-            variant_lower = variant.lower()
-            # Exact match
-            if variant_lower == query_lower:
-                score += 50
-            # Partial match
-            elif variant_lower in query_lower or query_lower in variant_lower:
-                score += 30
-            # Word overlap
-            else:
-                query_words = set(query_lower.split())
-                variant_words = set(variant_lower.split())
-                overlap = len(query_words & variant_words)
-                if overlap > 0:
-                    score += overlap * 5
-        
-        # 3. Check tags
-        for tag in entry.get("tags", []):
-            if tag.lower() in query_lower:
-                score += 15
-        
-        # 4. Check scheme/title name
-        scheme_name = entry.get("title", entry.get("scheme", "")).lower()
-        if scheme_name and scheme_name in query_lower:
-            score += 20
-        
-        # 5. Word-by-word matching in question and answer
-        query_words = query_lower.split()
-        for word in query_words:
-            if len(word) > 2:  # Skip very short words
-                if word in entry_text:
-                    score += 3
-        
-        # 6. Fuzzy matching for common misspellings
-        fuzzy_matches = {
-            "kisaan": "kisan",
-            "kissan": "kisan",
-            "yojna": "yojana",
-            "yojana": "scheme",
-            "paisa": "money",
-            "paise": "money",
-        }
-        for wrong, correct in fuzzy_matches.items():
-            if wrong in query_lower and correct in entry_text:
-                score += 8
-        
+        score = boosted_score(keyword_score(query_lower, entry), entry)
         if score > best_score:
             best_score = score
             best_match = entry
     
+    return best_score, best_match
+
+def keyword_match_result(best_score: int, best_match: Optional[Dict]) -> Optional[Dict]:
+    """Structured match if the score is reasonable, else None"""
     # Return structured match if confidence is reasonable
-    if best_match and best_score > 5:
+    if best_match and best_score > MIN_MATCH_SCORE:
         # Calculate confidence
         match_confidence = min(best_score / 50, 1.0)
-        
-        # Use confidence_weight from entry if available
-        if best_match.get("confidence_weight"):
-            entry_confidence = best_match["confidence_weight"]
-            final_confidence = min((match_confidence + entry_confidence) / 2, 1.0)
-        else:
-            final_confidence = match_confidence
-        
-        # Determine retrieval method based on confidence
-        if final_confidence >= 0.7:
-            retrieval_method = "direct_match"
-        elif final_confidence >= 0.4:
-            retrieval_method = "semantic_match"
-        else:
-            retrieval_method = "semantic_match"  # Low confidence semantic
-        
-        # Extract structured fields from upgraded schema
-        result = {
-            "summary": best_match.get("summary", best_match.get("answer_hi", "")),
-            "scheme_name": best_match.get("title", best_match.get("scheme", best_match.get("category", "सामान्य"))),
-            "source": "keyword_match",
-            "confidence": final_confidence,
-            "retrieval_method": retrieval_method,
-            "similarity_score": best_score / 100,  # Normalize to 0-1
-            "last_updated": best_match.get("last_updated")  # Add freshness indicator
-        }
-        
-        # Add optional fields if available
-        if best_match.get("eligibility"):
-            result["eligibility"] = best_match["eligibility"]
-        
-        if best_match.get("documents_required"):
-            result["documents_required"] = best_match["documents_required"]
-        
-        if best_match.get("benefits"):
-            result["benefits"] = best_match["benefits"]
-        
-        if best_match.get("official_link"):
-            result["official_link"] = best_match["official_link"]
-        
-        return result
+        return match_result(best_match, match_confidence, best_score / 100)  # Normalize to 0-1
     
     return None
 
-async def answer_query(query_text: str, knowledge_base: List[Dict], category_filter: Optional[str] = None, simulate_2g: bool = False) -> Dict:
-    """
-    Multi-stage retrieval with safety checks and confidence scoring:
-    0. Safety filter check (crisis detection)
-    1. Intent classification (category detection)
-    2. Load category-specific index (if category detected)
-    3. Fast keyword matching
-    4. LLM-based answer if no good match (fallback)
-    
-    Args:
-        query_text: User query
-        knowledge_base: Full knowledge base (fallback only)
-        category_filter: Optional category to filter KB (from intent classifier)
-    """
+def simple_keyword_match(query: str, knowledge_base: List[Dict]) -> Dict:
+    """Fast keyword-based matching with fuzzy search - returns structured data"""
+    return keyword_match_result(*best_keyword_match(query, knowledge_base))
+
+def match_result(entry: Dict, match_confidence: float, similarity_score: float) -> Dict:
+    """Structured keyword_match answer for an entry"""
+    # Use confidence_weight from entry if available
+    if entry.get("confidence_weight"):
+        entry_confidence = entry["confidence_weight"]
+        final_confidence = min((match_confidence + entry_confidence) / 2, 1.0)
+    else:
+        final_confidence = match_confidence
     
-    # STAGE 0: Safety Filter Check
-    is_crisis, crisis_type, emergency_response = safety_filter.check_safety(query_text)
+    # Determine retrieval method based on confidence
+    if final_confidence >= 0.7:
+        retrieval_method = "direct_match"
+    elif final_confidence >= 0.4:
+        retrieval_method = "semantic_match"
+    else:
+        retrieval_method = "semantic_match"  # Low confidence semantic
     
-    if is_crisis:
-        print(f"⚠️  CRISIS DETECTED: {crisis_type} - Returning emergency response")
-        # Return emergency response immediately, DO NOT use LLM
-        return emergency_response
+    # Extract structured fields from upgraded schema
+    result = entry_response_fields(entry)
+    result.update({
+        "entry_id": entry.get("id"),
+        "source": "keyword_match",
+        "confidence": final_confidence,
+        "retrieval_method": retrieval_method,
+        "similarity_score": similarity_score
+    })
     
-    # STAGE 1: Load category-specific index if category is specified
+    return result
+
+def select_search_kb(knowledge_base: List[Dict], category_filter: Optional[str] = None) -> List[Dict]:
+    """Entries to search: the category index if a category is given, else the full KB"""
     search_kb = knowledge_base  # Default to full KB
     
     if category_filter and category_filter != 'general':
@@ -258,8 +237,135 @@ async def answer_query(query_text: str, knowledge_base: List[Dict], category_fil
     else:
         print(f"🔍 Searching in all categories ({len(search_kb)} entries)")
     
-    # STAGE 2: Try keyword matching first
-    keyword_result = simple_keyword_match(query_text, search_kb)
+    return search_kb
+
+# Entries of the searched index given to the LLM as context
+LLM_CONTEXT_ENTRIES = 10
+
+# Fan-out retrieval: when the classifier indicates several categories,
+# search up to FANOUT_MAX_CATEGORIES of them (each with at least
+# FANOUT_MIN_SHARE of the classifier score) instead of just the top one
+FANOUT_MAX_CATEGORIES = int(os.getenv("FANOUT_MAX_CATEGORIES", "3"))
+FANOUT_MIN_SHARE = float(os.getenv("FANOUT_MIN_SHARE", "0.2"))
+
+def retrieve(query_text: str, knowledge_base: List[Dict], category_filter: Optional[str] = None,
+             lang: Optional[str] = None) -> Tuple[Optional[Dict], int, List[Dict]]:
+    """Stages 2-3 (index load + keyword scan): (keyword match or None, its score, LLM context entries)"""
+    feedback_priors.refresh()  # Picks up a newly aggregated priors file
+    
+    with span("index_load"):
+        search_kb = select_search_kb(knowledge_base, category_filter)
+    
+    # Only entries sharing a word with the query's script partitions are scored
+    with span("language_route"):
+        candidates = language_index.narrow(search_kb, query_text, lang)
+    
+    with span("keyword_match"):
+        best_score, best_match = best_keyword_match(query_text, candidates)
+        keyword_result = keyword_match_result(best_score, best_match)
+    
+    return keyword_result, best_score, search_kb[:LLM_CONTEXT_ENTRIES]
+
+def fanout_categories(category_candidates: Optional[List[Tuple[str, float]]]) -> List[Tuple[str, float]]:
+    """Candidate (category, share) pairs worth searching, best first"""
+    if not category_candidates:
+        return []
+    selected = [c for c in category_candidates[:FANOUT_MAX_CATEGORIES] if c[1] >= FANOUT_MIN_SHARE]
+    return selected or category_candidates[:1]
+
+def fanout_weight(score: int, max_score: int, share: float) -> float:
+    """Keyword score relative to the fan-out's best, boosted by the category's classifier share"""
+    return score / max_score * (1 + share) if max_score else 0.0
+
+def merge_fanout(results: List[Tuple[Optional[Dict], int, List[Dict]]], shares: List[float]) -> Tuple[Optional[Dict], List[Dict]]:
+    """
+    Best match across category searches: each keyword score is normalized
+    by the best score of the fan-out and weighted by the category's share
+    of the classifier score, so close calls go to the likelier category.
+    The LLM context interleaves each category's entries.
+    """
+    max_score = max((score for _, score, _ in results), default=0)
+    keyword_result = None
+    best = 0.0
+    for (result, score, _), share in zip(results, shares):
+        weighted = fanout_weight(score, max_score, share)
+        if result and weighted > best:
+            keyword_result, best = result, weighted
+    
+    contexts = [context for _, _, context in results]
+    llm_context = [entry for group in zip_longest(*contexts) for entry in group if entry is not None]
+    return keyword_result, llm_context[:LLM_CONTEXT_ENTRIES]
+
+def preload_retrieval(knowledge_base: List[Dict]):
+    """Load every category index, the language postings and feedback priors (run once in each retrieval worker process)"""
+    category_index_manager.baseline_bytes = object_bytes(knowledge_base)
+    category_index_manager.prewarm(category_index_manager.available_categories())
+    language_index.load(knowledge_base)
+    feedback_priors.load()
+
+# Where retrieve() runs: event loop, thread pool or worker processes
+# (started by main.py; inline until then)
+retrieval_executor = RetrievalExecutor(retrieve, RETRIEVAL_EXECUTOR, RETRIEVAL_WORKERS,
+                                       preload=preload_retrieval)
+
+async def answer_query(query_text: str, knowledge_base: List[Dict], category_filter: Optional[str] = None, simulate_2g: bool = False,
+                       deadline: Optional[float] = None, keyword_only: bool = False,
+                       category_candidates: Optional[List[Tuple[str, float]]] = None,
+                       lang: Optional[str] = None) -> Dict:
+    """
+    Multi-stage retrieval with safety checks and confidence scoring:
+    0. Safety filter check (crisis detection)
+    1. Exact match of a known question (constant time)
+    2. Load category-specific index (if category detected; the top few
+       concurrently if the classifier is split between categories)
+    3. Fast keyword matching over the entries in the query's script
+       partitions (2-3 on the retrieval executor)
+    4. LLM-based answer if no good match (fallback), within the deadline,
+       an LLM slot and only while llm_breaker is closed; otherwise the
+       degraded path
+    
+    Args:
+        query_text: User query
+        knowledge_base: Full knowledge base (fallback only)
+        category_filter: Optional category to filter KB (from intent classifier)
+        deadline: time.monotonic() by which the request should be answered
+        keyword_only: Never call the LLM (request shed by admission control)
+        category_candidates: Ranked (category, share) from classify_top_k; two
+            or more worth searching are searched concurrently and merged
+        lang: Query.lang; picks the script partition when the query has no letters
+    """
+    
+    # STAGE 0: Safety Filter Check
+    with span("safety_filter"):
+        is_crisis, crisis_type, emergency_response = get_safety_filter().check_safety(query_text)
+    
+    if is_crisis:
+        print(f"⚠️  CRISIS DETECTED: {crisis_type} - Returning emergency response")
+        # Return emergency response immediately, DO NOT use LLM
+        return emergency_response
+    
+    # STAGE 1: Known question asked (near-)verbatim - skip scoring
+    with span("exact_match"):
+        exact_entry = exact_match_index.lookup(query_text, category_filter)
+    
+    if exact_entry:
+        result = match_result(exact_entry, 1.0, 1.0)
+        result["retrieval_method"] = "direct_match"
+        print(f"✅ Exact question match: {exact_entry.get('id')}")
+        return result
+    
+    # STAGES 2-3: Category index + keyword matching, off the event loop
+    # unless RETRIEVAL_EXECUTOR=inline
+    fanout = fanout_categories(category_candidates)
+    with span("retrieval"):
+        if len(fanout) > 1:
+            print(f"🔀 Fan-out search: {', '.join(f'{c} ({share:.0%})' for c, share in fanout)}")
+            results = await asyncio.gather(*(
+                retrieval_executor.run(query_text, knowledge_base, category, lang) for category, _ in fanout
+            ))
+            keyword_result, llm_context = merge_fanout(results, [share for _, share in fanout])
+        else:
+            keyword_result, _, llm_context = await retrieval_executor.run(query_text, knowledge_base, category_filter, lang)
     
     # Check confidence threshold
     if keyword_result:
@@ -280,13 +386,13 @@ async def answer_query(query_text: str, knowledge_base: List[Dict], category_fil
             keyword_result["retrieval_method"] = "semantic_match"  # Low confidence = semantic
             return keyword_result
     
-    # STAGE 3: Use LLM for complex queries or low confidence matches
+    # STAGE 4: Use LLM for complex queries or low confidence matches
     # Skip LLM if in 2G simulation mode
     if simulate_2g:
         print("🐌 2G Mode: Skipping LLM, using best keyword match")
         if keyword_result:
+            # Shortened by the caller's 2G tier (sentence-aware, precomputed payload)
             keyword_result["simulate_2g_mode"] = True
-            keyword_result["summary"] = keyword_result["summary"][:200] + "..." if len(keyword_result["summary"]) > 200 else keyword_result["summary"]
             return keyword_result
         else:
             return {
@@ -300,36 +406,76 @@ async def answer_query(query_text: str, knowledge_base: List[Dict], category_fil
                 "last_updated": None
             }
     
+    if keyword_only:
+        print("🚦 Shed under load, skipping LLM")
+        return degraded_answer(keyword_result)
+    
+    # Not enough time left, too many LLM calls already, or the provider
+    # keeps failing: don't wait on it
+    budget = llm_time_budget(deadline)
+    if budget * 1000 < LLM_MIN_BUDGET_MS:
+        print(f"⏱️  Deadline: {max(budget, 0) * 1000:.0f}ms left, skipping LLM")
+        return degraded_answer(keyword_result)
+    # Checked before queueing for a slot, so an open breaker never adds wait time
+    if llm_breaker.is_open():
+        print("⚡ LLM circuit open, skipping LLM")
+        return degraded_answer(keyword_result)
+    if not await llm_slots.acquire(min(ADMISSION_QUEUE_MS, budget * 1000 - LLM_MIN_BUDGET_MS) / 1000):
+        print(f"🚦 All {llm_slots.limit} LLM slots busy, skipping LLM")
+        return degraded_answer(keyword_result)
+    
     try:
-        llm_result = await llm_answer(query_text, search_kb)
-        return llm_result
-    except Exception as e:
-        print(f"⚠️  LLM Error: {e}")
-        
-        # Fallback: Return best keyword match with fallback flag
-        if keyword_result:
-            print("📴 Fallback mode: Using best keyword match")
-            keyword_result["fallback_mode"] = True
-            keyword_result["retrieval_method"] = "semantic_match"
-            keyword_result["summary"] = (
-                keyword_result["summary"] + 
-                "\n\n⚠️ यह उत्तर अनुमान आधारित है, कृपया आधिकारिक स्रोत देखें।"
-            )
-            return keyword_result
+        if not llm_breaker.allow():
+            print("⚡ LLM circuit open, skipping LLM")
+            return degraded_answer(keyword_result)
         
-        # Ultimate fallback
-        return {
-            "summary": "क्षमा करें, मुझे इस प्रश्न का उत्तर नहीं मिला। कृपया 1800-180-1551 पर संपर्क करें।",
-            "scheme_name": "Unknown",
-            "source": "fallback",
-            "confidence": 0.0,
-            "retrieval_method": "semantic_match",
-            "similarity_score": 0.0,
-            "fallback_mode": True
-        }
+        budget = llm_time_budget(deadline)  # Less any time queued for the slot
+        try:
+            with span("llm"):
+                llm_result = await llm_answer(query_text, llm_context, timeout=budget)
+            llm_breaker.record_success()
+            return llm_result
+        except asyncio.TimeoutError:
+            print(f"⏱️  LLM timed out after {budget * 1000:.0f}ms")
+            llm_breaker.record_failure(f"timed out after {budget * 1000:.0f}ms", timeout=True)
+        except Exception as e:
+            print(f"⚠️  LLM Error: {e}")
+            llm_breaker.record_failure(str(e) or type(e).__name__)
+    finally:
+        llm_slots.release()
+    
+    return degraded_answer(keyword_result)
 
-async def llm_answer(query_text: str, knowledge_base: List[Dict]) -> Dict:
-    """Use Groq API for intelligent answers - returns structured data"""
+def degraded_answer(keyword_result: Optional[Dict]) -> Dict:
+    """Answer without the LLM: best keyword match with a disclaimer, or the helpline"""
+    # Fallback: Return best keyword match with fallback flag
+    if keyword_result:
+        print("📴 Fallback mode: Using best keyword match")
+        keyword_result["fallback_mode"] = True
+        keyword_result["retrieval_method"] = "semantic_match"
+        keyword_result["summary"] = (
+            keyword_result["summary"] + 
+            "\n\n⚠️ यह उत्तर अनुमान आधारित है, कृपया आधिकारिक स्रोत देखें।"
+        )
+        return keyword_result
+    
+    # Ultimate fallback
+    return {
+        "summary": "क्षमा करें, मुझे इस प्रश्न का उत्तर नहीं मिला। कृपया 1800-180-1551 पर संपर्क करें।",
+        "scheme_name": "Unknown",
+        "source": "fallback",
+        "confidence": 0.0,
+        "retrieval_method": "semantic_match",
+        "similarity_score": 0.0,
+        "fallback_mode": True
+    }
+
+async def llm_answer(query_text: str, knowledge_base: List[Dict], timeout: Optional[float] = None) -> Dict:
+    """
+    Use Groq API for intelligent answers - returns structured data.
+    The call runs in a worker thread so a slow provider doesn't block the
+    event loop; raises asyncio.TimeoutError after `timeout` seconds.
+    """
     
     # Check if Groq API key is available
     groq_api_key = os.getenv("GROQ_API_KEY")
@@ -347,11 +493,12 @@ async def llm_answer(query_text: str, knowledge_base: List[Dict]) -> Dict:
         }
     
     try:
-        from groq import Groq
-        client = Groq(api_key=groq_api_key)
+        client = get_llm_client()
+        if client is None:
+            raise RuntimeError("groq package is not installed")
         
         # Build context from top schemes
-        context_schemes = knowledge_base[:10]  # Use top 10 for context
+        context_schemes = knowledge_base[:LLM_CONTEXT_ENTRIES]
         context = "\n".join([
             f"विषय: {s.get('scheme', s.get('category', 'सामान्य'))}\nप्रश्न: {s.get('question_hi', '')}\nउत्तर: {s.get('answer_hi', '')}"
             for s in context_schemes
@@ -366,12 +513,17 @@ async def llm_answer(query_text: str, knowledge_base: List[Dict]) -> Dict:
 
 उत्तर (केवल 3-4 वाक्यों में, सरल हिंदी में):"""
         
-        response = client.chat.completions.create(
+        if timeout is None:
+            timeout = llm_time_budget(None)
+        # The HTTP timeout lets the worker thread finish soon after wait_for gives up
+        response = await asyncio.wait_for(asyncio.to_thread(
+            client.chat.completions.create,
             model="llama-3.1-8b-instant",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=150,
-            temperature=0.1
-        )
+            temperature=0.1,
+            timeout=timeout
+        ), timeout)
         
         answer_text = response.choices[0].message.content.strip()
         
@@ -385,6 +537,10 @@ async def llm_answer(query_text: str, knowledge_base: List[Dict]) -> Dict:
             "last_updated": None  # LLM responses don't have fixed update date
         }
     
+    except asyncio.TimeoutError:
+        raise
     except Exception as e:
+        if APITimeoutError is not None and isinstance(e, APITimeoutError):
+            raise asyncio.TimeoutError() from e  # HTTP timeout fired just before wait_for's
         print(f"LLM Error: {e}")
         raise
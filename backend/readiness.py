@@ -0,0 +1,140 @@
+"""
+Readiness checks for GramSevak AI
+After startup, a warmup self-test answers one labelled real query per
+resident category index the way /query does (classifier candidates,
+deadline, lang). The queries are user phrasings rather than KB questions,
+so they miss the exact-match stage and exercise the category scan,
+fan-out and executor. /health/ready only reports ready once startup has
+completed and every warmup query answered within the latency target, so
+load balancers keep traffic away from cold instances. A failed warmup is
+re-run by a later /health/ready call, WARMUP_RETRY_SECONDS after the
+failure and doubling up to WARMUP_RETRY_MAX_SECONDS, so one slow run does
+not leave the instance unready until restart
+"""
+
+import os
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from language_index import token_script
+
+# Slowest acceptable warmup query (ms) for the instance to be routable
+READY_LATENCY_MS = float(os.getenv("READY_LATENCY_MS", "250"))
+
+# Wait before re-running a failed warmup (doubles per failure, capped)
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+WARMUP_RETRY_MAX_SECONDS = 300
+
+# Labelled queries ({"query", "entry_ids"}) warmup picks from; relative paths are under backend/
+WARMUP_QUERIES_FILE = Path(__file__).parent / os.getenv("WARMUP_QUERIES_FILE", "golden_queries.json")
+
+# Latest warmup results, exposed through /health/ready
+WARMUP_REPORT = {
+    "completed": False,
+    "queries": 0,
+    "passed": 0,
+    "failed": [],  # [{"query": ..., "reason": ...}]
+    "retrieval_methods": {},
+    "max_ms": 0.0,
+    "avg_ms": 0.0,
+    "latency_target_ms": READY_LATENCY_MS,
+    "attempts": 0,
+    "finished_at": None,
+    "next_retry_at": None  # Set while the last run failed
+}
+
+_retry_lock = asyncio.Lock()
+
+def query_lang(text: str) -> str:
+    """Query.lang a client would send (Devanagari = hi, romanized = hinglish)"""
+    return "hi" if any(token_script(word) == "DEVANAGARI" for word in text.split()) else "hinglish"
+
+def representative_queries(resident: List[str], route: Callable[[str], List[str]],
+                           is_known_question: Callable[[str], bool],
+                           queries_file: Path = WARMUP_QUERIES_FILE) -> List[Dict]:
+    """
+    Up to one labelled query per resident category index, as {"text", "lang"}
+
+    A query is skipped if the exact-match stage would answer it or if any
+    category it routes to is not resident, so warmup measures the scan
+    without loading (or evicting) indices that INDEX_PREWARM left cold.
+    """
+    try:
+        with open(queries_file, "r", encoding="utf-8") as f:
+            labelled = json.load(f)
+    except (OSError, ValueError):
+        return []
+
+    resident = set(resident)
+    covered = set()
+    queries = []
+    for item in labelled:
+        text = item.get("query", "")
+        if not text or is_known_question(text):
+            continue
+        categories = route(text)
+        if not categories or categories[0] in covered or not resident.issuperset(categories):
+            continue
+        covered.add(categories[0])
+        queries.append({"text": text, "lang": query_lang(text)})
+    return queries
+
+async def run_warmup(queries: List[Dict], answer: Callable) -> Dict:
+    """Answer each query with answer(text, lang) and record latency and failures"""
+    timings = []
+    failed = []
+    methods = {}
+
+    for query in queries:
+        query_start = time.perf_counter()
+        try:
+            result = await answer(query["text"], query["lang"])
+            elapsed_ms = (time.perf_counter() - query_start) * 1000
+            method = result.get("retrieval_method", "semantic_match")
+            methods[method] = methods.get(method, 0) + 1
+            if not result.get("summary"):
+                failed.append({"query": query["text"], "reason": "empty answer"})
+            elif elapsed_ms > READY_LATENCY_MS:
+                failed.append({"query": query["text"], "reason": f"slow ({elapsed_ms:.1f}ms)"})
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - query_start) * 1000
+            failed.append({"query": query["text"], "reason": str(e)})
+        timings.append(elapsed_ms)
+
+    WARMUP_REPORT["attempts"] += 1
+    WARMUP_REPORT.update({
+        "completed": True,
+        "queries": len(queries),
+        "passed": len(queries) - len(failed),
+        "failed": failed,
+        "retrieval_methods": methods,
+        "max_ms": round(max(timings), 2) if timings else 0.0,
+        "avg_ms": round(sum(timings) / len(timings), 2) if timings else 0.0,
+        "finished_at": time.time()
+    })
+    schedule_retry()
+    return WARMUP_REPORT
+
+def schedule_retry():
+    """Set (or clear) when a failed warmup may be re-run; call after adding failures"""
+    if WARMUP_REPORT["failed"]:
+        delay = min(WARMUP_RETRY_MAX_SECONDS, WARMUP_RETRY_SECONDS * 2 ** (WARMUP_REPORT["attempts"] - 1))
+        WARMUP_REPORT["next_retry_at"] = WARMUP_REPORT["finished_at"] + delay
+    else:
+        WARMUP_REPORT["next_retry_at"] = None
+
+async def retry_warmup_if_due(run: Callable) -> bool:
+    """Await run() (a full warmup) if the last one failed and its backoff has passed; one retry at a time"""
+    retry_at = WARMUP_REPORT["next_retry_at"]
+    if retry_at is None or time.time() < retry_at or _retry_lock.locked():
+        return False
+    async with _retry_lock:
+        await run()
+    return True
+
+def warmup_passed() -> bool:
+    # No resident index (INDEX_PREWARM=none) leaves nothing warm to measure
+    return WARMUP_REPORT["completed"] and not WARMUP_REPORT["failed"]
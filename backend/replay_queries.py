@@ -0,0 +1,231 @@
+"""
+Replay captured queries against GramSevak AI
+Feeds a query log (query_log.py) back through the pipeline, either
+in-process (IntentClassifier + answer_query, no server needed) or over HTTP
+(/query), at the original pace, accelerated, or as fast as possible.
+Reports latency percentiles, answer sources, bytes and how many answers
+differ from what was logged (entry or retrieval method), so performance
+and cache-sizing work can be checked against real traffic shapes.
+
+Usage:
+    python replay_queries.py logs/query_log.jsonl                    # in-process, max speed
+    python replay_queries.py logs/query_log.jsonl --speed 1          # original pace
+    python replay_queries.py logs/query_log.jsonl --mode http --base-url http://127.0.0.1:8000 --speed 10 --concurrency 8
+"""
+
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from query_log import log_files
+
+def read_log(paths: List[Path], limit: Optional[int] = None) -> List[Dict]:
+    """Records from the given files (a base log path includes its rotated backups)"""
+    records = []
+    for path in paths:
+        files = log_files(path) if not path.suffix[1:].isdigit() else [path]
+        for log_file in files:
+            with open(log_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        records.append(json.loads(line))
+    records.sort(key=lambda r: r.get("ts", 0))
+    return records[:limit] if limit else records
+
+def schedule(records: List[Dict], speed: float) -> List[float]:
+    """Send offsets (seconds from start) preserving original gaps / speed"""
+    if speed <= 0 or not records:
+        return [0.0] * len(records)
+    first = records[0].get("ts", 0)
+    return [(r.get("ts", first) - first) / speed for r in records]
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def compare(record: Dict, result: Dict) -> Dict:
+    """Replayed answer vs logged answer"""
+    return {
+        "latency_ms": result["latency_ms"],
+        "bytes": result.get("bytes", 0),
+        "source": result.get("source"),
+        "ok": result.get("ok", True),
+        "entry_changed": result.get("entry_id") != record.get("entry_id"),
+        "method_changed": result.get("method") != record.get("method")
+    }
+
+def replay_inprocess(records: List[Dict], offsets: List[float], kb_dir: Path) -> List[Dict]:
+    """Classify + answer_query in this process (sequential, paced)"""
+    from kb_loader import iter_entries, list_kb_files
+    from dedupe import apply_merges, load_merged_entries
+    from intent_classifier import IntentClassifier
+    from rag_pipeline import answer_query, exact_match_index, language_index
+
+    knowledge_base = []
+    for kb_file in list_kb_files(kb_dir):
+        knowledge_base.extend(iter_entries(kb_file))
+    knowledge_base = apply_merges(knowledge_base, load_merged_entries())
+    exact_match_index.load(knowledge_base)
+    language_index.load(knowledge_base)
+    classifier = IntentClassifier()
+
+    async def run():
+        outcomes = []
+        replay_start = time.perf_counter()
+        for record, offset in zip(records, offsets):
+            delay = offset - (time.perf_counter() - replay_start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            with redirect_stdout(io.StringIO()):  # Silence pipeline log lines
+                query_start = time.perf_counter()
+                category, _ = classifier.classify(record["q"])
+                # simulate_2g only skips the LLM here; /query's 0.5s delay is not replayed
+                result = await answer_query(record["q"], knowledge_base, category_filter=category,
+                                            simulate_2g=record.get("simulate_2g", False), lang=record.get("lang"))
+                latency_ms = (time.perf_counter() - query_start) * 1000
+
+            outcomes.append(compare(record, {
+                "latency_ms": latency_ms,
+                "source": result.get("source"),
+                "entry_id": result.get("entry_id"),
+                "method": result.get("retrieval_method", "semantic_match")
+            }))
+        return outcomes
+
+    return asyncio.run(run())
+
+def replay_http(records: List[Dict], offsets: List[float], base_url: str, concurrency: int) -> List[Dict]:
+    """POST each record to /query at its scheduled offset"""
+    outcomes = [None] * len(records)
+    replay_start = time.perf_counter()
+    lock = threading.Lock()
+
+    def send(i: int):
+        record = records[i]
+        delay = offsets[i] - (time.perf_counter() - replay_start)
+        if delay > 0:
+            time.sleep(delay)
+
+        payload = {"text": record["q"], "lang": record.get("lang", "hi")}
+        for key in ("network_type", "user_type", "compact", "simulate_2g"):
+            if record.get(key) is not None:
+                payload[key] = record[key]
+        request = urllib.request.Request(
+            base_url + "/query", data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+
+        query_start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                body = response.read()
+            data = json.loads(body)
+            ok = True
+        except (urllib.error.URLError, ValueError):
+            body, data, ok = b"", {}, False
+        latency_ms = (time.perf_counter() - query_start) * 1000
+
+        outcome = compare(record, {
+            "latency_ms": latency_ms,
+            "bytes": len(body),
+            "ok": ok,
+            # Compact responses use short keys (wire_format.COMPACT_KEYS)
+            "source": data.get("source", data.get("o")),
+            "entry_id": data.get("entry_id", data.get("id")),
+            "method": data.get("retrieval_method", data.get("r"))
+        })
+        with lock:
+            outcomes[i] = outcome
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(len(records))))
+    return outcomes
+
+def summarize(records: List[Dict], outcomes: List[Dict], wall_s: float) -> Dict:
+    latencies = sorted(o["latency_ms"] for o in outcomes)
+    logged = sorted(r["latency_ms"] for r in records if r.get("latency_ms") is not None)
+    sources = {}
+    for outcome in outcomes:
+        sources[outcome["source"]] = sources.get(outcome["source"], 0) + 1
+
+    return {
+        "queries": len(outcomes),
+        "wall_s": round(wall_s, 3),
+        "throughput_qps": round(len(outcomes) / wall_s, 1) if wall_s else 0.0,
+        "errors": sum(1 for o in outcomes if not o["ok"]),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2)
+        },
+        "logged_latency_ms": {
+            "p50": round(percentile(logged, 50), 2),
+            "p95": round(percentile(logged, 95), 2),
+            "p99": round(percentile(logged, 99), 2)
+        },
+        "avg_bytes": int(sum(o["bytes"] for o in outcomes) / len(outcomes)) if outcomes else 0,
+        "sources": sources,
+        "entry_changed": sum(1 for o in outcomes if o["entry_changed"]),
+        "method_changed": sum(1 for o in outcomes if o["method_changed"])
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a GramSevak AI query log")
+    parser.add_argument("logs", nargs="+", help="Query log files (rotated backups are included)")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=0, help="1 = original pace, 10 = 10x faster, 0 = no waits")
+    parser.add_argument("--concurrency", type=int, default=8, help="HTTP mode workers")
+    parser.add_argument("--limit", type=int, help="Replay only the first N queries")
+    parser.add_argument("--kb-dir", default=str(Path(__file__).parent / "knowledge_base"))
+    parser.add_argument("--output", help="Write JSON summary to this file")
+    args = parser.parse_args()
+
+    records = read_log([Path(p) for p in args.logs], args.limit)
+    if not records:
+        print("❌ No queries found in log")
+        sys.exit(1)
+
+    offsets = schedule(records, args.speed)
+    pace = f"{args.speed:g}x" if args.speed > 0 else "max speed"
+    print(f"🔁 Replaying {len(records)} queries ({args.mode}, {pace}, log span {offsets[-1]:.0f}s)")
+
+    replay_start = time.perf_counter()
+    if args.mode == "http":
+        outcomes = replay_http(records, offsets, args.base_url, args.concurrency)
+    else:
+        outcomes = replay_inprocess(records, offsets, Path(args.kb_dir))
+    summary = summarize(records, outcomes, time.perf_counter() - replay_start)
+
+    print("\n" + "=" * 60)
+    print("📊 REPLAY RESULTS")
+    print("=" * 60)
+    print(f"Queries:         {summary['queries']} ({summary['errors']} errors)")
+    print(f"Throughput:      {summary['throughput_qps']} q/s")
+    print(f"Latency:         p50 {summary['latency_ms']['p50']}ms  p95 {summary['latency_ms']['p95']}ms  p99 {summary['latency_ms']['p99']}ms")
+    print(f"Logged latency:  p50 {summary['logged_latency_ms']['p50']}ms  p95 {summary['logged_latency_ms']['p95']}ms  p99 {summary['logged_latency_ms']['p99']}ms")
+    print(f"Sources:         {summary['sources']}")
+    print(f"Answer changed:  {summary['entry_changed']} entries, {summary['method_changed']} retrieval methods")
+    print("=" * 60)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "summary": summary}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Summary written to {args.output}")
+
+if __name__ == "__main__":
+    main()
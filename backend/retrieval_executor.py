@@ -0,0 +1,158 @@
+"""
+Retrieval executor for GramSevak AI
+Runs the CPU-bound retrieval stages (category index load + keyword scan)
+off the event loop so one slow scan does not stall every other connection:
+
+    inline  - on the event loop (scripts, single-user dev)
+    thread  - in a thread pool; the loop keeps serving cheap requests in between
+    process - in worker processes that hold the knowledge base and preloaded
+              category indices, so scans also run in parallel with the loop
+
+The safety check and exact-match lookup stay on the loop as the fast path
+(microseconds, cheaper than a hand-off). Until start() is called, and if a
+pool breaks, retrieval runs inline.
+"""
+
+import os
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from tracing import traced_thread
+
+RETRIEVAL_EXECUTOR = os.getenv("RETRIEVAL_EXECUTOR", "thread").lower()
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "0"))  # 0 = CPU count (thread: at least 4)
+
+# Longest start() waits for every process worker to spawn and preload
+WORKER_START_TIMEOUT_S = 60
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+# Worker process state (set by _init_worker)
+_worker_knowledge_base = []
+_worker_barrier = None
+
+def _init_worker(knowledge_base: List[Dict], preload: Optional[Callable], barrier=None):
+    global _worker_knowledge_base, _worker_barrier
+    _worker_knowledge_base = knowledge_base
+    _worker_barrier = barrier
+    if preload:
+        preload(knowledge_base)
+
+def _worker_call(fn: Callable, query_text: str, category_filter: Optional[str], lang: Optional[str]):
+    return fn(query_text, _worker_knowledge_base, category_filter, lang)
+
+def _worker_ready(timeout: float) -> int:
+    """Block until every worker holds one of these calls, so each worker runs exactly one"""
+    if _worker_barrier is not None:
+        _worker_barrier.wait(timeout)
+    return os.getpid()
+
+def _thread_call(fn: Callable, *args):
+    """Run fn on a pool thread that the request's profiler samples while it works"""
+    with traced_thread():
+        return fn(*args)
+
+class RetrievalExecutor:
+    def __init__(self, retrieve: Callable, mode: str = "thread", workers: int = 0,
+                 preload: Optional[Callable] = None):
+        """
+        Args:
+            retrieve: retrieve(query_text, knowledge_base, category_filter, lang),
+                a module-level function (process mode pickles it by name)
+            mode: inline, thread or process
+            workers: Pool size (0 = CPU count)
+            preload: Called once in each worker process with the knowledge
+                base, e.g. to load category indices
+        """
+        if mode not in EXECUTOR_MODES:
+            print(f"⚠️  Unknown RETRIEVAL_EXECUTOR '{mode}', using inline")
+            mode = "inline"
+        self.retrieve_fn = retrieve
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        if mode == "thread":
+            self.workers = workers or max(4, self.workers)
+        self.preload = preload
+        self._pool = None
+        self.workers_started = 0
+        self.stats = {"calls": 0, "inline_calls": 0, "errors": 0}
+
+    def start(self, knowledge_base: List[Dict]):
+        """Create the pool (process workers get the knowledge base and preload once)"""
+        if self.mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="retrieval")
+            self.workers_started = self.workers
+        elif self.mode == "process":
+            # spawn: forking a server with running threads is unsafe
+            context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(knowledge_base, self.preload, context.Barrier(self.workers))
+            )
+            # The pool starts a worker only when no idle one can take a call;
+            # calls that wait on a shared barrier keep every worker busy, so
+            # all of them are spawned (and preloaded) here, not on live requests
+            calls = [self._pool.submit(_worker_ready, WORKER_START_TIMEOUT_S) for _ in range(self.workers)]
+            pids = set()
+            for call in calls:
+                try:
+                    pids.add(call.result())
+                except Exception as e:
+                    print(f"❌ Retrieval worker failed to start: {e!r}")
+            self.workers_started = len(pids)
+            if self.workers_started < self.workers:
+                print(f"❌ Only {self.workers_started}/{self.workers} retrieval workers started")
+
+    def all_workers_started(self) -> bool:
+        """False if start() could not bring up every pool worker (inline mode has none)"""
+        return self.mode == "inline" or (self._pool is not None and self.workers_started == self.workers)
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, query_text: str, knowledge_base: List[Dict], category_filter: Optional[str] = None,
+                  lang: Optional[str] = None):
+        """retrieve(...) on the configured executor"""
+        self.stats["calls"] += 1
+        pool = self._pool
+        if pool is None:
+            self.stats["inline_calls"] += 1
+            return self.retrieve_fn(query_text, knowledge_base, category_filter, lang)
+
+        loop = asyncio.get_running_loop()
+        try:
+            if self.mode == "thread":
+                # Copy the context so tracing spans (and profiling) inside retrieve() still land on this request
+                call = functools.partial(contextvars.copy_context().run, _thread_call, self.retrieve_fn,
+                                         query_text, knowledge_base, category_filter, lang)
+                future = loop.run_in_executor(pool, call)
+            else:
+                future = loop.run_in_executor(pool, _worker_call, self.retrieve_fn, query_text, category_filter, lang)
+        except RuntimeError as e:  # Pool shut down
+            return self._run_inline(e, query_text, knowledge_base, category_filter, lang)
+        try:
+            return await future
+        except BrokenProcessPool as e:  # A worker died
+            return self._run_inline(e, query_text, knowledge_base, category_filter, lang)
+
+    def _run_inline(self, error: Exception, query_text: str, knowledge_base: List[Dict],
+                    category_filter: Optional[str], lang: Optional[str]):
+        """Answer on the loop rather than fail the request"""
+        self.stats["errors"] += 1
+        self.stats["inline_calls"] += 1
+        print(f"⚠️  Retrieval {self.mode} pool unavailable ({error}), running inline")
+        return self.retrieve_fn(query_text, knowledge_base, category_filter, lang)
+
+    def snapshot(self) -> Dict:
+        """Mode and counters for /stats"""
+        return {"mode": self.mode, "workers": self.workers if self.mode != "inline" else 0,
+                "started": self._pool is not None, "workers_started": self.workers_started, **self.stats}
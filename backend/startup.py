@@ -0,0 +1,88 @@
+"""
+Startup phases for GramSevak AI
+Times each phase of server startup and optionally saves the loaded state
+(knowledge base, tier payloads, category indices) to a snapshot file, so a
+restarted container can skip JSON parsing and payload precomputation
+"""
+
+import os
+import time
+import pickle
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Snapshot file path (empty = disabled), e.g. "/tmp/gramsevak_snapshot.pkl"
+STARTUP_SNAPSHOT = os.getenv("STARTUP_SNAPSHOT", "")
+
+# Bump when the snapshot layout changes
+SNAPSHOT_FORMAT = 1
+
+# Modules whose output is stored in the snapshot; editing them invalidates it
+SNAPSHOT_CODE_FILES = ["kb_loader.py", "tier_payloads.py", "wire_format.py"]
+
+# Per-phase timings, exposed through /health and /stats
+STARTUP_REPORT = {
+    "phases": {},  # {phase: ms}
+    "total_ms": 0.0,
+    "snapshot": "disabled",  # "disabled", "loaded", "saved", "stale", "error"
+    "completed": False
+}
+
+@contextmanager
+def startup_phase(name: str):
+    """Time one startup phase and record it in STARTUP_REPORT"""
+    phase_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - phase_start) * 1000
+        STARTUP_REPORT["phases"][name] = round(elapsed_ms, 2)
+        STARTUP_REPORT["total_ms"] = round(sum(STARTUP_REPORT["phases"].values()), 2)
+        print(f"⏱️  Startup phase {name}: {elapsed_ms:.1f}ms")
+
+def source_fingerprint(paths: List[Path]) -> str:
+    """Hash of file names, sizes and modification times"""
+    digest = hashlib.sha256(str(SNAPSHOT_FORMAT).encode("utf-8"))
+    code_dir = Path(__file__).parent
+    for path in sorted(paths) + [code_dir / name for name in SNAPSHOT_CODE_FILES]:
+        if path.exists():
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def load_snapshot(snapshot_path: str, fingerprint: str) -> Optional[Dict]:
+    """Return the snapshot state, or None if missing, stale or unreadable"""
+    path = Path(snapshot_path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        STARTUP_REPORT["snapshot"] = "error"
+        print(f"⚠ Warning: Could not read startup snapshot: {e}")
+        return None
+
+    if snapshot.get("fingerprint") != fingerprint:
+        STARTUP_REPORT["snapshot"] = "stale"
+        print("⚠ Startup snapshot is stale, rebuilding from source files")
+        return None
+
+    STARTUP_REPORT["snapshot"] = "loaded"
+    return snapshot["state"]
+
+def save_snapshot(snapshot_path: str, fingerprint: str, state: Dict):
+    """Atomically write the snapshot (temporary file + rename)"""
+    path = Path(snapshot_path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"fingerprint": fingerprint, "state": state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        STARTUP_REPORT["snapshot"] = "saved"
+        print(f"💾 Saved startup snapshot: {path} ({path.stat().st_size} bytes)")
+    except Exception as e:
+        STARTUP_REPORT["snapshot"] = "error"
+        print(f"⚠ Warning: Could not write startup snapshot: {e}")
@@ -0,0 +1,144 @@
+"""
+Stub LLM server for GramSevak AI load tests
+Answers Groq's OpenAI-compatible chat completions endpoint with a fixed
+Hindi reply after a configurable delay, so the LLM fallback path can be
+benchmarked without network access or API costs.
+
+Faults can be injected to exercise the LLM deadline and circuit breaker:
+a fraction of calls fail with an HTTP error or hang, and the settings can
+be changed while running (POST /faults with any of latency_ms, error_rate,
+error_status, hang_rate, hang_ms; GET /faults shows them and call counts).
+
+Usage:
+    python stub_llm_server.py --port 8100 --latency-ms 700
+    python stub_llm_server.py --port 8100 --error-rate 1                  # provider down
+    python stub_llm_server.py --port 8100 --hang-rate 0.5 --hang-ms 10000  # half the calls hang
+    curl -X POST localhost:8100/faults -d '{"error_rate": 0}'             # recover
+    GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:8100 uvicorn main:app
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANSWER = "यह परीक्षण सर्वर का उत्तर है। नजदीकी CSC केंद्र या पंचायत कार्यालय से पूरी जानकारी लें।"
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+FAULTS_PATH = "/faults"
+
+# Fault settings (changed by the CLI, serve() or POST /faults)
+FAULTS = {
+    "latency_ms": 700.0,  # Delay before each reply
+    "error_rate": 0.0,  # Fraction of calls answered with error_status
+    "error_status": 503,
+    "hang_rate": 0.0,  # Fraction of calls delayed by hang_ms instead
+    "hang_ms": 30000.0
+}
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    calls = 0
+    errors = 0
+    hangs = 0
+    calls_lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path != FAULTS_PATH:
+            self.send_error(404)
+            return
+        self.send_json(200, {**FAULTS, "calls": self.calls, "errors": self.errors, "hangs": self.hangs})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path == FAULTS_PATH:
+            for key, value in request.items():
+                if key in FAULTS:
+                    FAULTS[key] = type(FAULTS[key])(value)
+            self.send_json(200, FAULTS)
+            return
+        if self.path != COMPLETIONS_PATH:
+            self.send_error(404)
+            return
+
+        with self.calls_lock:
+            StubLLMHandler.calls += 1
+            call_id = StubLLMHandler.calls
+
+        roll = random.random()
+        if roll < FAULTS["error_rate"]:
+            with self.calls_lock:
+                StubLLMHandler.errors += 1
+            time.sleep(FAULTS["latency_ms"] / 1000)
+            self.send_json(int(FAULTS["error_status"]), {
+                "error": {"message": "stub: injected failure", "type": "server_error"}
+            })
+            return
+        if roll < FAULTS["error_rate"] + FAULTS["hang_rate"]:
+            with self.calls_lock:
+                StubLLMHandler.hangs += 1
+            time.sleep(FAULTS["hang_ms"] / 1000)
+        else:
+            time.sleep(FAULTS["latency_ms"] / 1000)
+
+        self.send_json(200, {
+            "id": f"stub-{call_id}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": STUB_ANSWER},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        })
+
+    def send_json(self, status: int, data: dict):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (e.g. its deadline passed during a hang)
+
+    def log_message(self, format, *args):
+        pass  # Keep load test output readable
+
+def serve(host: str, port: int, latency_ms: float, **faults) -> ThreadingHTTPServer:
+    """Start the stub in a background thread and return the server (faults: FAULTS keys)"""
+    FAULTS.update(faults, latency_ms=latency_ms)
+    server = ThreadingHTTPServer((host, port), StubLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Groq server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=700.0, help="Delay before each reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of failed calls")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of calls that hang")
+    parser.add_argument("--hang-ms", type=float, default=30000.0, help="How long a hanging call takes")
+    args = parser.parse_args()
+
+    FAULTS.update(latency_ms=args.latency_ms, error_rate=args.error_rate, error_status=args.error_status,
+                  hang_rate=args.hang_rate, hang_ms=args.hang_ms)
+    server = ThreadingHTTPServer((args.host, args.port), StubLLMHandler)
+    print(f"🤖 Stub LLM listening on http://{args.host}:{args.port} ({args.latency_ms:.0f}ms per reply, "
+          f"{args.error_rate:.0%} errors, {args.hang_rate:.0%} hangs)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n✓ Served {StubLLMHandler.calls} completions "
+              f"({StubLLMHandler.errors} failed, {StubLLMHandler.hangs} hung)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Typeahead suggestions for GramSevak AI
+A sorted array of normalized question keys (question_hi and variants, from
+the start of the question and from every later word) searched with binary
+search, so a typed prefix finds its questions in O(log n). Suggestions are
+the original question texts, which the exact-match stage answers directly.
+Built by build_index.py (indices/suggestions.json) and loaded at startup.
+"""
+
+import json
+import bisect
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from exact_match import normalize_question
+
+SUGGEST_INDEX_FILE = Path(__file__).parent / "indices" / "suggestions.json"
+
+# Shortest prefix that gets suggestions (normalized characters)
+SUGGEST_MIN_CHARS = 2
+
+# Most suggestions returned per request
+SUGGEST_MAX_RESULTS = 10
+
+# Distinct prefixes whose ranked results are kept in memory
+SUGGEST_CACHE_SIZE = 4096
+
+def question_keys(text: str) -> List[str]:
+    """Normalized question and its suffixes starting at each later word"""
+    words = normalize_question(text).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+class SuggestIndexBuilder:
+    """Collect questions entry by entry (build_index.py streams the KB)"""
+
+    def __init__(self):
+        self.questions = []  # [text, entry_id, weight]
+        self.keys = []  # [key, question index, from_start]
+        self._seen = set()
+
+    def add(self, entry: Dict):
+        weight = entry.get("confidence_weight", 0.5)
+        for text in [entry.get("question_hi", "")] + list(entry.get("question_variants", [])):
+            text = " ".join(text.split())
+            normalized = normalize_question(text)
+            if not normalized or normalized in self._seen:
+                continue
+            self._seen.add(normalized)
+            for i, key in enumerate(question_keys(text)):
+                self.keys.append([key, len(self.questions), 1 if i == 0 else 0])
+            self.questions.append([text, entry.get("id"), weight])
+
+    def build(self) -> Dict:
+        """
+        {"questions": [[text, entry_id, weight]], "keys": [[key, question, from_start]]}
+        with keys sorted for binary search
+        """
+        return {"questions": self.questions, "keys": sorted(self.keys)}
+
+def build_suggest_index(entries: Iterable[Dict]) -> Dict:
+    builder = SuggestIndexBuilder()
+    for entry in entries:
+        builder.add(entry)
+    return builder.build()
+
+def save_suggest_index(index: Dict, output_path: Path = SUGGEST_INDEX_FILE) -> int:
+    """Write the index; returns file size in bytes"""
+    output_path.parent.mkdir(exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    return output_path.stat().st_size
+
+class SuggestIndex:
+    def __init__(self):
+        self._keys = []  # Sorted normalized keys
+        self._refs = []  # (question index, from_start) per key
+        self._questions = []  # (text, entry_id, weight)
+        self._ranked = lru_cache(maxsize=SUGGEST_CACHE_SIZE)(self._rank)
+        self.metrics = {"keys": 0, "questions": 0, "requests": 0}
+
+    def load(self, knowledge_base: List[Dict], index_file: Optional[Path] = SUGGEST_INDEX_FILE) -> str:
+        """Load the built index, or build it from the knowledge base if missing. Returns the source."""
+        index = None
+        if index_file:
+            try:
+                with open(index_file, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                pass
+        source = "file" if index is not None else "knowledge_base"
+        if index is None:
+            index = build_suggest_index(knowledge_base)
+
+        self._questions = [tuple(q) for q in index["questions"]]
+        self._keys = [key for key, _, _ in index["keys"]]
+        self._refs = [(question, bool(from_start)) for _, question, from_start in index["keys"]]
+        self._ranked.cache_clear()
+        self.metrics["keys"] = len(self._keys)
+        self.metrics["questions"] = len(self._questions)
+        return source
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        """Up to `limit` question texts starting with (or with a word starting with) the prefix"""
+        self.metrics["requests"] += 1
+        key = normalize_question(prefix)
+        if len(key) < SUGGEST_MIN_CHARS:
+            return []
+        return list(self._ranked(key)[:max(0, min(limit, SUGGEST_MAX_RESULTS))])
+
+    def _rank(self, key: str) -> tuple:
+        """
+        Best SUGGEST_MAX_RESULTS questions for a normalized prefix: higher
+        confidence_weight first, then matches at the start of the question,
+        then shorter questions; one question per entry
+        """
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_left(self._keys, key + "\U0010ffff", lo)
+
+        best = {}  # {question index: from_start}
+        for question, from_start in self._refs[lo:hi]:
+            best[question] = best.get(question, False) or from_start
+
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (-self._questions[item[0]][2], not item[1], len(self._questions[item[0]][0]))
+        )
+        texts = []
+        seen_entries = set()
+        for question, _ in ranked:
+            text, entry_id, _ = self._questions[question]
+            entry_key = entry_id or f"question:{question}"
+            if entry_key in seen_entries:
+                continue
+            seen_entries.add(entry_key)
+            texts.append(text)
+            if len(texts) == SUGGEST_MAX_RESULTS:
+                break
+        return tuple(texts)
+
+    def __len__(self) -> int:
+        return len(self._questions)
@@ -0,0 +1,224 @@
+"""
+Per-network-tier response payloads for GramSevak AI
+Keyword-path answers are static, so their 2G/3G/4G variants (compressed
+summary, dropped fields, serialized bytes) are computed once at startup
+instead of on every request. The sentence-aware 2G/3G summaries come from
+indices/summary_tiers.json, written by build_index.py; entries missing
+from it are shortened at startup
+"""
+
+import re
+import json
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from wire_format import compact_fields, drop_nulls, dumps
+
+NETWORK_TIERS = ["2g", "3g", "4g"]
+
+# Summary character limits per tier (4G is sent uncompressed)
+TIER_CHAR_LIMITS = {
+    "2g": 200,
+    "3g": 400
+}
+
+# Optional fields removed from compressed answers (helplines are always kept)
+TIER_DROPPED_FIELDS = {
+    "2g": ["eligibility", "documents_required"]
+}
+
+# Entry-derived answer fields covered by a precomputed payload
+STATIC_FIELDS = (
+    "summary", "scheme_name", "last_updated",
+    "eligibility", "documents_required", "benefits", "official_link"
+)
+
+# Sentence ends (Devanagari danda, full stop, ?, !) and clause ends
+SENTENCE_BOUNDARY = re.compile(r"(?<=[।॥.!?])\s+")
+CLAUSE_BOUNDARY = re.compile(r"(?<=[,;:])\s+")
+
+# Marker appended to shortened summaries
+ELLIPSIS = "..."
+
+SUMMARY_TIERS_FILE = Path(__file__).parent / "indices" / "summary_tiers.json"
+
+# Precomputed payloads: {entry_id: {tier: payload}}
+_tier_payloads = {}
+
+def get_tier(network_type: Optional[str]) -> str:
+    """Map a request network_type to a payload tier"""
+    return network_type if network_type in TIER_CHAR_LIMITS else "4g"
+
+def entry_response_fields(entry: Dict) -> Dict:
+    """Static answer fields of a knowledge base entry (old and new schema)"""
+    fields = {
+        "summary": entry.get("summary", entry.get("answer_hi", "")),
+        "scheme_name": entry.get("title", entry.get("scheme", entry.get("category", "सामान्य"))),
+        "last_updated": entry.get("last_updated")  # Freshness indicator
+    }
+
+    # Add optional fields if available
+    for field in STATIC_FIELDS[3:]:
+        if entry.get(field):
+            fields[field] = entry[field]
+
+    return fields
+
+def _take_pieces(pieces: List[str], limit: int) -> str:
+    """Greedily join leading pieces while the result fits within limit"""
+    out = ""
+    for piece in pieces:
+        candidate = f"{out} {piece}" if out else piece
+        if len(candidate) > limit:
+            break
+        out = candidate
+    return out
+
+def _cut_at_word(text: str, limit: int) -> str:
+    """Cut at the last space before limit, never inside a Devanagari cluster"""
+    cut = text[:limit]
+    if " " in cut:
+        return cut.rsplit(" ", 1)[0]
+    # No space: back off past combining marks (matras, virama, nukta)
+    end = limit
+    while end > 0 and unicodedata.category(text[end]).startswith("M"):
+        end -= 1
+    return text[:end]
+
+def shorten_summary(text: str, limit: int) -> str:
+    """
+    Extractive shortening at sentence (or clause) boundaries
+
+    Keeps as many whole sentences as fit in limit characters; if that would
+    leave less than half the budget, falls back to whole clauses, then to a
+    word boundary. Never cuts a word or a Devanagari grapheme in half.
+    """
+    if len(text) <= limit:
+        return text
+
+    budget = limit - len(ELLIPSIS)
+    shortened = _take_pieces(SENTENCE_BOUNDARY.split(text), budget)
+
+    if len(shortened) < budget // 2:
+        clauses = [
+            clause
+            for sentence in SENTENCE_BOUNDARY.split(text)
+            for clause in CLAUSE_BOUNDARY.split(sentence)
+        ]
+        shortened = _take_pieces(clauses, budget) or _cut_at_word(text, budget)
+
+    return shortened.rstrip(" ,;:-") + ELLIPSIS
+
+def tier_summaries(entry: Dict) -> Dict[str, str]:
+    """Shortened summaries for every tier whose limit the summary exceeds"""
+    summary = entry.get("summary", entry.get("answer_hi", ""))
+    return {
+        tier: shorten_summary(summary, limit)
+        for tier, limit in TIER_CHAR_LIMITS.items()
+        if len(summary) > limit
+    }
+
+def compress_for_tier(result: Dict, network_type: Optional[str], shortened: Optional[str] = None) -> Tuple[bool, Optional[int]]:
+    """
+    Apply adaptive compression to a result dict in place
+
+    shortened is a summary already shortened for this tier (precomputed by
+    build_index.py); otherwise the summary is shortened here.
+
+    Returns:
+        Tuple of (compressed, original_length)
+    """
+    if network_type not in TIER_CHAR_LIMITS:
+        return False, None
+
+    original_summary = result["summary"]
+    original_length = len(original_summary)
+    char_limit = TIER_CHAR_LIMITS[network_type]
+
+    if original_length <= char_limit:
+        return False, original_length
+
+    result["summary"] = shortened or shorten_summary(original_summary, char_limit)
+    for field in TIER_DROPPED_FIELDS.get(network_type, []):
+        result.pop(field, None)
+
+    return True, original_length
+
+def save_summary_tiers(summary_tiers: Dict[str, Dict[str, str]], output_path: Path = SUMMARY_TIERS_FILE) -> int:
+    """Write {entry_id: {tier: shortened summary}}; returns file size in bytes"""
+    output_path.parent.mkdir(exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(summary_tiers.items())), f, ensure_ascii=False, separators=(",", ":"))
+    return output_path.stat().st_size
+
+def load_summary_tiers(tiers_file: Path = SUMMARY_TIERS_FILE) -> Dict[str, Dict[str, str]]:
+    """Build-time shortened summaries ({} if the file is missing or unreadable)"""
+    try:
+        with open(tiers_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def build_tier_payloads(entry: Dict, prebuilt: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+    """Build the 2G/3G/4G variants of one entry's answer (prebuilt = its build-time tier summaries)"""
+    base_fields = entry_response_fields(entry)
+    prebuilt = prebuilt or {}
+    payloads = {}
+
+    for tier in NETWORK_TIERS:
+        fields = dict(base_fields)
+        compressed, original_length = compress_for_tier(fields, tier, prebuilt.get(tier))
+        body = dumps(drop_nulls(fields))
+        compact_body = dumps(compact_fields(fields))
+        payloads[tier] = {
+            "fields": fields,
+            "compressed": compressed,
+            "original_length": original_length,
+            "body": body,
+            "size": len(body),
+            "compact_body": compact_body,
+            "compact_size": len(compact_body),
+            "source_summary": base_fields["summary"]
+        }
+
+    return payloads
+
+def precompute_tier_payloads(entries: List[Dict], summary_tiers: Optional[Dict[str, Dict[str, str]]] = None) -> int:
+    """Precompute payloads for every entry with an id not seen yet; returns count added"""
+    summary_tiers = summary_tiers or {}
+    added = 0
+    for entry in entries:
+        entry_id = entry.get("id")
+        if entry_id and entry_id not in _tier_payloads:
+            _tier_payloads[entry_id] = build_tier_payloads(entry, summary_tiers.get(entry_id))
+            added += 1
+    return added
+
+def tier_payload_count() -> int:
+    return len(_tier_payloads)
+
+def export_tier_payloads() -> Dict[str, Dict]:
+    """All precomputed payloads (for the startup snapshot)"""
+    return dict(_tier_payloads)
+
+def restore_tier_payloads(payloads: Dict[str, Dict]) -> int:
+    """Load payloads saved by export_tier_payloads; returns count restored"""
+    _tier_payloads.update(payloads)
+    return len(payloads)
+
+def get_tier_payload(entry_id: Optional[str], network_type: Optional[str], summary: str) -> Optional[Dict]:
+    """
+    Look up the precomputed payload for an answer
+
+    Returns None when the answer was modified after retrieval (e.g. a
+    disclaimer was appended), so callers fall back to runtime compression.
+    """
+    payloads = _tier_payloads.get(entry_id) if entry_id else None
+    if not payloads:
+        return None
+
+    payload = payloads[get_tier(network_type)]
+    if payload["source_summary"] != summary:
+        return None
+
+    return payload
@@ -0,0 +1,224 @@
+"""
+Request tracing for GramSevak AI
+Each HTTP request gets a trace (held in a contextvar) that records timed
+spans around pipeline stages. The trace ID is returned in X-Trace-Id and
+the spans in a Server-Timing header (visible in browser dev tools).
+
+Slow requests can also be profiled: a sampling thread records the stacks
+of the event loop thread, and of any retrieval pool thread while it works
+on the request, and writes them as folded stacks rooted at the thread name
+(profiles/<trace_id>.folded), ready for flamegraph.pl or speedscope.
+Scans in RETRIEVAL_EXECUTOR=process workers are not sampled.
+Profiling is opt-in, per request via the X-Profile header (admin token)
+or for a random sample of requests (PROFILE_SAMPLE_RATE).
+"""
+
+import os
+import re
+import sys
+import time
+import uuid
+import random
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Requests slower than this are logged with their spans
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "500"))
+
+# Fraction of requests to profile (0 = only on X-Profile with admin token)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+# Sampled profiles are only kept when the request took at least this long
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "200"))
+
+# Stack sampling interval
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(Path(__file__).parent / "profiles")))
+
+# Client-supplied trace IDs are accepted if they look like one
+TRACE_ID_PATTERN = re.compile(r"^[0-9a-fA-F-]{8,64}$")
+
+_current_trace = contextvars.ContextVar("gramsevak_trace", default=None)
+
+# Counters exposed through /stats
+TRACE_STATS = {
+    "traced_requests": 0,
+    "slow_requests": 0,
+    "profiles_written": 0
+}
+
+class Trace:
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.start = time.perf_counter()
+        self.spans = []  # [(name, start_ms, duration_ms)]
+        self.threads = set()  # Idents of pool threads working on this request right now
+
+    def add(self, name: str, start: float, end: float):
+        self.spans.append((name, (start - self.start) * 1000, (end - start) * 1000))
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (repeated span names are summed)"""
+        totals = {}
+        for name, _, duration_ms in self.spans:
+            totals[name] = totals.get(name, 0.0) + duration_ms
+        parts = [f"{name};dur={duration_ms:.2f}" for name, duration_ms in totals.items()]
+        parts.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(parts)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+@contextmanager
+def span(name: str):
+    """Time a block as a span of the current request (no-op outside a request)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    span_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, span_start, time.perf_counter())
+
+@contextmanager
+def traced_thread():
+    """Mark the calling (pool) thread as working for the current request, so its profile samples it"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    ident = threading.get_ident()
+    trace.threads.add(ident)
+    try:
+        yield
+    finally:
+        trace.threads.discard(ident)
+
+class StackSampler:
+    """Samples a thread's stack (plus the trace's pool threads) at a fixed interval into folded-stack counts"""
+
+    # One profile at a time keeps overhead bounded
+    _active = threading.Lock()
+
+    def __init__(self, thread_id: int, interval_ms: float, trace: Optional[Trace] = None):
+        self.thread_id = thread_id
+        self.trace = trace
+        self.interval = interval_ms / 1000
+        self.samples = Counter()
+        self._names = {}  # {ident: thread name}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> bool:
+        if not StackSampler._active.acquire(blocking=False):
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            thread_ids = {self.thread_id}
+            if self.trace is not None:
+                thread_ids.update(list(self.trace.threads))
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    stack.append(self._thread_name(thread_id))
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def _thread_name(self, thread_id: int) -> str:
+        name = self._names.get(thread_id)
+        if name is None:
+            name = next((t.name for t in threading.enumerate() if t.ident == thread_id), str(thread_id))
+            self._names[thread_id] = name
+        return name
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            StackSampler._active.release()
+
+    def write(self, path: Path) -> int:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(self.samples.values())
+
+class TracingMiddleware:
+    """
+    Start a trace per HTTP request and add X-Trace-Id / Server-Timing headers
+
+    Args:
+        admin_token: X-Profile header value that forces a profile
+    """
+
+    def __init__(self, app: ASGIApp, admin_token: Optional[str] = None):
+        self.app = app
+        self.admin_token = admin_token
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        trace_id = headers.get("x-trace-id", "")
+        if not TRACE_ID_PATTERN.match(trace_id):
+            trace_id = uuid.uuid4().hex[:16]
+        trace = Trace(trace_id)
+        token = _current_trace.set(trace)
+        TRACE_STATS["traced_requests"] += 1
+
+        forced = bool(self.admin_token) and headers.get("x-profile") == self.admin_token
+        sampler = None
+        if forced or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+            sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS, trace)
+            if not sampler.start():
+                sampler = None
+
+        async def send_traced(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Trace-Id"] = trace_id
+                response_headers["Server-Timing"] = trace.server_timing()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            _current_trace.reset(token)
+            elapsed_ms = trace.elapsed_ms()
+
+            if elapsed_ms >= TRACE_SLOW_MS:
+                TRACE_STATS["slow_requests"] += 1
+                stages = ", ".join(f"{name}={duration:.1f}ms" for name, _, duration in trace.spans)
+                print(f"🐢 Slow request {scope['path']} [{trace_id}] {elapsed_ms:.0f}ms: {stages}")
+
+            if sampler:
+                sampler.stop()
+                if forced or elapsed_ms >= PROFILE_SLOW_MS:
+                    profile_path = PROFILE_DIR / f"{trace_id}.folded"
+                    sample_count = sampler.write(profile_path)
+                    TRACE_STATS["profiles_written"] += 1
+                    print(f"🔥 Profile written: {profile_path} ({sample_count} samples)")
@@ -3,9 +3,9 @@
 Script to upgrade existing knowledge base entries to new schema
 and generate additional entries to reach 50 per category
 """
-import json
 from pathlib import Path
 from datetime import datetime
+from kb_loader import rewrite_entries
 
 # Category mapping for old entries
 CATEGORY_MAPPING = {
@@ -56,30 +56,21 @@ def upgrade_entry(old_entry, index):
     return new_entry
 
 def upgrade_file(input_file, output_file=None):
-    """Upgrade a knowledge base file"""
+    """Upgrade a knowledge base file, streaming one entry at a time"""
     if output_file is None:
         output_file = input_file
     
     print(f"\n📝 Upgrading {input_file.name}...")
     
     try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            old_entries = json.load(f)
+        stats = rewrite_entries(
+            input_file,
+            output_file,
+            lambda old_entry, i: upgrade_entry(old_entry, i + 1)
+        )
         
-        new_entries = []
-        for i, old_entry in enumerate(old_entries):
-            try:
-                new_entry = upgrade_entry(old_entry, i + 1)
-                new_entries.append(new_entry)
-            except Exception as e:
-                print(f"  ⚠️  Error upgrading entry {i}: {e}")
-        
-        # Write upgraded entries
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(new_entries, f, ensure_ascii=False, indent=2)
-        
-        print(f"  ✅ Upgraded {len(new_entries)}/{len(old_entries)} entries")
-        return len(new_entries)
+        print(f"  ✅ Upgraded {stats['written']}/{stats['read']} entries")
+        return stats["written"]
         
     except Exception as e:
         print(f"  ❌ Error: {e}")
@@ -0,0 +1,101 @@
+"""
+Wire format for GramSevak AI responses
+Single-pass JSON encoding (orjson when installed) plus a compact format:
+low-bandwidth clients (2G) can request short-key JSON with null and false
+fields removed; frontend/app.js expands it back to QueryResponse keys
+"""
+
+import json
+from typing import Dict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# QueryResponse field -> short key
+COMPACT_KEYS = {
+    "summary": "s",
+    "eligibility": "e",
+    "documents_required": "d",
+    "official_link": "l",
+    "emergency_helplines": "h",
+    "source": "o",
+    "confidence": "cf",
+    "mode": "m",
+    "scheme_name": "n",
+    "category": "c",
+    "category_confidence": "cc",
+    "bytes_used": "b",
+    "response_time_ms": "t",
+    "cached": "k",
+    "low_confidence_warning": "w",
+    "fallback_mode": "f",
+    "compressed": "z",
+    "original_length": "ol",
+    "retrieval_method": "r",
+    "similarity_score": "ss",
+    "last_updated": "u",
+    "simulate_2g_mode": "g",
+    "entry_id": "id",
+    "response_id": "rid"
+}
+
+# Emergency helpline field -> short key
+HELPLINE_KEYS = {
+    "name": "n",
+    "number": "p",
+    "description": "d"
+}
+
+# Scores are sent with this many decimals in compact mode
+FLOAT_PRECISION = 2
+
+def compact_fields(fields: Dict) -> Dict:
+    """Map response fields to short keys, dropping null/false and unknown fields"""
+    compact = {}
+    for key, value in fields.items():
+        short_key = COMPACT_KEYS.get(key)
+        if short_key is None or value is None or value is False:
+            continue
+        if isinstance(value, float):
+            value = round(value, FLOAT_PRECISION)
+        elif key == "emergency_helplines":
+            value = [
+                {HELPLINE_KEYS.get(k, k): v for k, v in helpline.items()}
+                for helpline in value
+            ]
+        compact[short_key] = value
+    return compact
+
+def dumps(obj: Dict) -> bytes:
+    """Serialize to UTF-8 JSON without whitespace (orjson if available)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def drop_nulls(fields: Dict) -> Dict:
+    """Keep QueryResponse fields only, removing those whose value is None"""
+    return {
+        key: value for key, value in fields.items()
+        if value is not None and key in COMPACT_KEYS
+    }
+
+def merge_json_objects(*bodies: bytes) -> bytes:
+    """Concatenate already-serialized JSON objects into one object"""
+    members = [body[1:-1] for body in bodies if len(body) > 2]
+    return b"{" + b",".join(members) + b"}"
+
+def with_byte_count(body: bytes, key: str) -> bytes:
+    """
+    Add a field holding the final size of the body itself
+
+    The count includes its own digits, so the value is exact for the bytes
+    sent on the wire.
+    """
+    prefix = body[:-1] + (b"," if len(body) > 2 else b"") + json.dumps(key).encode("utf-8") + b":"
+    fixed = len(prefix) + 1  # closing brace
+    size = fixed + 1
+    while fixed + len(str(size)) != size:
+        size = fixed + len(str(size))
+    return prefix + str(size).encode("ascii") + b"}"
@@ -2,6 +2,35 @@
 const API_BASE_URL = 'https://gramsevak-ai-vertex-2.onrender.com';
 const CHATGPT_AVG_SIZE = 45000;
 
+// Compact (low-bandwidth) response keys, mirrors backend/wire_format.py
+const COMPACT_KEYS = {
+    s: 'summary', e: 'eligibility', d: 'documents_required', l: 'official_link',
+    h: 'emergency_helplines', o: 'source', cf: 'confidence', m: 'mode',
+    n: 'scheme_name', c: 'category', cc: 'category_confidence', b: 'bytes_used',
+    t: 'response_time_ms', k: 'cached', w: 'low_confidence_warning', f: 'fallback_mode',
+    z: 'compressed', ol: 'original_length', r: 'retrieval_method', ss: 'similarity_score',
+    u: 'last_updated', g: 'simulate_2g_mode', id: 'entry_id', rid: 'response_id'
+};
+const COMPACT_HELPLINE_KEYS = { n: 'name', p: 'number', d: 'description' };
+
+// Expand a compact response back to full QueryResponse keys
+function expandCompactResponse(compact) {
+    const data = {};
+    for (const [key, value] of Object.entries(compact)) {
+        data[COMPACT_KEYS[key] || key] = value;
+    }
+    if (Array.isArray(data.emergency_helplines)) {
+        data.emergency_helplines = data.emergency_helplines.map(helpline => {
+            const expanded = {};
+            for (const [key, value] of Object.entries(helpline)) {
+                expanded[COMPACT_HELPLINE_KEYS[key] || key] = value;
+            }
+            return expanded;
+        });
+    }
+    return data;
+}
+
 // State
 let state = {
     theme: localStorage.getItem('theme') || 'light',
@@ -32,6 +61,7 @@ const elements = {
     recentSection: document.getElementById('recent-section'),
     recentQueriesList: document.getElementById('recent-queries-list'),
     queryInput: document.getElementById('query-input'),
+    querySuggestions: document.getElementById('query-suggestions'),
     sendBtn: document.getElementById('send-btn'),
     voiceBtn: document.getElementById('voice-btn'),
     voiceIndicator: document.getElementById('voice-indicator'),
@@ -56,6 +86,9 @@ document.addEventListener('DOMContentLoaded', () => {
     // Check for first visit and show personalization
     checkFirstVisit();
     
+    // Keep the offline pack up to date (downloads only changed entries)
+    syncOfflinePack();
+    
     // Update network status periodically
     setInterval(updateNetworkStatus, 5000); // Check every 5 seconds
     
@@ -100,6 +133,45 @@ async function initServiceWorker() {
     }
 }
 
+// Offline Pack Sync
+async function syncOfflinePack() {
+    if (!navigator.onLine) return;
+    
+    const stored = JSON.parse(localStorage.getItem('offlinePack') || 'null');
+    
+    try {
+        let pack;
+        if (stored && stored.version) {
+            const response = await fetch(`${API_BASE_URL}/offline-pack/delta?since=${stored.version}`);
+            if (!response.ok) return;
+            const delta = await response.json();
+            
+            if (response.headers.get('X-Offline-Pack-Full')) {
+                // Our version is too old for a delta
+                pack = delta;
+            } else if (delta.version === stored.version) {
+                return; // Already up to date
+            } else {
+                // Apply delta: changed records replace cached ones, order comes from server
+                const byId = {};
+                stored.data.forEach(record => { byId[record.id] = record; });
+                delta.changed.forEach(record => { byId[record.id] = record; });
+                const data = delta.order.map(id => byId[id]).filter(Boolean);
+                pack = { version: delta.version, count: data.length, data };
+            }
+        } else {
+            const response = await fetch(`${API_BASE_URL}/offline-pack`);
+            if (!response.ok) return;
+            pack = await response.json();
+        }
+        
+        localStorage.setItem('offlinePack', JSON.stringify(pack));
+        console.log(`📦 Offline pack synced: v${pack.version} (${pack.count} entries)`);
+    } catch (error) {
+        console.error('Offline pack sync failed:', error);
+    }
+}
+
 // Voice Recognition
 let recognition = null;
 
@@ -165,10 +237,11 @@ function initEventListeners() {
         if (e.key === 'Enter') handleQuery();
     });
 
-    // Character counter
+    // Character counter + typeahead suggestions
     elements.queryInput.addEventListener('input', (e) => {
         const length = e.target.value.length;
         elements.charCounter.textContent = `${length}/200`;
+        scheduleSuggestions(e.target.value);
     });
 
     // Voice button
@@ -223,6 +296,39 @@ function initEventListeners() {
     });
 }
 
+// Typeahead: known questions from /suggest (picking one is answered from the KB, not the LLM)
+const SUGGEST_DELAY_MS = 250;
+let suggestTimer = null;
+
+function scheduleSuggestions(text) {
+    clearTimeout(suggestTimer);
+    if (!elements.querySuggestions) return;
+    
+    const prefix = text.trim();
+    if (prefix.length < 2 || !state.isOnline) {
+        elements.querySuggestions.replaceChildren();
+        return;
+    }
+    suggestTimer = setTimeout(() => loadSuggestions(prefix), SUGGEST_DELAY_MS);
+}
+
+async function loadSuggestions(prefix) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/suggest?q=${encodeURIComponent(prefix)}&n=5`);
+        if (!response.ok) return;
+        const data = await response.json();
+        // Ignore answers for text the user has already changed
+        if (elements.queryInput.value.trim() !== prefix) return;
+        elements.querySuggestions.replaceChildren(...data.s.map(question => {
+            const option = document.createElement('option');
+            option.value = question;
+            return option;
+        }));
+    } catch (error) {
+        // Suggestions are optional; typing still works without them
+    }
+}
+
 // Category Management
 function handleCategoryChange(chip) {
     elements.categoryChips.forEach(c => c.classList.remove('active'));
@@ -260,6 +366,9 @@ async function handleQuery() {
     
     const startTime = performance.now();
     
+    // Use the compact wire format on 2G
+    const useCompact = state.networkType === '2g' || state.simulate2G;
+    
     try {
         const response = await fetch(`${API_BASE_URL}/query`, {
             method: 'POST',
@@ -270,11 +379,13 @@ async function handleQuery() {
                 text: query,
                 network_type: state.networkType,
                 user_type: state.userType || 'general',
-                simulate_2g: state.simulate2G || false
+                simulate_2g: state.simulate2G || false,
+                compact: useCompact
             })
         });
         
-        const data = await response.json();
+        const rawData = await response.json();
+        const data = useCompact && response.ok ? expandCompactResponse(rawData) : rawData;
         const endTime = performance.now();
         const responseTime = Math.round(endTime - startTime);
         
@@ -304,8 +415,20 @@ async function handleQuery() {
         
     } catch (error) {
         console.error('Query error:', error);
-        addErrorCard(query);
-        showToast('त्रुटि: सर्वर से कनेक्ट नहीं हो सका', 'error');
+        
+        // No server: answer from the prebuilt offline index
+        const offlineData = await OfflineSearch.search(query);
+        if (offlineData) {
+            addResponseCard(query, offlineData, Math.round(performance.now() - startTime));
+            state.totalQueries++;
+            state.offlineQueries++;
+            addToRecentQueries(query);
+            renderRecentQueries();
+            showToast('ऑफलाइन उत्तर', 'info');
+        } else {
+            addErrorCard(query);
+            showToast('त्रुटि: सर्वर से कनेक्ट नहीं हो सका', 'error');
+        }
     } finally {
         elements.loadingOverlay.classList.add('hidden');
     }
@@ -486,7 +609,7 @@ function addResponseCard(query, data, responseTime) {
         </div>
         
         <!-- Feedback Section -->
-        <div class="feedback-section" id="feedback-${cardId}">
+        <div class="feedback-section" id="feedback-${cardId}" data-entry-id="${escapeHtml(data.entry_id || '')}" data-response-id="${escapeHtml(data.response_id || '')}">
             <div class="feedback-question">क्या यह उत्तर उपयोगी था?</div>
             <div class="feedback-buttons">
                 <button class="feedback-btn helpful" onclick="submitFeedback('${cardId}', true)" id="helpful-${cardId}">
@@ -744,6 +867,11 @@ window.submitFeedback = async function(cardId, isHelpful) {
     if (helpfulBtn) helpfulBtn.disabled = true;
     if (notHelpfulBtn) notHelpfulBtn.disabled = true;
     
+    // Server-issued response id and knowledge base entry of the answer, so the vote can feed ranking
+    const feedbackSection = document.getElementById(`feedback-${cardId}`);
+    const entryId = feedbackSection ? feedbackSection.dataset.entryId || null : null;
+    const responseId = (feedbackSection && feedbackSection.dataset.responseId) || cardId;
+    
     try {
         // Send feedback to backend
         const response = await fetch(`${API_BASE_URL}/feedback`, {
@@ -752,9 +880,10 @@ window.submitFeedback = async function(cardId, isHelpful) {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
-                response_id: cardId,
+                response_id: responseId,
                 is_helpful: isHelpful,
-                category: state.currentCategory
+                category: state.currentCategory,
+                entry_id: entryId
             })
         });
         
@@ -0,0 +1,128 @@
+// Offline search over the prebuilt index (frontend/offline_search_index.json)
+// Mirrors the scoring of simple_keyword_match in backend/rag_pipeline.py so
+// answers work without a server round trip.
+
+const OfflineSearch = (() => {
+    let index = null;
+    let records = null;
+    let texts = null;  // entry_search_text of each record (see txt in backend/offline_pack.py)
+
+    // Load index + matching pack (static files are cached by the service worker)
+    async function load() {
+        if (index && records) return true;
+        try {
+            const [indexResponse, packResponse] = await Promise.all([
+                fetch('offline_search_index.json'),
+                fetch('offline_cache.json')
+            ]);
+            index = await indexResponse.json();
+            const pack = await packResponse.json();
+            const byId = {};
+            pack.data.forEach(record => { byId[record.id] = record; });
+
+            // Prefer newer records synced from the server, matched by id
+            const synced = JSON.parse(localStorage.getItem('offlinePack') || 'null');
+            if (synced && synced.data) {
+                synced.data.forEach(record => {
+                    if (byId[record.id]) byId[record.id] = record;
+                });
+            }
+            records = pack.data.map(record => byId[record.id]);
+            texts = records.map((record, i) =>
+                `${record.q} ${record.a} `.toLowerCase() + (index.txt[i] || ''));
+            return true;
+        } catch (error) {
+            console.error('Offline search index unavailable:', error);
+            return false;
+        }
+    }
+
+    function score(query) {
+        const queryLower = query.toLowerCase();
+        const queryWords = queryLower.split(/\s+/).filter(Boolean);
+        const queryWordSet = new Set(queryWords);
+        const scores = new Array(records.length).fill(0);
+
+        // 1. Synonym expansion (precomputed points per entry)
+        for (const [trigger, postings] of Object.entries(index.syn)) {
+            if (queryLower.includes(trigger)) {
+                postings.forEach(([i, points]) => { scores[i] += points; });
+            }
+        }
+
+        records.forEach((record, i) => {
+            // 2. Question variants
+            (record.variants || []).forEach(variant => {
+                const variantLower = variant.toLowerCase();
+                if (variantLower === queryLower) {
+                    scores[i] += 50;
+                } else if (variantLower.includes(queryLower) || queryLower.includes(variantLower)) {
+                    scores[i] += 30;
+                } else {
+                    const overlap = variantLower.split(/\s+/).filter(w => queryWordSet.has(w));
+                    scores[i] += new Set(overlap).size * 5;
+                }
+            });
+
+            // 3. Tags
+            (index.tags[i] || []).forEach(tag => {
+                if (queryLower.includes(tag)) scores[i] += 15;
+            });
+
+            // 4. Title
+            const title = (record.s || '').toLowerCase();
+            if (title && queryLower.includes(title)) scores[i] += 20;
+        });
+
+        // 5. Word matches: substring of the entry text, like the server
+        const longWords = queryWords.filter(word => word.length > 2);
+        texts.forEach((text, i) => {
+            longWords.forEach(word => {
+                if (text.includes(word)) scores[i] += 3;
+            });
+        });
+
+        // 6. Common misspellings
+        for (const [wrong, postings] of Object.entries(index.fz)) {
+            if (queryLower.includes(wrong)) {
+                postings.forEach(i => { scores[i] += 8; });
+            }
+        }
+
+        return scores;
+    }
+
+    // Best answer shaped like a /query response, or null if nothing matches
+    async function search(query) {
+        if (!(await load())) return null;
+
+        const scores = score(query);
+        let best = -1;
+        scores.forEach((value, i) => {
+            if (value > 0 && (best < 0 || value > scores[best])) best = i;
+        });
+        if (best < 0 || scores[best] <= 5 || !records[best]) return null;
+
+        const matchConfidence = Math.min(scores[best] / 50, 1.0);
+        const entryConfidence = index.cw[best];
+        const confidence = entryConfidence
+            ? Math.min((matchConfidence + entryConfidence) / 2, 1.0)
+            : matchConfidence;
+
+        return {
+            summary: records[best].a,
+            scheme_name: records[best].s,
+            entry_id: records[best].id,
+            source: 'offline_index',
+            mode: 'offline',
+            cached: true,
+            confidence,
+            similarity_score: scores[best] / 100,
+            retrieval_method: confidence >= 0.7 ? 'direct_match' : 'semantic_match',
+            low_confidence_warning: confidence < 0.3 || undefined,
+            bytes_used: 0
+        };
+    }
+
+    return { load, search };
+})();
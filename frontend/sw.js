@@ -1,4 +1,4 @@
-const CACHE_NAME = 'gramsevak-v1';
+const CACHE_NAME = 'gramsevak-v4';
 const OFFLINE_CACHE_NAME = 'gramsevak-offline-v1';
 
 // Files to cache immediately
@@ -7,6 +7,9 @@ const STATIC_ASSETS = [
     '/index.html',
     '/style.css',
     '/app.js',
+    '/offline_search.js',
+    '/offline_cache.json',
+    '/offline_search_index.json',
     '/manifest.json',
     'https://fonts.googleapis.com/css2?family=Noto+Sans+Devanagari:wght@400;600&display=swap'
 ];
@@ -42,6 +45,11 @@ self.addEventListener('fetch', (event) => {
         return;
     }
 
+    // Typeahead suggestions: one response per prefix, left to the HTTP cache
+    if (request.url.includes('/suggest')) {
+        return;
+    }
+
     // For API calls, try network first, then cache
     if (request.url.includes('/query') || request.url.includes('/offline-pack')) {
         event.respondWith(